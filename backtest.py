@@ -0,0 +1,259 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import storage
+from configuration import ORDER_SIZE, STOP_LOSS_PERCENT, TAKE_PROFIT_PERCENT
+from indicators import IndicatorEngine, crossover_signal
+from sma_grid import rolling_means
+from tick_store import TickStore, to_epoch_ms
+
+BACKTEST_CHUNK_SIZE = 1_000_000
+MONGO_BATCH_SIZE = 10_000
+
+
+class InMemorySignalSink:
+    """Stands in for the trade_signals collection + Redis publish of strategy.store_signal."""
+
+    def __init__(self):
+        self.signals = []
+
+    def store(self, signal, price, timestamp):
+        self.signals.append({"timestamp": str(timestamp), "signal": signal, "price": price, "status": "pending"})
+
+
+class InMemoryOrderSink:
+    """Stands in for the trade_orders collection written by execute.place_order."""
+
+    def __init__(self):
+        self.orders = []
+
+    def place(self, order):
+        self.orders.append(order)
+
+
+def iter_ticks_from_collection(collection, symbol, start=None, end=None, batch_size=MONGO_BATCH_SIZE):
+    yield from storage.trades_range(collection, symbol, start, end).batch_size(batch_size)
+
+
+def load_ticks_from_collection(collection, symbol, start=None, end=None):
+    """All stored ticks of a symbol as a DataFrame with price/quantity/timestamp columns, even when there are none."""
+    return pd.DataFrame(list(iter_ticks_from_collection(collection, symbol, start, end)),
+                        columns=["price", "quantity", "timestamp"])
+
+
+def load_ticks_from_file(path):
+    """Load an exported trades file (.csv or .jsonl) into a DataFrame with price/quantity/timestamp (epoch ms)."""
+    if path.endswith(".csv"):
+        frame = pd.read_csv(path)
+    else:
+        frame = pd.read_json(path, lines=True)
+    if "quantity" not in frame:
+        frame["quantity"] = 0.0
+    if frame["timestamp"].dtype == object:  # Exports from before timestamps were epoch ms
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"], format="ISO8601").astype("int64") // 1_000_000
+    return frame
+
+
+class Backtester:
+    """
+    Replays ticks through the live SMA crossover rule and models fills the way execute.place_order does:
+    each signal is a market order of `order_size` at the tick price with stop-loss / take-profit brackets.
+    An opposite signal reverses the position; a bracket hit closes it.
+    """
+
+    def __init__(self, short_window=50, long_window=200, order_size=ORDER_SIZE, sl_percent=STOP_LOSS_PERCENT,
+                 tp_percent=TAKE_PROFIT_PERCENT, fee_rate=0.0, signal_sink=None, order_sink=None):
+        self.short_window = short_window
+        self.long_window = long_window
+        self.order_size = order_size
+        self.sl_percent = sl_percent
+        self.tp_percent = tp_percent
+        self.fee_rate = fee_rate
+        self.signal_sink = signal_sink or InMemorySignalSink()
+        self.order_sink = order_sink or InMemoryOrderSink()
+
+        self.engine = IndicatorEngine(sma_windows=(short_window, long_window))
+        self.last_signal = None
+        self.position = None
+        self.ticks = 0
+        self.realized_pnl = 0.0
+        self.peak_pnl = 0.0
+        self.max_drawdown = 0.0
+        self.exits = {"signal": 0, "stop_loss": 0, "take_profit": 0}
+        self.wins = 0
+        self.losses = 0
+        self.signal_count = 0
+        self._carry = np.empty(0)
+        self._started = None
+
+    def on_tick(self, price, timestamp=None, quantity=0.0):
+        """Tick-by-tick path, identical in behaviour to strategy.handle_trade."""
+        self.ticks += 1
+        if self.position:
+            low, high = self._bracket()
+            if price <= low or price >= high:
+                self._close(price, timestamp, self._exit_reason(price))
+
+        self.engine.update(price, quantity)
+        if self.engine.ready(self.long_window):
+            signal = crossover_signal(self.engine.sma(self.short_window), self.engine.sma(self.long_window),
+                                      self.last_signal)
+            if signal:
+                self._on_signal(signal, price, timestamp)
+
+    def run(self, ticks):
+        self._started = time.perf_counter()
+        for tick in ticks:
+            self.on_tick(tick["price"], tick.get("timestamp"), tick.get("quantity", 0.0))
+        return self.report()
+
+    def run_arrays(self, prices, timestamps=None, chunk_size=BACKTEST_CHUNK_SIZE):
+        """Fast path: signals are found per NumPy chunk and only signal/exit ticks are visited in Python."""
+        self._started = time.perf_counter()
+        prices = np.asarray(prices, dtype=np.float64)
+        for start in range(0, len(prices), chunk_size):
+            chunk_timestamps = timestamps[start:start + chunk_size] if timestamps is not None else None
+            self._run_chunk(prices[start:start + chunk_size], chunk_timestamps)
+        return self.report()
+
+    def _run_chunk(self, prices, timestamps):
+        # Prepend the tail of the previous chunk so the SMAs continue across chunk boundaries.
+        extended = np.concatenate((self._carry, prices))
+        means = rolling_means(extended, [self.short_window, self.long_window])[:, len(self._carry):]
+        self._carry = extended[-(self.long_window - 1):] if self.long_window > 1 else np.empty(0)
+
+        with np.errstate(invalid="ignore"):
+            state = (means[0] > means[1]).view(np.int8) - (means[0] < means[1]).view(np.int8)
+        changes = np.flatnonzero(state)
+        values = state[changes]
+        last = {"BUY": 1, "SELL": -1}.get(self.last_signal, 0)
+        emitted = values != np.concatenate(([last], values[:-1]))
+
+        cursor = 0
+        for index, value in zip(changes[emitted], values[emitted]):
+            self._scan_exits(prices, timestamps, cursor, index + 1)
+            timestamp = timestamps[index] if timestamps is not None else None
+            self._on_signal("BUY" if value > 0 else "SELL", float(prices[index]), timestamp)
+            cursor = index + 1
+        self._scan_exits(prices, timestamps, cursor, len(prices))
+        self.ticks += len(prices)
+
+    def _scan_exits(self, prices, timestamps, start, end):
+        if not self.position or start >= end:
+            return
+        low, high = self._bracket()
+        segment = prices[start:end]
+        hits = np.flatnonzero((segment <= low) | (segment >= high))
+        if len(hits):
+            index = start + hits[0]
+            price = float(prices[index])
+            self._close(price, timestamps[index] if timestamps is not None else None, self._exit_reason(price))
+
+    def _bracket(self):
+        position = self.position
+        if position["side"] == "BUY":
+            return position["stop_loss"], position["take_profit"]
+        return position["take_profit"], position["stop_loss"]
+
+    def _exit_reason(self, price):
+        position = self.position
+        if position["side"] == "BUY":
+            return "stop_loss" if price <= position["stop_loss"] else "take_profit"
+        return "stop_loss" if price >= position["stop_loss"] else "take_profit"
+
+    def _on_signal(self, signal, price, timestamp):
+        self.last_signal = signal
+        self.signal_count += 1
+        self.signal_sink.store(signal, price, timestamp)
+        if self.position:
+            self._close(price, timestamp, "signal")
+
+        # Same bracket formula as execute.place_order
+        stop_loss = price * (1 - self.sl_percent / 100) if signal == "BUY" else price * (1 + self.sl_percent / 100)
+        take_profit = price * (1 + self.tp_percent / 100) if signal == "BUY" else price * (1 - self.tp_percent / 100)
+        self.position = {"side": signal, "entry_price": price, "stop_loss": stop_loss, "take_profit": take_profit}
+        self.realized_pnl -= self.fee_rate * price * self.order_size
+        self.order_sink.place({
+            "timestamp": str(timestamp),
+            "side": signal,
+            "amount": self.order_size,
+            "price": price,
+            "stop_loss": stop_loss,
+            "take_profit": take_profit,
+            "status": "filled"
+        })
+
+    def _close(self, price, timestamp, reason):
+        position = self.position
+        direction = 1 if position["side"] == "BUY" else -1
+        pnl = direction * (price - position["entry_price"]) * self.order_size - self.fee_rate * price * self.order_size
+        self.realized_pnl += pnl
+        self.exits[reason] += 1
+        if pnl > 0:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.peak_pnl = max(self.peak_pnl, self.realized_pnl)
+        self.max_drawdown = max(self.max_drawdown, self.peak_pnl - self.realized_pnl)
+        self.position = None
+        if reason != "signal":
+            self.order_sink.place({
+                "timestamp": str(timestamp),
+                "side": "SELL" if direction > 0 else "BUY",
+                "amount": self.order_size,
+                "price": price,
+                "reason": reason,
+                "status": "filled"
+            })
+
+    def report(self):
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        return {
+            "ticks": self.ticks,
+            "signals": self.signal_count,
+            "trades": self.wins + self.losses,
+            "wins": self.wins,
+            "losses": self.losses,
+            "exits": dict(self.exits),
+            "pnl": self.realized_pnl,
+            "max_drawdown": self.max_drawdown,
+            "open_position": self.position["side"] if self.position else None,
+            "elapsed_seconds": elapsed,
+            "ticks_per_second": self.ticks / elapsed if elapsed else None,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay stored ticks through the SMA crossover strategy.")
+    parser.add_argument("--file", help="Exported trades (.csv or .jsonl); defaults to the MongoDB trades collection")
+    parser.add_argument("--store", help="Tick archive directory written by data_feed (TICK_STORE_DIR)")
+    parser.add_argument("--start", help="ISO start time for --store replays", default="1970-01-01")
+    parser.add_argument("--end", help="ISO end time for --store replays", default="2100-01-01")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--short", type=int, default=50)
+    parser.add_argument("--long", type=int, default=200)
+    parser.add_argument("--fee", type=float, default=0.0, help="Fee rate per fill, e.g. 0.001")
+    parser.add_argument("--slow", action="store_true", help="Tick-by-tick replay instead of the NumPy fast path")
+    args = parser.parse_args()
+
+    backtester = Backtester(args.short, args.long, fee_rate=args.fee)
+    if args.store:
+        ticks = TickStore(args.store).read(args.symbol, to_epoch_ms(args.start), to_epoch_ms(args.end))
+        result = backtester.run_arrays(ticks["price"], ticks["timestamp"])
+    elif args.file:
+        ticks = load_ticks_from_file(args.file)
+        if args.slow:
+            result = backtester.run(ticks.to_dict("records"))
+        else:
+            result = backtester.run_arrays(ticks["price"].to_numpy(), ticks["timestamp"].to_numpy())
+    else:
+        collection = storage.connect()[storage.TRADES]
+        if args.slow:
+            result = backtester.run(iter_ticks_from_collection(collection, args.symbol))
+        else:
+            frame = load_ticks_from_collection(collection, args.symbol)
+            result = backtester.run_arrays(frame["price"].to_numpy(), frame["timestamp"].to_numpy())
+
+    for key, value in result.items():
+        print(f"{key}: {value}")
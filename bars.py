@@ -0,0 +1,46 @@
+INTERVAL_MS = {"seconds": 1_000, "minutes": 60_000, "hours": 3_600_000}
+
+
+class BarAggregator:
+    """
+    Folds ticks into fixed-interval OHLCV bars. A bar is returned once a tick from a later interval arrives;
+    empty intervals in between are forward-filled from the previous close (flagged with "filled": True).
+    At most `max_fill` filled bars are emitted per gap, since anything older falls out of every window anyway.
+    """
+
+    def __init__(self, interval_ms, max_fill=None):
+        self.interval_ms = interval_ms
+        self.max_fill = max_fill
+        self.current = None
+
+    def add(self, timestamp_ms, price, quantity=0.0):
+        start = timestamp_ms - timestamp_ms % self.interval_ms
+        current = self.current
+
+        if current is not None and start == current["timestamp"]:
+            current["high"] = max(current["high"], price)
+            current["low"] = min(current["low"], price)
+            current["close"] = price
+            current["volume"] += quantity
+            current["trades"] += 1
+            return []
+
+        closed = []
+        if current is not None:
+            if start < current["timestamp"]:
+                return []  # late tick for an interval that is already closed
+            closed.append(current)
+            gap = (start - current["timestamp"]) // self.interval_ms - 1
+            if self.max_fill is not None:
+                gap = min(gap, self.max_fill)
+            for i in range(gap, 0, -1):
+                closed.append(self._filled(start - i * self.interval_ms, current["close"]))
+
+        self.current = {"timestamp": start, "open": price, "high": price, "low": price, "close": price,
+                        "volume": quantity, "trades": 1, "filled": False}
+        return closed
+
+    @staticmethod
+    def _filled(timestamp, price):
+        return {"timestamp": timestamp, "open": price, "high": price, "low": price, "close": price,
+                "volume": 0.0, "trades": 0, "filled": True}
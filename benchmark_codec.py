@@ -0,0 +1,47 @@
+import argparse
+import json
+import timeit
+from bson import ObjectId
+from codec import CODECS, decode
+from tick_writer import WRITE_BATCH_SIZE
+
+
+def sample_record():
+    return {"symbol": "BTCUSDT", "price": 97234.51, "quantity": 0.00213, "timestamp": 1739361601120,
+            "trade_id": 4521873301, "_id": ObjectId()}
+
+
+def baseline_encode(record):
+    """What the services did before the codec layer: dumps with a str _id..."""
+    return json.dumps({**record, "_id": str(record["_id"])})
+
+
+def baseline_decode(data):
+    """...then json.loads and an ObjectId -> str pass over the fields on the way in."""
+    return {k: (str(v) if isinstance(v, ObjectId) else v) for k, v in json.loads(data).items()}
+
+
+def run(number):
+    record = sample_record()
+    rows = []
+    cases = [("baseline", baseline_encode, baseline_decode)]
+    cases += [(name, codec.encode, decode) for name, codec in CODECS.items()]
+
+    for name, encode_call, decode_call in cases:
+        payload = encode_call(record)
+        encode_us = timeit.timeit(lambda: encode_call(record), number=number) / number * 1e6
+        decode_us = timeit.timeit(lambda: decode_call(payload), number=number) / number * 1e6
+        size = len(payload.encode() if isinstance(payload, str) else payload)
+        rows.append((name, size, encode_us, decode_us))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare tick message codecs (bytes and CPU per message).")
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'codec':<10}{'bytes':>8}{'encode us':>12}{'decode us':>12}{'per batch ms':>15}")
+    for name, size, encode_us, decode_us in run(args.number):
+        batch_ms = (encode_us + decode_us) * WRITE_BATCH_SIZE / 1000
+        print(f"{name:<10}{size:>8}{encode_us:>12.2f}{decode_us:>12.2f}{batch_ms:>15.2f}")
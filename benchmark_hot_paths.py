@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+import fakeredis
+import fakeredis.aioredis
+import mongomock
+import numpy as np
+import execute
+import storage
+import strategy
+from ledger import Ledger
+from logger import setup_logging
+from order_scheduler import OrderScheduler
+from signal_book import SignalBook
+from strategy_runtime import SmaCrossover, StrategyRuntime
+
+START_MS = 1_735_689_600_000  # 2025-01-01T00:00:00 UTC
+TICK_SPACING_MS = 10
+DEFAULT_TOLERANCE = 0.2  # Relative slowdown reported as a regression
+
+
+class FakeExchange:
+    """Stands in for ccxt.binance: fixed balance and ticker, orders fill right away after `delay` seconds."""
+
+    def __init__(self, delay=0.0, price=50000.0):
+        self.delay = delay
+        self.price = price
+        self.orders = 0
+
+    async def fetch_balance(self):
+        return {"BTC": {"free": 1_000.0}, "USDT": {"free": 1e9}}
+
+    async def fetch_ticker(self, symbol):
+        return {"last": self.price}
+
+    async def create_market_buy_order(self, symbol, amount):
+        return await self._fill(amount)
+
+    async def create_market_sell_order(self, symbol, amount):
+        return await self._fill(amount)
+
+    async def _fill(self, amount):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.orders += 1
+        return {"id": self.orders, "filled": amount, "average": self.price}
+
+
+def synthetic_ticks(count, symbol="BTCUSDT", seed=7, start_ms=START_MS):
+    """Random-walk trades in the data_feed record format, TICK_SPACING_MS apart."""
+    rng = np.random.default_rng(seed)
+    prices = 50000.0 * np.exp(np.cumsum(rng.normal(0, 0.0005, count)))
+    quantities = rng.exponential(0.01, count)
+    for i, (price, quantity) in enumerate(zip(prices.tolist(), quantities.tolist())):
+        yield {"symbol": symbol, "price": price, "quantity": quantity, "timestamp": start_ms + i * TICK_SPACING_MS,
+               "trade_id": i}
+
+
+def offline(exchange_delay=0.0):
+    """
+    Point the strategy and execute services at mongomock, fakeredis and a fake exchange. No indexes are created:
+    mongomock checks unique keys by scanning, and does not use indexes to serve queries anyway. The numbers are
+    the services' own CPU cost, not MongoDB or network latency.
+    """
+    db = mongomock.MongoClient()["trading_db"]
+    strategy.db, strategy.collection, strategy.signals_collection = db, db[storage.TRADES], db[storage.SIGNALS]
+    strategy.redis_client = fakeredis.FakeRedis(decode_responses=True)
+    strategy.tick_store = None
+
+    exchange = FakeExchange(exchange_delay)
+    execute.redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    execute.exchange = exchange
+    execute.ledger = Ledger(exchange, execute.ORDER_SYMBOL)
+    execute.orders_collection, execute.signals_collection = db[storage.ORDERS], db[storage.SIGNALS]
+    execute.signal_book = SignalBook(db[storage.SIGNALS])
+    execute.order_scheduler = OrderScheduler(execute.execute_order, execute.cancel_signals, window=0)
+    return db
+
+
+def summary(samples_ns, prefix=""):
+    samples = np.asarray(samples_ns) / 1e6
+    return {f"{prefix}mean_ms": float(samples.mean()), f"{prefix}p50_ms": float(np.percentile(samples, 50)),
+            f"{prefix}p99_ms": float(np.percentile(samples, 99))}
+
+
+async def bench_handle_trade(ticks, short_window, long_window):
+    """Ticks/sec through strategy.handle_trade, signal storage and publishing included."""
+    strategy.runtime = StrategyRuntime([SmaCrossover("bench", "BTCUSDT", short_window, long_window)])
+    ticks = list(synthetic_ticks(ticks))
+    started = time.perf_counter()
+    for tick in ticks:
+        tick["received_at"] = time.monotonic_ns()
+        await strategy.handle_trade(tick)
+    elapsed = time.perf_counter() - started
+    return {"ticks": len(ticks), "signals": strategy.signals_collection.count_documents({}),
+            "elapsed_seconds": elapsed, "ticks_per_second": len(ticks) / elapsed}
+
+
+def bench_warm_up(cycles, short_window, long_window):
+    """One cycle: load the stored history a bar-based instance needs, then replay it (strategy.restore_strategies)."""
+    probe = SmaCrossover("bench", "BTCUSDT", short_window, long_window, execution_mode="TIME_BASED")
+    history = probe.history_ms // TICK_SPACING_MS
+    storage.insert_trades(strategy.collection, synthetic_ticks(history))
+    fetches, replays = [], []
+    for _ in range(cycles):
+        started = time.perf_counter_ns()
+        instance = SmaCrossover("bench", "BTCUSDT", short_window, long_window, execution_mode="TIME_BASED")
+        ticks = strategy.fetch_history("BTCUSDT", instance.history_ms)
+        fetched = time.perf_counter_ns()
+        instance.warm_up(ticks)
+        fetches.append(fetched - started)
+        replays.append(time.perf_counter_ns() - fetched)
+    return {"history_ticks": len(ticks), "cycles": cycles, **summary(fetches, "fetch_"), **summary(replays, "replay_")}
+
+
+async def bench_place_order(orders):
+    """Signal received by execute.handle_signal to order stored, against the fake exchange."""
+    samples = []
+    for i in range(orders):
+        side = "BUY" if i % 2 == 0 else "SELL"
+        signal = {"symbol": "BTCUSDT", "signal": side, "price": 50000.0, "status": "pending",
+                  "timestamp": START_MS + i}
+        signal["_id"] = str(execute.signals_collection.insert_one(dict(signal)).inserted_id)
+        started = time.perf_counter_ns()
+        await execute.handle_signal(signal)
+        await execute.order_scheduler.drain()
+        samples.append(time.perf_counter_ns() - started)
+    await execute.signal_book.flush()
+    return {"orders": orders, "filled": execute.orders_collection.count_documents({}), **summary(samples)}
+
+
+def run(ticks=20_000, cycles=5, orders=500, short_window=50, long_window=200, exchange_delay=0.0):
+    offline(exchange_delay)
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": {"ticks": ticks, "cycles": cycles, "orders": orders, "short_window": short_window,
+                   "long_window": long_window, "exchange_delay": exchange_delay},
+        "results": {
+            "handle_trade": asyncio.run(bench_handle_trade(ticks, short_window, long_window)),
+            "warm_up": bench_warm_up(cycles, short_window, long_window),
+            "place_order": asyncio.run(bench_place_order(orders)),
+        },
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Regressions against an earlier run: throughput (*_per_second) that dropped, or latency (*_ms) that grew,
+    by more than `tolerance`. Returns (benchmark, metric, baseline, current) tuples.
+    """
+    regressions = []
+    for name, metrics in current["results"].items():
+        previous = baseline.get("results", {}).get(name, {})
+        for metric, value in metrics.items():
+            before = previous.get(metric)
+            if not before:
+                continue
+            if metric.endswith("_per_second") and value < before * (1 - tolerance):
+                regressions.append((name, metric, before, value))
+            elif metric.endswith("_ms") and value > before * (1 + tolerance):
+                regressions.append((name, metric, before, value))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the strategy and execution hot paths offline.")
+    parser.add_argument("--ticks", type=int, default=20_000, help="Ticks pushed through handle_trade")
+    parser.add_argument("--cycles", type=int, default=5, help="History load + warm-up cycles")
+    parser.add_argument("--orders", type=int, default=500, help="Signals executed through place_order")
+    parser.add_argument("--short", type=int, default=50)
+    parser.add_argument("--long", type=int, default=200)
+    parser.add_argument("--exchange-delay", type=float, default=0.0, help="Simulated exchange round trip (seconds)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results file; exits with 1 if anything regressed")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    setup_logging("benchmark", console=False)  # The services' per-signal logging still runs, into benchmark.log
+    report = run(args.ticks, args.cycles, args.orders, args.short, args.long, args.exchange_delay)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for name, metric, before, after in regressions:
+            print(f"REGRESSION {name}.{metric}: {before:.3f} -> {after:.3f}")
+        sys.exit(1 if regressions else 0)
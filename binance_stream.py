@@ -0,0 +1,58 @@
+import asyncio
+import json
+import logging
+import time
+import websockets
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY_SECONDS = 5
+ERROR_DELAY_SECONDS = 10
+
+
+def combined_stream_urls(symbols, base_url, max_streams_per_connection):
+    """Multiplex <symbol>@trade streams over as few combined-stream connections as the cap allows."""
+    streams = [f"{symbol.lower()}@trade" for symbol in symbols]
+    return [
+        f"{base_url.rstrip('/')}/stream?streams={'/'.join(streams[i:i + max_streams_per_connection])}"
+        for i in range(0, len(streams), max_streams_per_connection)
+    ]
+
+
+def shard(items, workers):
+    """Spread items round-robin over at most `workers` non-empty shards."""
+    workers = max(1, min(workers, len(items)))
+    return [items[i::workers] for i in range(workers)]
+
+
+def parse_trade_message(raw):
+    message = json.loads(raw)
+    trade_data = message.get("data", message)  # combined streams wrap the payload
+    return {
+        "symbol": trade_data["s"],
+        "price": float(trade_data["p"]),
+        "quantity": float(trade_data["q"]),
+        "timestamp": trade_data.get("T") or time.time_ns() // 1_000_000,  # Exchange trade time, epoch ms
+        "trade_id": trade_data["t"],
+        "received_at": time.monotonic_ns()  # Start of the tick-to-trade trace, see latency.py
+    }
+
+
+async def stream_trades(url, on_trade):
+    while True:
+        try:
+            async with websockets.connect(url) as websocket:
+                logger.info(f"📡 Connected to Binance WebSocket: {url}")
+                async for response in websocket:
+                    on_trade(parse_trade_message(response))
+            logger.warning(f"⚠️ Connection closed by server ({url})... Reconnecting in {RECONNECT_DELAY_SECONDS} seconds")
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+        except websockets.exceptions.ConnectionClosedError:
+            logger.warning(f"⚠️ Connection lost ({url})... Reconnecting in {RECONNECT_DELAY_SECONDS} seconds")
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Unexpected error on {url}: {e}")
+            await asyncio.sleep(ERROR_DELAY_SECONDS)
@@ -0,0 +1,73 @@
+import json
+import struct
+from bson import ObjectId
+from configuration import CHANNEL_CODECS
+
+TICK_VERSION = 3  # Schema version byte; JSON payloads always start with "{" so the two never collide
+NO_ID = bytes(12)
+NO_TRADE_ID = -1
+
+
+class JsonCodec:
+    name = "json"
+
+    @staticmethod
+    def encode(record):
+        if isinstance(record.get("_id"), ObjectId):
+            record = {**record, "_id": str(record["_id"])}
+        return json.dumps(record)
+
+    @staticmethod
+    def decode(data):
+        return json.loads(data)
+
+
+class TickCodec:
+    """
+    Fixed-layout binary tick, 53 bytes + symbol:
+    version (u8) | price (f64) | quantity (f64) | timestamp (i64, exchange epoch ms) | _id (12 raw bytes)
+    | trade_id (i64) | received_at (i64, monotonic ns) | symbol
+    """
+
+    name = "binary"
+    layout = struct.Struct("<Bddq12sqq")
+
+    def encode(self, record):
+        _id = record.get("_id")
+        return self.layout.pack(TICK_VERSION, record["price"], record.get("quantity", 0.0), record["timestamp"],
+                                ObjectId(_id).binary if _id else NO_ID, record.get("trade_id", NO_TRADE_ID),
+                                record.get("received_at", 0)) + record["symbol"].encode()
+
+    def decode(self, data):
+        if data[0] != TICK_VERSION:
+            raise ValueError(f"Unsupported tick schema version {data[0]}")
+        _, price, quantity, timestamp, _id, trade_id, received_at = self.layout.unpack_from(data)
+        symbol = data[self.layout.size:]
+
+        record = {"symbol": symbol.decode(), "price": price, "quantity": quantity, "timestamp": timestamp}
+        if _id != NO_ID:
+            record["_id"] = _id.hex()
+        if trade_id != NO_TRADE_ID:
+            record["trade_id"] = trade_id
+        if received_at:
+            record["received_at"] = received_at
+        return record
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), TickCodec())}
+
+
+def codec_for(channel, codecs=CHANNEL_CODECS):
+    """Codec configured for a channel, matched on the part before ":" (raw_trades:BTCUSDT -> raw_trades)."""
+    return CODECS[codecs.get(channel.split(":", 1)[0], "json")]
+
+
+def encode(channel, record):
+    return codec_for(channel).encode(record)
+
+
+def decode(data):
+    """Decode any supported payload; the format is recognised from its first byte."""
+    if isinstance(data, bytes) and data[0] == TICK_VERSION:
+        return CODECS["binary"].decode(data)
+    return json.loads(data)
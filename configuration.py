@@ -0,0 +1,80 @@
+import json
+import os
+
+# Market data
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443")
+SYMBOLS = [s.strip().lower() for s in os.getenv("SYMBOLS", "btcusdt").split(",") if s.strip()]
+MAX_STREAMS_PER_CONNECTION = int(os.getenv("MAX_STREAMS_PER_CONNECTION", "200"))  # Binance allows up to 1024
+FEED_WORKERS = int(os.getenv("FEED_WORKERS", "1"))
+TICK_STORE_DIR = os.getenv("TICK_STORE_DIR", "")  # Memory-mapped tick archive; disabled when empty
+
+# Orders
+ORDER_SYMBOL = "BTC/USDT"
+ORDER_SIZE = 0.0001
+STOP_LOSS_PERCENT = 1  # Stop-Loss at 1%
+TAKE_PROFIT_PERCENT = 2  # Take-Profit at 2%
+EXCHANGE = os.getenv("EXCHANGE", "binance")  # "paper" fills orders locally (offline stress runs, see paper_exchange.py)
+
+# MongoDB (see storage.py)
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb:27017/")
+MONGO_DATABASE = os.getenv("MONGO_DATABASE", "trading_db")
+TRADES_TIMESERIES = os.getenv("TRADES_TIMESERIES", "false").lower() == "true"  # Only applies when trades is created
+TICK_RETENTION_SECONDS = int(os.getenv("TICK_RETENTION_SECONDS", str(7 * 86400)))  # Raw ticks TTL; 0 keeps them forever
+# OHLCV rollups written by data_feed (bars_1s, bars_1m, bars_1h) and their TTL in seconds (0 = forever)
+ROLLUP_RETENTION = {k.strip(): int(v) for k, v in (item.split("=") for item in os.getenv("ROLLUP_RETENTION", "1s=2592000,1m=0,1h=0").split(",") if item.strip())}
+
+# Offline stress runs (replay_server.py stands in for Binance, load_harness.py reports on the pipeline)
+REPLAY_PORT = int(os.getenv("REPLAY_PORT", "9443"))
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "1"))  # Multiple of real time
+REPLAY_RATE = float(os.getenv("REPLAY_RATE", "50"))  # Synthetic trades per second and symbol at 1x
+REPLAY_PROFILE = os.getenv("REPLAY_PROFILE", "")  # Burst profile: "seconds x multiplier" segments, e.g. "30x1,5x20"
+REPLAY_FILE = os.getenv("REPLAY_FILE", "")  # Recorded trades (.jsonl/.csv) to replay; synthetic trades when empty
+
+# Strategy instances hosted by strategy.py (see strategy_runtime.py). Each entry runs one instance per symbol.
+DEFAULT_STRATEGIES = [{
+    "name": "sma",
+    "plugin": "sma_crossover",
+    "symbols": ["BTCUSDT"],
+    "params": {"short_window": 50, "long_window": 200, "execution_mode": "HFT", "time_unit": "seconds",
+               "data_collection_mode": "STRICT"},
+}]
+STRATEGIES = json.loads(os.getenv("STRATEGIES", "")) if os.getenv("STRATEGIES") else DEFAULT_STRATEGIES
+STRATEGY_WORKERS = int(os.getenv("STRATEGY_WORKERS", "1"))  # >1 shards the instances over worker processes by symbol
+
+# Kafka (consume_trades.py)
+KAFKA_BROKER = os.getenv("KAFKA_BROKER", "kafka:9092")
+KAFKA_TOPIC = os.getenv("KAFKA_TOPIC", "trade_data")
+KAFKA_GROUP_ID = os.getenv("KAFKA_GROUP_ID", "trade_consumer_group")
+KAFKA_BATCH_SIZE = int(os.getenv("KAFKA_BATCH_SIZE", "1000"))  # Messages per consume() call
+KAFKA_BATCH_TIMEOUT = float(os.getenv("KAFKA_BATCH_TIMEOUT", "0.5"))
+KAFKA_CONSUMER_WORKERS = int(os.getenv("KAFKA_CONSUMER_WORKERS", "0"))  # 0 = one process per partition
+KAFKA_SINK_ENABLED = os.getenv("KAFKA_SINK_ENABLED", "false").lower() == "true"  # data_feed hands ticks to Kafka instead of storing them
+KAFKA_LINGER_MS = int(os.getenv("KAFKA_LINGER_MS", "5"))
+KAFKA_COMPRESSION = os.getenv("KAFKA_COMPRESSION", "lz4")  # "lz4" or "zstd"
+KAFKA_MAX_IN_FLIGHT = int(os.getenv("KAFKA_MAX_IN_FLIGHT", "100000"))  # Undelivered ticks before new ones are dropped
+
+# Balance / price ledger used by execute.py
+BALANCE_MAX_STALENESS_SECONDS = float(os.getenv("BALANCE_MAX_STALENESS_SECONDS", "30"))
+PRICE_MAX_STALENESS_SECONDS = float(os.getenv("PRICE_MAX_STALENESS_SECONDS", "2"))
+LEDGER_RECONCILE_SECONDS = float(os.getenv("LEDGER_RECONCILE_SECONDS", "60"))
+
+# Order scheduling in execute.py (see order_scheduler.py)
+ORDER_COALESCE_WINDOW_SECONDS = float(os.getenv("ORDER_COALESCE_WINDOW_SECONDS", "0.1"))  # 0 sends every signal alone
+REQUEST_WEIGHT_LIMIT = int(os.getenv("REQUEST_WEIGHT_LIMIT", "6000"))  # Binance REQUEST_WEIGHT per minute
+ORDER_RATE_LIMIT = int(os.getenv("ORDER_RATE_LIMIT", "100"))  # Binance ORDERS per 10 seconds
+
+# Service metrics pushed to monitor.py
+METRICS_CHANNEL = "service_metrics"
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+# Redis channels
+RAW_TRADES_CHANNEL = "raw_trades"
+TRADE_SIGNALS_CHANNEL = "trade_signals"
+MESSAGE_TRANSPORT = os.getenv("MESSAGE_TRANSPORT", "pubsub")  # Options: "pubsub", "streams"
+STREAM_MAXLEN = int(os.getenv("STREAM_MAXLEN", "100000"))  # Approximate cap per stream when using "streams"
+# Message codec per channel prefix, e.g. "raw_trades=binary,trade_signals=json"; "binary" is a tick-only layout
+CHANNEL_CODECS = dict(item.strip().split("=") for item in os.getenv("CHANNEL_CODECS", "raw_trades=json,trade_signals=json").split(",") if item.strip())
+
+
+def trade_channel(symbol):
+    return f"{RAW_TRADES_CHANNEL}:{symbol.upper()}"
@@ -1,82 +1,83 @@
-import asyncio
-import json
 import logging
-from pymongo import MongoClient
+import multiprocessing
+import signal
 import redis
-from confluent_kafka import Consumer, KafkaException
-
-logging.basicConfig(
-    filename="/app/logs/consume_trades.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+import storage
+from confluent_kafka import Consumer
+from configuration import KAFKA_BROKER, KAFKA_TOPIC, KAFKA_GROUP_ID, KAFKA_CONSUMER_WORKERS
+from kafka_pipeline import TradeBatchConsumer
+from metrics import metrics
+from rollups import Rollups
+from logger import setup_logging
+
+setup_logging("consume_trades", console=False)
 logger = logging.getLogger(__name__)
 
 try:
-    client = MongoClient("mongodb://mongodb:27017/")
-    db = client["trading_db"]
-    collection = db["trades"]
+    db = storage.connect()
+    collection = db[storage.TRADES]
     logger.info("✅ Successfully connected to MongoDB.")
 except Exception as e:
     logger.error(f"❌ MongoDB Connection Failed: {e}")
     exit(1)
 
 try:
-    redis_client = redis.Redis(host="redis", port=6379, db=0, decode_responses=True)
+    redis_client = redis.Redis(host="redis", port=6379, db=0)
     logger.info("✅ Successfully connected to Redis.")
 except Exception as e:
     logger.error(f"❌ Redis Connection Failed: {e}")
     exit(1)
 
-KAFKA_BROKER = "kafka:9092"
-KAFKA_TOPIC = "trade_data"
-KAFKA_GROUP_ID = "trade_consumer_group"
-
 consumer_config = {
     "bootstrap.servers": KAFKA_BROKER,
     "group.id": KAFKA_GROUP_ID,
     "auto.offset.reset": "latest",
+    "enable.auto.commit": False,  # Offsets are committed by TradeBatchConsumer once a batch is stored
 }
 
-consumer = Consumer(consumer_config)
-consumer.subscribe([KAFKA_TOPIC])
-
-
-async def consume_trades():
-    while True:
-        try:
-            msg = consumer.poll(1.0)
-
-            if msg is None:
-                await asyncio.sleep(1)
-                continue
-            if msg.error():
-                if msg.error().code() == KafkaException._PARTITION_EOF:
-                    logger.warning(f"⚠️ Reached end of partition: {msg.error()}")
-                else:
-                    logger.error(f"❌ Kafka Error: {msg.error()}")
-                continue
-
-            trade_data = json.loads(msg.value().decode("utf-8"))
-
-            trade_record = {
-                "symbol": trade_data["symbol"],
-                "price": trade_data["price"],
-                "quantity": trade_data["quantity"],
-                "timestamp": trade_data["timestamp"]
-            }
-
-            collection.insert_one(trade_record)
 
-            redis_client.publish("raw_trades", json.dumps(trade_record))
+def partition_count(topic=KAFKA_TOPIC):
+    probe = Consumer(consumer_config)
+    try:
+        return len(probe.list_topics(topic, timeout=10).topics[topic].partitions) or 1
+    finally:
+        probe.close()
 
-            logger.info(f"💾 Trade saved & published: {trade_record}")
 
-        except Exception as e:
-            logger.error(f"❌ Kafka Consumer Error: {e}")
-            await asyncio.sleep(5)
+def run_worker():
+    consumer = Consumer(consumer_config)
+    consumer.subscribe([KAFKA_TOPIC])
+    metrics.start("consume_trades", redis_client)
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    try:
+        batcher = TradeBatchConsumer(consumer, collection, redis_client, rollups=Rollups(db))
+        batcher.run(should_stop=lambda: bool(stopping))
+    finally:
+        consumer.close()  # Leaves the group right away so the partitions are reassigned
+        metrics.stop()
 
 
 if __name__ == "__main__":
     logger.info("🚀 Starting Kafka Consumer Service...")
-    asyncio.run(consume_trades())
+    storage.ensure_schema(db)
+    worker_count = KAFKA_CONSUMER_WORKERS or partition_count()
+    logger.info(f"📡 Consuming {KAFKA_TOPIC} with {worker_count} worker(s)")
+
+    if worker_count == 1:
+        run_worker()
+    else:
+        # One consumer per partition; the group coordinator hands each worker its share of the partitions.
+        ctx = multiprocessing.get_context("spawn")
+        workers = [ctx.Process(target=run_worker, name=f"consume_trades-{i}") for i in range(worker_count)]
+        for worker in workers:
+            worker.start()
+
+        def stop_workers(signum, frame):
+            for worker in workers:
+                worker.terminate()  # SIGTERM lets each worker finish and commit its current batch
+
+        signal.signal(signal.SIGTERM, stop_workers)
+        signal.signal(signal.SIGINT, stop_workers)
+        for worker in workers:
+            worker.join()
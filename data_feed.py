@@ -1,25 +1,25 @@
 import asyncio
-import websockets
-import json
 import logging
-from pymongo import MongoClient
-from datetime import datetime
+import multiprocessing
+import signal
 import redis
-from bson import ObjectId
+import storage
+from binance_stream import combined_stream_urls, shard, stream_trades
+from configuration import (BINANCE_WS_URL, SYMBOLS, MAX_STREAMS_PER_CONNECTION, FEED_WORKERS, TICK_STORE_DIR,
+                           KAFKA_SINK_ENABLED)
+from kafka_pipeline import KafkaTickSink
+from rollups import Rollups
+from tick_store import TickStore
+from tick_writer import TickWriter
+from metrics import metrics
+from logger import setup_logging
 
-logging.basicConfig(
-    filename="/app/logs/data_feed.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+setup_logging("data_feed", console=False)
 logger = logging.getLogger(__name__)
 
-BINANCE_WS_URL = "wss://stream.binance.com:9443/ws/btcusdt@trade"
-
 try:
-    client = MongoClient("mongodb://mongodb:27017/")
-    db = client["trading_db"]
-    collection = db["trades"]
+    db = storage.connect()
+    collection = db[storage.TRADES]
     logger.info("✅ Successfully connected to MongoDB.")
 except Exception as e:
     logger.error(f"❌ MongoDB Connection Failed: {e}")
@@ -32,37 +32,71 @@ except Exception as e:
     logger.error(f"❌ Redis Connection Failed: {e}")
     exit(1)
 
+tick_store = TickStore(TICK_STORE_DIR, writable=True) if TICK_STORE_DIR else None
+if KAFKA_SINK_ENABLED:
+    # consume_trades stores, rolls up and publishes the ticks from Kafka; writing them here too would hand every
+    # tick to the strategies twice. The writer still archives them and counts what was received.
+    tick_writer = TickWriter(None, None, tick_store=tick_store)
+else:
+    tick_writer = TickWriter(collection, redis_client, tick_store=tick_store, rollups=Rollups(db))
+
+
+async def stream_data(url, kafka_sink=None):
+    def on_trade(trade_record):
+        tick_writer.submit(trade_record)  # Assigns the _id Kafka consumers store the tick under
+        if kafka_sink is not None:
+            kafka_sink.submit(trade_record)
+
+    await stream_trades(url, on_trade)
 
-async def stream_data():
-    while True:
-        try:
-            async with websockets.connect(BINANCE_WS_URL) as websocket:
-                logger.info("📡 Connected to Binance WebSocket")
-                while True:
-                    response = await websocket.recv()
-                    trade_data = json.loads(response)
 
-                    trade_record = {
-                        "symbol": trade_data["s"],
-                        "price": float(trade_data["p"]),
-                        "quantity": float(trade_data["q"]),
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
+async def main(urls):
+    metrics.start("data_feed", redis_client)
+    tick_writer.start()
+    kafka_sink = KafkaTickSink() if KAFKA_SINK_ENABLED else None
+    feed_task = asyncio.gather(*(stream_data(url, kafka_sink) for url in urls))
 
-                    inserted_trade = collection.insert_one(trade_record)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, feed_task.cancel)
 
-                    trade_record["_id"] = str(inserted_trade.inserted_id)
+    try:
+        await feed_task
+    except asyncio.CancelledError:
+        logger.info("🛑 Shutting down Data Feed, flushing pending trades...")
+    finally:
+        await tick_writer.close()
+        if kafka_sink is not None:
+            await asyncio.to_thread(kafka_sink.flush)
+        metrics.stop()
 
-                    redis_client.publish("raw_trades", json.dumps(trade_record))
 
-                    logger.info(f"💾 Trade saved & published: {trade_record}")
+def run_worker(urls):
+    asyncio.run(main(urls))
+
 
-        except websockets.exceptions.ConnectionClosedError:
-            logger.warning("⚠️ Connection lost... Reconnecting in 5 seconds")
-            await asyncio.sleep(5)
-        except Exception as e:
-            logger.error(f"❌ Unexpected error: {e}")
-            await asyncio.sleep(10)
 if __name__ == "__main__":
     logger.info("🚀 Starting Data Feed Service...")
-    asyncio.run(stream_data())
+    storage.ensure_schema(db)
+    urls = combined_stream_urls(SYMBOLS, BINANCE_WS_URL, MAX_STREAMS_PER_CONNECTION)
+    shards = shard(urls, FEED_WORKERS)
+    logger.info(f"📡 {len(SYMBOLS)} symbols over {len(urls)} connections in {len(shards)} worker(s)")
+
+    if len(shards) == 1:
+        run_worker(shards[0])
+    else:
+        # Spawned workers re-import this module and open their own MongoDB/Redis connections.
+        ctx = multiprocessing.get_context("spawn")
+        workers = [ctx.Process(target=run_worker, args=(worker_urls,), name=f"data_feed-{i}")
+                   for i, worker_urls in enumerate(shards)]
+        for worker in workers:
+            worker.start()
+
+        def stop_workers(signum, frame):
+            for worker in workers:
+                worker.terminate()  # SIGTERM lets each worker flush its tick writer
+
+        signal.signal(signal.SIGTERM, stop_workers)
+        signal.signal(signal.SIGINT, stop_workers)
+        for worker in workers:
+            worker.join()
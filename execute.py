@@ -1,86 +1,117 @@
+import asyncio
 import json
 import os
 import time
 from dotenv import load_dotenv
-import ccxt
-from pymongo import MongoClient
-from logger import logger
-import redis
-from datetime import datetime, timedelta
+import ccxt.async_support as ccxt
+from logger import setup_logging
+import storage
+import redis.asyncio as redis
+from configuration import (ORDER_SYMBOL, ORDER_SIZE, STOP_LOSS_PERCENT, TAKE_PROFIT_PERCENT, EXCHANGE,
+                           MESSAGE_TRANSPORT, TRADE_SIGNALS_CHANNEL, trade_channel)
+from codec import decode
+from latency import TICK_TO_TRADE_METRIC, now_ns, observe, wall_ms
+from metrics import metrics
+from ledger import Ledger
+from order_scheduler import OrderScheduler, RateLimitedExchange
+from paper_exchange import PaperExchange
+from redis_streams import AsyncStreamConsumer
+from signal_book import SignalBook
 
 load_dotenv()
+logger = setup_logging("trading_bot", console=False)
 BINANCE_API_KEY = os.getenv("BINANCE_API_KEY")
 BINANCE_SECRET_KEY = os.getenv("BINANCE_SECRET_KEY")
 
 redis_client = redis.Redis(host="redis", port=6379, db=0, decode_responses=True)
-pubsub = redis_client.pubsub()
-pubsub.subscribe("trade_signals")
+raw_redis_client = redis.Redis(host="redis", port=6379, db=0)  # Trade messages may use the binary codec
+SIGNAL_CHANNEL = TRADE_SIGNALS_CHANNEL
+EXECUTE_CONSUMER_GROUP = "execute"
+RESUBSCRIBE_DELAY_SECONDS = 5
 
-exchange = ccxt.binance({
-    'apiKey': BINANCE_API_KEY,
-    'secret': BINANCE_SECRET_KEY,
-    'enableRateLimit': True
-})
+db = storage.connect()
+if EXCHANGE == "paper":
+    exchange = PaperExchange(db[storage.TRADES])
+else:
+    exchange = ccxt.binance({
+        'apiKey': BINANCE_API_KEY,
+        'secret': BINANCE_SECRET_KEY,
+        'enableRateLimit': False  # Request weights are budgeted by RateLimitedExchange
+    })
+exchange = RateLimitedExchange(exchange)
+ledger = Ledger(exchange, ORDER_SYMBOL)
 
-client = MongoClient("mongodb://mongodb:27017/")
-db = client["trading_db"]
-orders_collection = db.get_collection("trade_orders")
-signals_collection = db.get_collection("trade_signals")
+orders_collection = db[storage.ORDERS]
+signals_collection = db[storage.SIGNALS]
+signal_book = SignalBook(signals_collection, on_finished=lambda signal_ids: ack_signals(signal_ids))
+signal_consumer = None  # Streams transport only, see consume_signal_stream
+unacked_signals = {}  # signal id -> stream entry id, acked once the signal's final status is written
 
 ORDER_COOLDOWN_SECONDS = 0
 
 logger.info("📡 Trade Execution Service Started...")
 
 
-def get_unsent_trade_signal():
-    try:
-        signal = signals_collection.find_one({"status": "pending"}, sort=[("timestamp", -1)])
-        return signal
-    except Exception as e:
-        logger.error(f"❌ Error fetching pending trade signals: {e}")
-        return None
+async def place_order(signal, price, trace=None, signal_id=None, amount=ORDER_SIZE, merged_ids=()):
+    """
+    Send one market order. Coalesced orders (see order_scheduler.py) cover several signals: the order is keyed by
+    the last one and `merged_ids` get the same final status.
+    """
+    symbol = ORDER_SYMBOL
+    order_size = amount
+    sl_percent = STOP_LOSS_PERCENT
+    tp_percent = TAKE_PROFIT_PERCENT
 
+    def finish(status, **fields):
+        for finished_id in (signal_id, *merged_ids):
+            signal_book.finish(finished_id, status, **fields)
 
-def place_order(signal, price):
-    symbol = "BTC/USDT"
-    order_size = 0.0001
-    sl_percent = 1  # Stop-Loss at 1%
-    tp_percent = 2  # Take-Profit at 2%
-    lock_key = f"trade_lock_{signal}_{price}"
-    lock = redis_client.set(lock_key, "locked", ex=5, nx=True)
+    lock_key = f"trade_lock_{signal_id}" if signal_id else f"trade_lock_{signal}_{price}"
+    lock = await redis_client.set(lock_key, "locked", ex=5, nx=True)
     if not lock:
         logger.warning(f"🚫 Skipping trade {signal} at {price}, already being processed by another instance.")
         return None
     try:
-        last_trade = orders_collection.find_one({"side": signal}, sort=[("timestamp", -1)])
+        last_trade = await asyncio.to_thread(storage.last_order, orders_collection, signal)
         if last_trade:
-            last_trade_time = datetime.strptime(last_trade["timestamp"], "%Y-%m-%dT%H:%M:%S.%f")
-            elapsed_time = datetime.utcnow() - last_trade_time
-            if elapsed_time < timedelta(seconds=ORDER_COOLDOWN_SECONDS):
-                logger.warning(f"🚫 Skipping trade: Cooldown active ({elapsed_time.seconds}s elapsed)")
+            elapsed_ms = wall_ms() - last_trade["timestamp"]
+            if elapsed_ms < ORDER_COOLDOWN_SECONDS * 1000:
+                logger.warning(f"🚫 Skipping trade: Cooldown active ({elapsed_ms // 1000}s elapsed)")
+                finish("failed", reason="cooldown")
                 return None
 
-        balance = exchange.fetch_balance()
-        ticker = exchange.fetch_ticker(symbol)
-        current_price_BTC = ticker['last']
+        # Served from the ledger; REST is only hit when the cached values are past their staleness bound.
+        balance, current_price_BTC = await ledger.snapshot()
 
-        logger.info(f"🔍 BTC Price: {current_price_BTC}, BTC Balance: {balance['BTC']['free']}, USDT Balance: {balance['USDT']['free']}")
+        logger.info(f"🔍 BTC Price: {current_price_BTC}, BTC Balance: {balance.get('BTC', 0.0)}, USDT Balance: {balance.get('USDT', 0.0)}")
 
+        order_at = now_ns()
         if signal == "BUY":
-            if balance["USDT"]['free'] > order_size * current_price_BTC:
-                order = exchange.create_market_buy_order(symbol, order_size)
+            if balance.get("USDT", 0.0) > order_size * current_price_BTC:
+                order = await exchange.create_market_buy_order(symbol, order_size)
             else:
-                logger.error(f"❌ INSUFFICIENT USDT: {balance['USDT']['free']}")
+                logger.error(f"❌ INSUFFICIENT USDT: {balance.get('USDT', 0.0)}")
+                metrics.inc("orders_rejected_total", symbol=symbol, side=signal, reason="insufficient_balance")
+                finish("failed", reason="insufficient_balance")
                 return None
         elif signal == "SELL":
-            if balance["BTC"]['free'] > order_size:
-                order = exchange.create_market_sell_order(symbol, order_size)
+            if balance.get("BTC", 0.0) > order_size:
+                order = await exchange.create_market_sell_order(symbol, order_size)
             else:
-                logger.error(f"❌ INSUFFICIENT BTC: {balance['BTC']['free']}")
+                logger.error(f"❌ INSUFFICIENT BTC: {balance.get('BTC', 0.0)}")
+                metrics.inc("orders_rejected_total", symbol=symbol, side=signal, reason="insufficient_balance")
+                finish("failed", reason="insufficient_balance")
                 return None
         else:
             logger.warning("⚠️ Invalid trade signal detected.")
+            finish("failed", reason="invalid_signal")
             return None
+        ack_at = now_ns()
+        latency, execution_time = record_latency(trace or {}, order_at, ack_at)
+        metrics.inc("trade_executed_total", symbol=symbol, side=signal)
+        metrics.observe("trade_execution_latency", execution_time)
+
+        ledger.apply_fill(signal, order.get("filled") or order_size, order.get("average") or current_price_BTC)
 
         stop_loss_price = price * (1 - sl_percent / 100) if signal == "BUY" else price * (1 + sl_percent / 100)
         take_profit_price = price * (1 + tp_percent / 100) if signal == "BUY" else price * (1 - tp_percent / 100)
@@ -88,71 +119,243 @@ def place_order(signal, price):
         #exchange.create_order(symbol, 'LIMIT', signal, order_size, take_profit_price) # commented since there is no sufficient balance in my current account => TODO: needs to be tested again
 
         trade_data = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": wall_ms(),
             "symbol": symbol,
             "side": signal,
             "amount": order_size,
             "price": price,
             "stop_loss": stop_loss_price,
             "take_profit": take_profit_price,
-            "status": "filled"
+            "status": "filled",
+            "signal_id": signal_id,
+            "merged_signal_ids": list(merged_ids),
+            "execution_time": execution_time,
+            "latency": latency
         }
 
-        result = orders_collection.insert_one(trade_data)
+        result = await asyncio.to_thread(orders_collection.insert_one, trade_data)
         if result.inserted_id:
             logger.info(f"✅ Order successfully inserted with ID: {result.inserted_id}")
         else:
             logger.error("❌ Order insertion failed!")
 
-        update_result = signals_collection.update_one(
-            {"signal": signal, "price": price, "status": "pending"},
-            {"$set": {"status": "filled"}}
-        )
-
-        if update_result.modified_count > 0:
-            logger.info(f"✅ Trade signal updated successfully for signal: {signal} at price: {price}")
-        else:
-            logger.warning(f"⚠️ No updates were made (already marked as 'filled') for signal: {signal} at price: {price}.")
+        finish("filled", order_id=str(result.inserted_id))
 
         trade_data["_id"] = str(result.inserted_id)
-        redis_client.publish("trade_channel", json.dumps(trade_data))
+        await redis_client.publish("trade_channel", json.dumps(trade_data))
         logger.info(f"✅ Trade Executed & Stored: {trade_data}")
 
         return order
 
     except Exception as e:
         logger.error(f"❌ Trade Execution Failed: {e}")
+        metrics.inc("trade_execution_errors", symbol=symbol, side=signal)
+        finish("failed", reason="error")
         return None
     finally:
-        redis_client.delete(lock_key)
+        await redis_client.delete(lock_key)
+
+
+def record_latency(trace, order_at, ack_at):
+    """Per-stage latencies (seconds) for one order, plus tick-to-ack time for trade_orders.execution_time."""
+    latency = {
+        "feed_to_strategy": seconds_between(trace.get("tick_received_at"), trace.get("strategy_at")),
+        "strategy_to_signal": seconds_between(trace.get("strategy_at"), trace.get("signal_at")),
+        "signal_to_order": observe("signal_to_order", trace.get("signal_at"), order_at),
+        "order_to_ack": observe("order_to_ack", order_at, ack_at),
+    }
+    if trace.get("tick_event_time"):
+        metrics.observe(TICK_TO_TRADE_METRIC, (wall_ms() - trace["tick_event_time"]) / 1000)
+    start = trace.get("tick_received_at") or trace.get("signal_at") or order_at
+    return latency, (ack_at - start) / 1e9
+
+
+def seconds_between(start_ns, end_ns):
+    return (end_ns - start_ns) / 1e9 if start_ns and end_ns else None
+
+
+async def handle_signal(signal_data):
+    """Claim a signal and queue it for execution; False if it was ignored (its final status is not pending then)."""
+    signal_type = signal_data["signal"]
+    signal_price = signal_data["price"]
 
+    symbol = signal_data.get("symbol")
+    if symbol and symbol != ORDER_SYMBOL.replace("/", ""):
+        logger.info(f"⏭️ Ignoring {signal_type} signal for {symbol}; this bot trades {ORDER_SYMBOL}")
+        signal_book.finish(signal_data.get("_id"), "ignored", reason="symbol_not_traded")
+        return False
 
-def listen_for_trade_signals():
+    logger.info(f"📊 New Signal Received: {signal_type} at {signal_price} USDT")
+    metrics.inc("signals_received_total", side=signal_type)
+
+    signal_id = signal_data.get("_id")
+    claimed = await signal_book.claim(signal_id)
+    if not claimed:
+        logger.info(f"🚫 Order already processed for signal {signal_id}: {signal_type} at {signal_price}")
+        return False
+    if claimed["status"] == "locked":
+        # Taken over from an instance that crashed; it may have placed the order before it could record the status.
+        order = await asyncio.to_thread(lambda: next(storage.signal_orders(orders_collection, signal_id), None))
+        if order is not None:
+            logger.warning(f"♻️ Signal {signal_id} was already traded by order {order['_id']}")
+            signal_book.finish(signal_id, "filled", order_id=str(order["_id"]))
+            return True
+        logger.warning(f"♻️ Retrying signal {signal_id} abandoned by a crashed instance")
+    order_scheduler.submit(signal_data)
+    return True
+
+
+async def execute_order(order):
+    """Scheduler callback: place one (possibly coalesced) order."""
+    started = time.perf_counter()
+    result = await place_order(order["side"], order["price"], order["trace"], order["signal_id"], order["amount"],
+                               order["merged_ids"])
+    if result:
+        logger.info(f"⏱️ Queued to order: {(time.perf_counter() - started) * 1000:.1f} ms "
+                    f"({len(order['merged_ids']) + 1} signal(s), {order['amount']} {order['side']})")
+    return result
+
+
+def cancel_signals(signals, reason):
+    for signal in signals:
+        logger.info(f"🔀 {signal['signal']} signal {signal.get('_id')} at {signal['price']} dropped ({reason})")
+        signal_book.finish(signal.get("_id"), "cancelled" if reason == "coalesced" else "failed", reason=reason)
+
+
+order_scheduler = OrderScheduler(execute_order, cancel_signals)
+
+
+async def listen_for_trade_signals():
     logger.info("🎧 Listening for trade signals...")
+    if MESSAGE_TRANSPORT == "streams":
+        await consume_signal_stream()
+        return
 
     while True:
+        pubsub = redis_client.pubsub()
         try:
-            message = pubsub.get_message(ignore_subscribe_messages=True)
-            if message:
-                signal_data = json.loads(message["data"])
-                signal_type = signal_data["signal"]
-                signal_price = signal_data["price"]
+            await pubsub.subscribe(SIGNAL_CHANNEL)
+            # listen() blocks on the socket, so a signal is picked up as soon as it is published.
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    await handle_signal(decode(message["data"]))
+                except Exception as e:
+                    logger.error(f"❌ Error handling trade signal: {e}")
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error listening for trade signals: {e}")
+            await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+        finally:
+            await pubsub.aclose()
 
-                logger.info(f"📊 New Signal Received: {signal_type} at {signal_price} USDT")
 
-                latest_signal = signals_collection.find_one({"signal": signal_type, "price": signal_price, "status": "pending"})
-                if latest_signal:
-                    place_order(signal_type, signal_price)
+async def consume_signal_stream():
+    """
+    Streams transport: execution workers share the "execute" consumer group. A queued signal is acked only once
+    its final status is written (ack_signals), so a crash before that leaves the entry pending for redelivery.
+    """
+    global signal_consumer
+    consumer = signal_consumer = AsyncStreamConsumer(redis_client, SIGNAL_CHANNEL, EXECUTE_CONSUMER_GROUP)
+    await consumer.ensure_group()
+
+    while True:
+        try:
+            batch = await consumer.read()
+        except Exception as e:
+            logger.error(f"❌ Error reading trade signal stream: {e}")
+            await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+            continue
+
+        for entry_id, data in batch:
+            queued = False
+            if data is not None:
+                try:
+                    signal_data = decode(data)
+                except Exception as e:
+                    logger.error(f"❌ Error decoding trade signal {entry_id}: {e}")
                 else:
-                    logger.info(f"🚫 Order already processed for signal: {signal_type} at {signal_price}")
+                    try:
+                        queued = await handle_signal(signal_data)
+                    except Exception as e:
+                        # Left unacked: the entry is claimed again once idle, and the signal is still pending.
+                        logger.error(f"❌ Error handling trade signal {signal_data.get('_id')}, will retry: {e}")
+                        continue
+            if queued:
+                unacked_signals[signal_data["_id"]] = entry_id
+            else:
+                await consumer.ack([entry_id])
 
-            time.sleep(1)
 
+async def ack_signals(signal_ids):
+    entry_ids = [unacked_signals.pop(signal_id) for signal_id in signal_ids if signal_id in unacked_signals]
+    if entry_ids:
+        await signal_consumer.ack(entry_ids)
+
+
+async def follow_prices():
+    """Keeps the ledger price current from the raw trades the data feed already publishes."""
+    if MESSAGE_TRANSPORT == "streams":
+        await follow_price_stream()
+        return
+
+    while True:
+        pubsub = raw_redis_client.pubsub()
+        try:
+            await pubsub.subscribe(trade_channel(ORDER_SYMBOL.replace("/", "")))
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    ledger.on_tick(decode(message["data"])["price"])
+
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error(f"❌ Error listening for trade signals: {e}")
-            time.sleep(5)
+            logger.error(f"❌ Error following prices: {e}")
+            await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+        finally:
+            await pubsub.aclose()
+
+
+async def follow_price_stream():
+    # Every execution worker needs every price, so this tails the stream without a consumer group.
+    stream, last_id = trade_channel(ORDER_SYMBOL.replace("/", "")), "$"
+    while True:
+        try:
+            response = await raw_redis_client.xread({stream: last_id}, count=1000, block=1000)
+            for _, entries in response or []:
+                last_id, fields = entries[-1]
+                ledger.on_tick(decode(fields[b"data"])["price"])
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error following prices: {e}")
+            await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+
+
+async def main():
+    metrics.start("execute")
+    await asyncio.to_thread(storage.ensure_schema, db)
+    # Markets and the ledger are loaded up front so the first order does not pay for them.
+    await exchange.load_markets()
+    await ledger.refresh()
+    background = [asyncio.create_task(follow_prices()), asyncio.create_task(ledger.reconcile_forever()),
+                  asyncio.create_task(signal_book.flush_forever()), asyncio.create_task(order_scheduler.run())]
+    try:
+        await listen_for_trade_signals()
+    finally:
+        for task in background:
+            task.cancel()
+        await order_scheduler.drain()
+        await signal_book.flush()
+        await exchange.close()
+        await redis_client.aclose()
+        await raw_redis_client.aclose()
 
 
 if __name__ == "__main__":
     logger.info("🚀 Trading bot started and will run continuously!")
-    listen_for_trade_signals()
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+import math
+
+RESYNC_INTERVAL = 100_000  # Recompute running sums from the ring buffer every N updates to cancel float drift
+
+
+def crossover_signal(short_sma, long_sma, last_signal):
+    """SMA crossover rule: BUY/SELL when the SMA ordering differs from the last emitted signal, else None."""
+    if short_sma > long_sma and last_signal != "BUY":
+        return "BUY"
+    if short_sma < long_sma and last_signal != "SELL":
+        return "SELL"
+    return None
+
+
+class RingBuffer:
+    """Fixed-capacity circular buffer; ago(0) is the newest value."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.values = [0.0] * capacity
+        self.count = 0
+        self.index = 0
+
+    def append(self, value):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def ago(self, steps):
+        return self.values[(self.index - 1 - steps) % self.capacity]
+
+    def last(self, n):
+        return [self.ago(i) for i in range(n - 1, -1, -1)]
+
+    def __len__(self):
+        return self.count
+
+
+class IndicatorEngine:
+    """
+    O(1)-per-tick SMA, EMA, rolling std/Bollinger, RSI and VWAP over several windows at once.
+    Window-based indicators match their pandas rolling(window) equivalents; EMA matches ewm(span, adjust=False)
+    and RSI uses simple rolling means of gains and losses.
+    """
+
+    def __init__(self, sma_windows=(), ema_windows=(), bollinger_windows=(), rsi_windows=(), vwap_windows=(),
+                 bollinger_k=2.0):
+        self.sma_windows = tuple(sma_windows)
+        self.ema_windows = tuple(ema_windows)
+        self.bollinger_windows = tuple(bollinger_windows)
+        self.rsi_windows = tuple(rsi_windows)
+        self.vwap_windows = tuple(vwap_windows)
+        self.bollinger_k = bollinger_k
+
+        self._mean_windows = sorted(set(self.sma_windows) | set(self.bollinger_windows))
+        capacity = max((*self._mean_windows, *self.vwap_windows, *(w + 1 for w in self.rsi_windows), 1)) + 1
+        self.prices = RingBuffer(capacity)
+        self.quantities = RingBuffer(capacity)
+        self.reset()
+
+    def reset(self):
+        self.prices.count = self.prices.index = 0
+        self.quantities.count = self.quantities.index = 0
+        self.updates = 0
+        self._mean = {w: 0.0 for w in self._mean_windows}
+        self._m2 = {w: 0.0 for w in self.bollinger_windows}
+        self._ema = {w: None for w in self.ema_windows}
+        self._gains = {w: 0.0 for w in self.rsi_windows}
+        self._losses = {w: 0.0 for w in self.rsi_windows}
+        self._pv = {w: 0.0 for w in self.vwap_windows}
+        self._volume = {w: 0.0 for w in self.vwap_windows}
+
+    def update(self, price, quantity=0.0):
+        prices = self.prices
+        prices.append(price)
+        self.quantities.append(quantity)
+        self.updates += 1
+        n = len(prices)
+
+        for w in self._mean_windows:
+            old_mean = self._mean[w]
+            if n <= w:
+                new_mean = old_mean + (price - old_mean) / n
+                if w in self._m2:
+                    self._m2[w] += (price - old_mean) * (price - new_mean)
+            else:
+                outgoing = prices.ago(w)
+                new_mean = old_mean + (price - outgoing) / w
+                if w in self._m2:
+                    self._m2[w] += (price - outgoing) * (price - new_mean + outgoing - old_mean)
+            self._mean[w] = new_mean
+
+        for w in self.ema_windows:
+            ema = self._ema[w]
+            alpha = 2.0 / (w + 1)
+            self._ema[w] = price if ema is None else ema + alpha * (price - ema)
+
+        if n >= 2:
+            delta = price - prices.ago(1)
+            for w in self.rsi_windows:
+                self._gains[w] += max(delta, 0.0)
+                self._losses[w] += max(-delta, 0.0)
+                if n > w + 1:
+                    outgoing = prices.ago(w) - prices.ago(w + 1)
+                    self._gains[w] -= max(outgoing, 0.0)
+                    self._losses[w] -= max(-outgoing, 0.0)
+
+        for w in self.vwap_windows:
+            self._pv[w] += price * quantity
+            self._volume[w] += quantity
+            if n > w:
+                outgoing_quantity = self.quantities.ago(w)
+                self._pv[w] -= prices.ago(w) * outgoing_quantity
+                self._volume[w] -= outgoing_quantity
+
+        if self.updates % RESYNC_INTERVAL == 0:
+            self._resync()
+
+    def _resync(self):
+        n = len(self.prices)
+        for w in self._mean_windows:
+            values = self.prices.last(min(n, w))
+            mean = math.fsum(values) / len(values)
+            self._mean[w] = mean
+            if w in self._m2:
+                self._m2[w] = math.fsum((v - mean) ** 2 for v in values)
+        for w in self.rsi_windows:
+            values = self.prices.last(min(n, w + 1))
+            deltas = [b - a for a, b in zip(values, values[1:])]
+            self._gains[w] = math.fsum(d for d in deltas if d > 0)
+            self._losses[w] = math.fsum(-d for d in deltas if d < 0)
+        for w in self.vwap_windows:
+            prices, quantities = self.prices.last(min(n, w)), self.quantities.last(min(n, w))
+            self._pv[w] = math.fsum(p * q for p, q in zip(prices, quantities))
+            self._volume[w] = math.fsum(quantities)
+
+    def ready(self, window):
+        return len(self.prices) >= window
+
+    def sma(self, window):
+        return self._mean[window] if self.ready(window) else None
+
+    def ema(self, window):
+        return self._ema[window]
+
+    def std(self, window):
+        if not self.ready(window) or window < 2:
+            return None
+        return math.sqrt(max(self._m2[window], 0.0) / (window - 1))
+
+    def bollinger(self, window):
+        """Returns (middle, upper, lower) bands."""
+        std = self.std(window)
+        if std is None:
+            return None
+        middle = self._mean[window]
+        return middle, middle + self.bollinger_k * std, middle - self.bollinger_k * std
+
+    def rsi(self, window):
+        if not self.ready(window + 1):
+            return None
+        gains, losses = max(self._gains[window], 0.0), max(self._losses[window], 0.0)
+        if losses == 0:
+            return 100.0 if gains > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + gains / losses)
+
+    def vwap(self, window):
+        if not self.ready(window) or self._volume[window] <= 0:
+            return None
+        return self._pv[window] / self._volume[window]
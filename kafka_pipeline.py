@@ -0,0 +1,174 @@
+import logging
+import time
+from collections import Counter
+from bson import ObjectId
+from confluent_kafka import KafkaError, KafkaException, Producer
+from codec import decode, encode
+from configuration import (KAFKA_BROKER, KAFKA_TOPIC, KAFKA_BATCH_SIZE, KAFKA_BATCH_TIMEOUT, KAFKA_LINGER_MS,
+                           KAFKA_COMPRESSION, KAFKA_MAX_IN_FLIGHT, MESSAGE_TRANSPORT, trade_channel)
+from metrics import metrics
+from redis_streams import publish
+from storage import insert_new_trades
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY_SECONDS = 1
+TRADE_FIELDS = ("symbol", "price", "quantity", "timestamp", "trade_id", "received_at")
+PRODUCER_BATCH_BYTES = 1_000_000
+PRODUCER_FLUSH_TIMEOUT = 10
+
+
+def to_trade_record(payload):
+    record = {field: payload[field] for field in TRADE_FIELDS if field in payload}
+    # Producers send the _id, so a batch replayed after a crash hits duplicate keys instead of doubling trades.
+    record["_id"] = ObjectId(payload["_id"]) if payload.get("_id") else ObjectId()
+    return record
+
+
+class TradeBatchConsumer:
+    """
+    Batched trade_data consumption: consume() up to batch_size messages, insert_many them, pipeline the Redis
+    publishes, roll the new trades up into bars and only then commit the offsets. A batch whose writes fail is
+    retried before anything new is consumed, so a crash at any point replays from the last commit and loses nothing.
+    """
+
+    def __init__(self, consumer, collection, redis_client, batch_size=KAFKA_BATCH_SIZE, timeout=KAFKA_BATCH_TIMEOUT,
+                 transport=MESSAGE_TRANSPORT, rollups=None):
+        self.consumer = consumer
+        self.collection = collection
+        self.redis_client = redis_client
+        self.rollups = rollups
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.transport = transport
+        self._pending = None
+
+    def poll_batch(self):
+        """Consume, write and commit one batch; returns the number of trades written."""
+        if self._pending is None:
+            messages = self.consumer.consume(num_messages=self.batch_size, timeout=self.timeout)
+            records = self._records(messages)
+            if all(msg.error() for msg in messages):
+                return 0  # Nothing or only error events: no offset moved, so there is nothing to commit
+            self._pending = records
+
+        records = self._pending
+        if records:
+            self._write(records)
+        self._commit()
+        self._pending = None
+
+        for symbol, count in Counter(record["symbol"] for record in records).items():
+            metrics.inc("ticks_consumed_total", count, symbol=symbol)
+        return len(records)
+
+    def run(self, should_stop=lambda: False):
+        while not should_stop():
+            try:
+                self.poll_batch()
+            except Exception as e:
+                logger.error(f"❌ Kafka batch failed, retrying: {e}")
+                time.sleep(RETRY_DELAY_SECONDS)
+
+    def _commit(self):
+        try:
+            self.consumer.commit(asynchronous=False)
+        except KafkaException as e:
+            # librdkafka refuses a commit without new offsets (e.g. after a rebalance); the batch is still done.
+            if e.args[0].code() != KafkaError._NO_OFFSET:
+                raise
+            logger.warning(f"⚠️ No offsets to commit: {e}")
+
+    def _records(self, messages):
+        records = []
+        for msg in messages:
+            error = msg.error()
+            if error:
+                # Partition EOF is informational; anything else is logged and the message skipped.
+                if error.code() != KafkaError._PARTITION_EOF:
+                    logger.error(f"❌ Kafka Error: {error}")
+                continue
+            try:
+                records.append(to_trade_record(decode(msg.value())))
+            except Exception as e:
+                logger.error(f"❌ Skipping malformed trade message at offset {msg.offset()}: {e}")
+        return records
+
+    def _write(self, records):
+        new = insert_new_trades(self.collection, records)
+        if len(new) < len(records):
+            logger.warning(f"⚠️ {len(records) - len(new)} trades were already stored (replayed batch)")
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for record in records:
+            channel = trade_channel(record["symbol"])
+            publish(pipe, channel, encode(channel, record), self.transport)
+        pipe.execute()
+
+        if self.rollups is not None:
+            self.rollups.add(new)  # Replayed trades are already in their bars
+
+
+def producer_config(broker=KAFKA_BROKER, linger_ms=KAFKA_LINGER_MS, compression=KAFKA_COMPRESSION,
+                    max_in_flight=KAFKA_MAX_IN_FLIGHT):
+    return {
+        "bootstrap.servers": broker,
+        "linger.ms": linger_ms,  # Let ticks accumulate into larger, better compressed batches
+        "batch.size": PRODUCER_BATCH_BYTES,
+        "compression.type": compression,
+        "queue.buffering.max.messages": max_in_flight,
+        "enable.idempotence": True,  # Broker-side retries can't duplicate or reorder a symbol's ticks
+    }
+
+
+class KafkaTickSink:
+    """
+    Produces the raw feed to the trade_data topic, keyed by symbol so each symbol stays on one partition.
+    submit() never blocks the websocket loop: at most max_in_flight ticks await delivery, newer ones are
+    dropped (and counted) beyond that. Delivery reports are served by poll() on every submit.
+    """
+
+    def __init__(self, producer=None, topic=KAFKA_TOPIC, max_in_flight=KAFKA_MAX_IN_FLIGHT):
+        self.producer = producer if producer is not None else Producer(producer_config(max_in_flight=max_in_flight))
+        self.topic = topic
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.stats = {"produced": 0, "delivered": 0, "failed": 0, "dropped": 0}
+
+    def submit(self, trade_record):
+        """Queue a tick for Kafka. Returns False if it had to be dropped."""
+        self.producer.poll(0)
+        symbol = trade_record["symbol"]
+        if self.in_flight >= self.max_in_flight:
+            return self._drop(symbol)
+        try:
+            self.producer.produce(self.topic, key=symbol.encode(), value=encode(self.topic, trade_record),
+                                  on_delivery=self._on_delivery)
+        except BufferError:
+            return self._drop(symbol)
+        self.in_flight += 1
+        self.stats["produced"] += 1
+        metrics.set("kafka_in_flight", self.in_flight)
+        return True
+
+    def flush(self, timeout=PRODUCER_FLUSH_TIMEOUT):
+        """Wait for outstanding deliveries; returns the number of ticks still undelivered."""
+        remaining = self.producer.flush(timeout)
+        logger.info(f"📤 Kafka sink stats: {self.stats} (undelivered: {remaining})")
+        return remaining
+
+    def _drop(self, symbol):
+        self.stats["dropped"] += 1
+        metrics.inc("kafka_ticks_dropped_total", symbol=symbol)
+        return False
+
+    def _on_delivery(self, error, message):
+        self.in_flight -= 1
+        metrics.set("kafka_in_flight", self.in_flight)
+        if error is not None:
+            self.stats["failed"] += 1
+            metrics.inc("kafka_delivery_failed_total")
+            logger.error(f"❌ Kafka delivery failed for {message.key()}: {error}")
+        else:
+            self.stats["delivered"] += 1
+            metrics.inc("kafka_ticks_produced_total")
@@ -0,0 +1,25 @@
+import time
+from metrics import metrics
+
+# Stage stamps are time.monotonic_ns(); CLOCK_MONOTONIC is shared by every process (and container) on one host,
+# so stamps taken in data_feed, strategy and execute can be subtracted from each other.
+STAGES = ("feed_to_strategy", "strategy_to_signal", "signal_to_order", "order_to_ack")
+STAGE_METRIC = "tick_to_trade_stage_seconds"
+TICK_TO_TRADE_METRIC = "tick_to_trade_seconds"  # Exchange trade time to order acknowledgement
+
+now_ns = time.monotonic_ns
+
+
+def wall_ms():
+    return time.time_ns() // 1_000_000
+
+
+def observe(stage, start_ns, end_ns):
+    """Record one stage; returns its latency in seconds, or None when the start stamp is missing."""
+    if stage not in STAGES:
+        raise ValueError(f"Unknown tick-to-trade stage {stage!r}, expected one of {STAGES}")
+    if start_ns is None or end_ns is None:
+        return None
+    seconds = (end_ns - start_ns) / 1e9
+    metrics.observe(STAGE_METRIC, seconds, stage=stage)
+    return seconds
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+from configuration import (ORDER_SYMBOL, BALANCE_MAX_STALENESS_SECONDS, PRICE_MAX_STALENESS_SECONDS,
+                           LEDGER_RECONCILE_SECONDS)
+
+logger = logging.getLogger(__name__)
+
+DRIFT_TOLERANCE = 1e-9
+
+
+class Ledger:
+    """
+    Local view of free balances and the last price for one market, so order checks don't need REST calls.
+    Seeded from a single fetch_balance/fetch_ticker snapshot, moved by our own fills (apply_fill) and by the
+    trade stream (on_tick), and reconciled with the exchange every LEDGER_RECONCILE_SECONDS.
+    Anything older than its staleness bound is refetched before it is used.
+    """
+
+    def __init__(self, exchange, symbol=ORDER_SYMBOL, balance_max_staleness=BALANCE_MAX_STALENESS_SECONDS,
+                 price_max_staleness=PRICE_MAX_STALENESS_SECONDS, clock=time.monotonic):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.base, self.quote = symbol.split("/")
+        self.balance_max_staleness = balance_max_staleness
+        self.price_max_staleness = price_max_staleness
+        self.clock = clock
+
+        self.balances = {}
+        self.price = None
+        self.balance_updated = None
+        self.price_updated = None
+        self._refresh_lock = asyncio.Lock()
+
+    def balance_stale(self):
+        return self.balance_updated is None or self.clock() - self.balance_updated > self.balance_max_staleness
+
+    def price_stale(self):
+        return self.price_updated is None or self.clock() - self.price_updated > self.price_max_staleness
+
+    def free(self, asset):
+        return self.balances.get(asset, 0.0)
+
+    def on_tick(self, price):
+        self.price = price
+        self.price_updated = self.clock()
+
+    def apply_fill(self, side, amount, price, fee=0.0):
+        """Move balances for one of our own fills; fee is charged in the quote currency."""
+        cost = amount * price
+        if side == "BUY":
+            self.balances[self.base] = self.free(self.base) + amount
+            self.balances[self.quote] = self.free(self.quote) - cost - fee
+        else:
+            self.balances[self.base] = self.free(self.base) - amount
+            self.balances[self.quote] = self.free(self.quote) + cost - fee
+
+    async def refresh(self, balance=True, price=True):
+        calls = []
+        if balance:
+            calls.append(self.exchange.fetch_balance())
+        if price:
+            calls.append(self.exchange.fetch_ticker(self.symbol))
+        results = await asyncio.gather(*calls)
+
+        now = self.clock()
+        if price:
+            self.price = results.pop()["last"]
+            self.price_updated = now
+        if balance:
+            fetched = results.pop()
+            self.balances = {asset: fetched[asset]["free"] for asset in (self.base, self.quote) if asset in fetched}
+            self.balance_updated = now
+
+    async def snapshot(self):
+        """Free balances and price, refetching (once, even with concurrent callers) whatever is stale."""
+        if self.balance_stale() or self.price_stale():
+            async with self._refresh_lock:
+                balance, price = self.balance_stale(), self.price_stale()
+                if balance or price:
+                    logger.info(f"🔄 Refreshing ledger (balance stale: {balance}, price stale: {price})")
+                    await self.refresh(balance, price)
+        return dict(self.balances), self.price
+
+    async def reconcile(self):
+        local = dict(self.balances)
+        async with self._refresh_lock:
+            await self.refresh(balance=True, price=False)
+        for asset, free in self.balances.items():
+            if asset in local and abs(local[asset] - free) > DRIFT_TOLERANCE:
+                logger.warning(f"⚠️ Ledger drift on {asset}: local {local[asset]}, exchange {free}")
+
+    async def reconcile_forever(self, interval=LEDGER_RECONCILE_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"❌ Ledger reconciliation failed: {e}")
@@ -0,0 +1,178 @@
+import argparse
+import json
+import logging
+import time
+from collections import Counter
+from urllib.request import urlopen
+import redis
+from configuration import METRICS_CHANNEL, MESSAGE_TRANSPORT, REPLAY_PORT, trade_channel
+from latency import STAGE_METRIC, TICK_TO_TRADE_METRIC
+from redis_streams import StreamConsumer
+
+logger = logging.getLogger(__name__)
+
+HARNESS_CONSUMER_GROUP = "load_harness"
+REPORT_INTERVAL_SECONDS = 5
+STRATEGY_CONSUMER_GROUP = "strategy"
+
+
+class PipelineStats:
+    """
+    Sums the metric batches the services push (see metrics.py) from the moment the harness subscribed:
+    counters and histograms are added up, gauges keep the latest value per service instance.
+    """
+
+    def __init__(self):
+        self.counters = Counter()
+        self.gauges = {}
+        self.histograms = {}
+
+    def apply(self, batch):
+        for name, labels, value in batch["counters"]:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+        for name, labels, value in batch["gauges"]:
+            self.gauges[(name, batch["instance"], tuple(sorted(labels.items())))] = value
+        for name, labels, bounds, counts, total in batch["histograms"]:
+            key = (name, tuple(sorted(labels.items())))
+            histogram = self.histograms.setdefault(key, [bounds, [0] * len(counts)])
+            histogram[1] = [a + b for a, b in zip(histogram[1], counts)]
+
+    def total(self, name, **labels):
+        return sum(value for (key, key_labels), value in self.counters.items()
+                   if key == name and labels.items() <= dict(key_labels).items())
+
+    def gauge_max(self, name):
+        return max((value for (key, _, _), value in self.gauges.items() if key == name), default=0)
+
+    def quantile(self, name, q, **labels):
+        """Upper bound of the bucket holding the q-quantile (inf past the last bound); None without samples."""
+        bounds, counts = None, None
+        for (key, key_labels), (key_bounds, key_counts) in self.histograms.items():
+            if key == name and labels.items() <= dict(key_labels).items():
+                bounds = key_bounds
+                counts = key_counts if counts is None else [a + b for a, b in zip(counts, key_counts)]
+        if not counts or not sum(counts):
+            return None
+        rank, cumulative = q * sum(counts), 0
+        for bound, count in zip(list(bounds) + [float("inf")], counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+def server_stats(url):
+    with urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def stream_lag(client, symbols, group=STRATEGY_CONSUMER_GROUP):
+    """Trade stream entries the strategy group has not acknowledged yet (Redis Streams transport only)."""
+    lag = 0
+    for symbol in symbols:
+        try:
+            groups = client.xinfo_groups(trade_channel(symbol))
+        except redis.ResponseError:
+            continue
+        for info in groups:
+            if info["name"] in (group, group.encode()):
+                lag += (info.get("lag") or 0) + info["pending"]
+    return lag
+
+
+def metric_batches(client, transport=MESSAGE_TRANSPORT, timeout=0.5):
+    """Yield the pushed metric batches as they arrive, and None whenever `timeout` passes without one."""
+    if transport == "streams":
+        consumer = StreamConsumer(client, METRICS_CHANNEL, HARNESS_CONSUMER_GROUP, block_ms=int(timeout * 1000))
+        consumer.ensure_group()
+        while True:
+            batch = consumer.read()
+            for _, data in batch:
+                if data is not None:
+                    yield json.loads(data)
+            consumer.ack([entry_id for entry_id, _ in batch])
+            if not batch:
+                yield None
+    else:
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(METRICS_CHANNEL)
+        while True:
+            message = pubsub.get_message(timeout=timeout)
+            yield json.loads(message["data"]) if message else None
+
+
+def report(stats, sent, elapsed, queue_lag):
+    received = stats.total("ticks_received_total")
+    written = stats.total("ticks_written_total")
+    processed = stats.total("trades_processed_total")
+    dropped_queue = stats.total("ticks_dropped_total")
+    return {
+        "elapsed_seconds": elapsed,
+        "sent": sent,
+        "received": received,
+        "written": written,
+        "processed": processed,
+        "signals": stats.total("signals_total"),
+        "signals_received": stats.total("signals_received_total"),
+        "orders": stats.total("trade_executed_total"),
+        "throughput": {name: count / elapsed if elapsed else 0.0 for name, count in
+                       (("sent_per_second", sent), ("received_per_second", received),
+                        ("written_per_second", written), ("processed_per_second", processed))},
+        "dropped": {
+            "feed_socket": max(sent - received, 0),  # Sent by the replay server but never seen by data_feed
+            "write_queue": dropped_queue,  # Evicted from the full TickWriter queue
+            "write_failed": stats.total("ticks_failed_total"),
+            "before_strategy": max(received - dropped_queue - processed, 0),  # In flight or lost on the way
+        },
+        "queue_lag": {"write_queue_depth_max": stats.gauge_max("write_queue_depth"), "strategy_stream": queue_lag},
+        "latency_seconds": {
+            "feed_to_strategy_p99": stats.quantile(STAGE_METRIC, 0.99, stage="feed_to_strategy"),
+            "tick_to_trade_p50": stats.quantile(TICK_TO_TRADE_METRIC, 0.5),
+            "tick_to_trade_p99": stats.quantile(TICK_TO_TRADE_METRIC, 0.99),
+        },
+    }
+
+
+def run(client, stats_url, duration, interval=REPORT_INTERVAL_SECONDS, transport=MESSAGE_TRANSPORT):
+    stats = PipelineStats()
+    batches = metric_batches(client, transport)
+    start_sent = server_stats(stats_url)["sent"]
+    started = last_report = time.monotonic()
+    max_lag, max_depth = 0, 0
+    while True:
+        batch = next(batches)
+        if batch is not None:
+            stats.apply(batch)
+        now = time.monotonic()
+        if now - last_report < interval and now - started < duration:
+            continue
+        last_report = now
+        server = server_stats(stats_url)
+        lag = stream_lag(client, server["sent_by_symbol"]) if transport == "streams" else 0
+        max_lag = max(max_lag, lag)
+        max_depth = max(max_depth, stats.gauge_max("write_queue_depth"))
+        row = report(stats, server["sent"] - start_sent, now - started, lag)
+        logger.info(f"📊 {row['elapsed_seconds']:.0f}s sent {row['throughput']['sent_per_second']:.0f}/s, "
+                    f"stored {row['throughput']['written_per_second']:.0f}/s, "
+                    f"strategy {row['throughput']['processed_per_second']:.0f}/s, orders {row['orders']}, "
+                    f"dropped {row['dropped']}, queue lag {row['queue_lag']}")
+        if now - started >= duration:
+            row["queue_lag"] = {"write_queue_depth_max": max_depth, "strategy_stream_max": max_lag}
+            return row
+
+
+if __name__ == "__main__":
+    from logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="Report throughput, queue lag and drops of a running pipeline.")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to observe")
+    parser.add_argument("--interval", type=float, default=REPORT_INTERVAL_SECONDS)
+    parser.add_argument("--stats-url", default=f"http://replay_server:{REPLAY_PORT}/stats")
+    parser.add_argument("--output", default="load_report.json")
+    args = parser.parse_args()
+
+    setup_logging("load_harness")
+    result = run(redis.Redis(host="redis", port=6379, db=0), args.stats_url, args.duration, args.interval)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
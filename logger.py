@@ -1,20 +1,141 @@
 import os
+import json
+import time
+import atexit
+import queue
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 log_dir = os.getenv("LOG_DIR", "logs")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_JSON = os.getenv("LOG_JSON", "0") == "1"  # Also write <service>.jsonl with one JSON object per record
+LOG_SAMPLE_PER_SECOND = float(os.getenv("LOG_SAMPLE_PER_SECOND", "1"))  # Budget for per-tick messages
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
 
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir, exist_ok=True)
-
-log_file = os.path.join(log_dir, "trading_bot.log")
 log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s")
 
-file_handler = RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=3)
-file_handler.setFormatter(log_formatter)
+_listener = None
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread unformatted, so the caller only pays for creating the record;
+    %-style arguments are merged and the line is formatted/written off-thread (don't mutate them after the call).
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def __init__(self, service):
+        super().__init__()
+        self.service = service
+
+    def format(self, record):
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "service": self.service,
+            "logger": record.name,
+            "where": f"{record.filename}:{record.lineno}",
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)  # logger.info("...", extra={"fields": {...}})
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per message template: lets through `per_second` records per template (bursts up to `burst`)
+    and counts the rest, reporting the count on the next record that passes. Warnings and errors always pass.
+    """
+
+    def __init__(self, per_second=LOG_SAMPLE_PER_SECOND, burst=1, clock=time.monotonic):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst
+        self.clock = clock
+        self._buckets = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        now = self.clock()
+        tokens, last, suppressed = self._buckets.get(record.msg, (self.burst, now, 0))
+        tokens = min(self.burst, tokens + (now - last) * self.per_second)
+        if tokens < 1:
+            self._buckets[record.msg] = (tokens, now, suppressed + 1)
+            return False
+        self._buckets[record.msg] = (tokens - 1, now, 0)
+        if suppressed:
+            record.msg = f"{record.msg} [+{suppressed} similar suppressed]"
+        return True
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-logger.addHandler(file_handler)
 
-logger.info("🚀 Logging initialized successfully!")
+def get_sampled_logger(name, per_second=LOG_SAMPLE_PER_SECOND, burst=1):
+    """Logger for per-tick messages; use %-style arguments so suppressed records are never formatted."""
+    sampled = logging.getLogger(f"{name}.sampled")
+    if not any(isinstance(f, RateLimitFilter) for f in sampled.filters):
+        sampled.addFilter(RateLimitFilter(per_second, burst))
+    return sampled
+
+
+def setup_logging(service, directory=None, level=LOG_LEVEL, console=True, json_lines=LOG_JSON):
+    """
+    Configure the root logger for one service: a single queue handler in front of a listener thread that owns
+    the rotating <service>.log file, the console and (optionally) the <service>.jsonl sink.
+    Calling it again replaces the previous configuration.
+    """
+    global _listener
+    directory = directory or log_dir
+    os.makedirs(directory, exist_ok=True)
+
+    handlers = []
+    file_handler = RotatingFileHandler(os.path.join(directory, f"{service}.log"), maxBytes=LOG_MAX_BYTES,
+                                       backupCount=LOG_BACKUP_COUNT)
+    file_handler.setFormatter(log_formatter)
+    handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(log_formatter)
+        handlers.append(console_handler)
+    if json_lines:
+        json_handler = RotatingFileHandler(os.path.join(directory, f"{service}.jsonl"), maxBytes=LOG_MAX_BYTES,
+                                           backupCount=LOG_BACKUP_COUNT)
+        json_handler.setFormatter(JsonLinesFormatter(service))
+        handlers.append(json_handler)
+
+    shutdown_logging()
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(DeferredQueueHandler(records))
+    root.setLevel(level)
+
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    root.info(f"🚀 Logging initialized for {service} ({directory})")
+    return root
+
+
+def shutdown_logging():
+    """Drain the queue and close the sinks; registered with atexit."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+logger = logging.getLogger()
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import socket
+import threading
+from bisect import bisect_left
+from configuration import METRICS_CHANNEL, METRICS_FLUSH_SECONDS, MESSAGE_TRANSPORT
+from redis_streams import publish
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class MetricsBuffer:
+    """
+    Cheap in-process counters, gauges and histograms. Updates only touch a dict under a lock; a background thread
+    pushes the accumulated deltas, and the current value of every gauge, to the monitor as one message every
+    `flush_interval` seconds.
+    Histograms are pre-bucketed here, so the message size does not grow with the number of observations.
+    """
+
+    def __init__(self, service=None, flush_interval=METRICS_FLUSH_SECONDS, channel=METRICS_CHANNEL,
+                 transport=MESSAGE_TRANSPORT):
+        self.service = service
+        self.instance = f"{socket.gethostname()}-{os.getpid()}"
+        self.flush_interval = flush_interval
+        self.channel = channel
+        self.transport = transport
+        self.client = None
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._buckets = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name, value, buckets=None, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            bounds = self._buckets.setdefault(name, tuple(buckets or DEFAULT_BUCKETS))
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(bounds) + 1), 0.0]
+            histogram[0][bisect_left(bounds, value)] += 1
+            histogram[1] += value
+
+    def drain(self):
+        """Take the deltas since the last drain, plus the current gauges, as one monitor message (None when empty)."""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            gauges = dict(self._gauges)  # Re-sent on every push; the monitor expires gauges that stop arriving
+            histograms, self._histograms = self._histograms, {}
+        if not (counters or gauges or histograms):
+            return None
+        return {
+            "service": self.service,
+            "instance": self.instance,
+            "counters": [[name, dict(labels), value] for (name, labels), value in counters.items()],
+            "gauges": [[name, dict(labels), value] for (name, labels), value in gauges.items()],
+            "histograms": [[name, dict(labels), self._buckets[name], counts, total]
+                           for (name, labels), (counts, total) in histograms.items()],
+        }
+
+    def flush(self):
+        batch = self.drain()
+        if batch is not None and self.client is not None:
+            publish(self.client, self.channel, json.dumps(batch), self.transport)
+        return batch
+
+    def start(self, service, client=None):
+        """Name the service and start pushing; errors logged by the service are counted as they happen."""
+        self.service = service
+        if client is None:
+            import redis
+            client = redis.Redis(host="redis", port=6379, db=0)
+        self.client = client
+        logging.getLogger().addHandler(ErrorCountHandler(self))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-flush", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"⚠️ Metrics flush failed: {e}")
+
+
+class ErrorCountHandler(logging.Handler):
+    def __init__(self, buffer):
+        super().__init__(level=logging.ERROR)
+        self.buffer = buffer
+
+    def emit(self, record):
+        self.buffer.inc("errors_total", logger=record.name)
+
+
+metrics = MetricsBuffer()  # Process-wide buffer; services call metrics.start("<service>") once at startup
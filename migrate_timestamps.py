@@ -0,0 +1,69 @@
+import argparse
+import logging
+from pymongo import UpdateOne
+import storage
+from tick_store import to_epoch_ms
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+LEGACY = {"timestamp": {"$type": "string"}}  # ISO strings written before timestamps were epoch ms
+
+
+def trade_update(doc):
+    """Exchange event time when it was recorded, else the local receive time; the TTL date is backfilled too."""
+    timestamp = doc.get("event_time") or to_epoch_ms(doc["timestamp"])
+    return {"$set": {"timestamp": timestamp, storage.TIME_FIELD: storage.to_datetime(timestamp)},
+            "$unset": {"event_time": ""}}
+
+
+def timestamp_update(doc):
+    return {"$set": {"timestamp": to_epoch_ms(doc["timestamp"])}}
+
+
+MIGRATIONS = {
+    storage.TRADES: trade_update,
+    storage.SIGNALS: timestamp_update,
+    storage.ORDERS: timestamp_update,
+}
+
+
+def migrate(collection, update, batch_size=BATCH_SIZE, dry_run=False):
+    """Rewrite the ISO-string timestamps of one collection as epoch ms; safe to rerun. Returns the documents changed."""
+    if dry_run:
+        return collection.count_documents(LEGACY)
+    migrated = 0
+    requests = []
+    for doc in collection.find(LEGACY, {"timestamp": 1, "event_time": 1}).batch_size(batch_size):
+        requests.append(UpdateOne({"_id": doc["_id"]}, update(doc)))
+        if len(requests) == batch_size:
+            migrated += collection.bulk_write(requests, ordered=False).modified_count
+            requests = []
+    if requests:
+        migrated += collection.bulk_write(requests, ordered=False).modified_count
+    return migrated
+
+
+def is_timeseries(db, name):
+    return any(info.get("type") == "timeseries" for info in db.list_collections(filter={"name": name}))
+
+
+if __name__ == "__main__":
+    from logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="Convert stored ISO timestamps to epoch milliseconds.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Only count the documents left to migrate")
+    args = parser.parse_args()
+
+    setup_logging("migrate_timestamps")
+    db = storage.connect()
+    for name, update in MIGRATIONS.items():
+        if is_timeseries(db, name):
+            # Older MongoDB versions only update the metaField of time-series documents; re-import them instead.
+            logger.warning(f"⚠️ Skipping {name}: time-series collection")
+            continue
+        count = migrate(db[name], update, args.batch_size, args.dry_run)
+        logger.info(f"🛠️ {name}: {count} documents {'to migrate' if args.dry_run else 'migrated'}")
+    if not args.dry_run:
+        storage.ensure_schema(db)
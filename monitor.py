@@ -1,23 +1,119 @@
+import json
+import logging
+import threading
 import time
 import psutil
 import redis
 from flask import Flask, jsonify
-from pymongo import MongoClient
-from prometheus_client import Gauge, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Gauge, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from configuration import METRICS_CHANNEL, METRICS_FLUSH_SECONDS, MESSAGE_TRANSPORT
+from logger import setup_logging
+from redis_streams import StreamConsumer
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
 redis_client = redis.Redis(host="redis", port=6379, db=0)
 
-mongo_client = MongoClient("mongodb://mongodb:27017/")
-db = mongo_client["trading_db"]
-orders_collection = db.get_collection("trade_orders")
-
 CPU_USAGE = Gauge("cpu_usage_percent", "CPU usage percentage")
 MEMORY_USAGE = Gauge("memory_usage_percent", "Memory usage percentage")
-TRADE_LATENCY = Histogram("trade_execution_latency", "Latency per trade execution")
-TRADE_ERRORS = Counter("trade_execution_errors", "Count of failed trade executions")
-TRADE_COUNT = Counter("trade_executed_total", "Total trades executed")
+
+MONITOR_CONSUMER_GROUP = "monitor"
+GAUGE_TTL_SECONDS = 3 * METRICS_FLUSH_SECONDS  # Gauges of an instance that stopped pushing are dropped after this
+
+
+class PushedMetrics:
+    """
+    Aggregates the batches pushed by metrics.MetricsBuffer: counters and histogram buckets are summed,
+    gauges keep the latest value per service instance until they have not been pushed for `gauge_ttl` seconds
+    (restarted processes and respawned workers get a new instance). Exposed to Prometheus as a custom collector.
+    """
+
+    def __init__(self, gauge_ttl=GAUGE_TTL_SECONDS, clock=time.monotonic):
+        self.gauge_ttl = gauge_ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.batches = 0
+
+    def apply(self, batch):
+        service, instance = batch["service"], batch["instance"]
+        now = self.clock()
+        with self._lock:
+            self.batches += 1
+            for name, labels, value in batch["counters"]:
+                key = (name, self._labels(service, labels))
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, labels, value in batch["gauges"]:
+                self.gauges[(name, self._labels(service, labels, instance=instance))] = (value, now)
+            for name, labels, bounds, counts, total in batch["histograms"]:
+                key = (name, self._labels(service, labels))
+                histogram = self.histograms.get(key)
+                if histogram is None or histogram[0] != bounds:
+                    histogram = self.histograms[key] = [bounds, [0] * len(counts), 0.0]
+                histogram[1] = [a + b for a, b in zip(histogram[1], counts)]
+                histogram[2] += total
+
+    @staticmethod
+    def _labels(service, labels, **extra):
+        return tuple(sorted({**labels, **extra, "service": service}.items()))
+
+    def collect(self):
+        expired = self.clock() - self.gauge_ttl
+        with self._lock:
+            self.gauges = {key: sample for key, sample in self.gauges.items() if sample[1] >= expired}
+            counters = dict(self.counters)
+            gauges = {key: value for key, (value, _) in self.gauges.items()}
+            histograms = {key: (bounds, list(counts), total) for key, (bounds, counts, total) in self.histograms.items()}
+
+        for name, samples in self._by_name(counters).items():
+            names = self._names(samples)
+            family = CounterMetricFamily(name, f"{name} pushed by the services", labels=names)
+            for labels, value in samples:
+                family.add_metric(self._values(names, labels), value)
+            yield family
+        for name, samples in self._by_name(gauges).items():
+            names = self._names(samples)
+            family = GaugeMetricFamily(name, f"{name} pushed by the services", labels=names)
+            for labels, value in samples:
+                family.add_metric(self._values(names, labels), value)
+            yield family
+        for name, samples in self._by_name(histograms).items():
+            names = self._names(samples)
+            family = HistogramMetricFamily(name, f"{name} pushed by the services", labels=names)
+            for labels, (bounds, counts, total) in samples:
+                cumulative, buckets = 0, []
+                for bound, count in zip(list(bounds) + ["+Inf"], counts):
+                    cumulative += count
+                    buckets.append((str(bound), cumulative))
+                family.add_metric(self._values(names, labels), buckets, total)
+            yield family
+
+    @staticmethod
+    def _by_name(samples):
+        grouped = {}
+        for (name, labels), value in samples.items():
+            grouped.setdefault(name, []).append((labels, value))
+        return grouped
+
+    @staticmethod
+    def _names(samples):
+        """Label names of a metric over all its samples; not every sample carries every label."""
+        return sorted({name for labels, _ in samples for name, _ in labels})
+
+    @staticmethod
+    def _values(names, labels):
+        labels = dict(labels)
+        return [str(labels.get(name, "")) for name in names]
+
+
+pushed_metrics = PushedMetrics()
+REGISTRY.register(pushed_metrics)
+
 
 @app.route("/metrics")
 def metrics():
@@ -25,37 +121,39 @@ def metrics():
 
 @app.route("/health")
 def health():
-    return jsonify({"status": "healthy"}), 200
+    return jsonify({"status": "healthy", "metric_batches": pushed_metrics.batches}), 200
 
 def monitor_metrics():
     while True:
         CPU_USAGE.set(psutil.cpu_percent(interval=1))
         MEMORY_USAGE.set(psutil.virtual_memory().percent)
-
-        error_count = redis_client.get("error_count")
-        TRADE_ERRORS.inc(int(error_count) if error_count else 0)
-
         time.sleep(5)
 
-def monitor_trades():
-    """Monitor trade execution count & latency externally."""
-    last_checked = None
-
+def consume_pushed_metrics():
+    """Apply the metric batches the services push; no database polling involved."""
     while True:
-        latest_trade = orders_collection.find_one({}, sort=[("timestamp", -1)])
-        if latest_trade and latest_trade["timestamp"] != last_checked:
-            TRADE_COUNT.inc()
-
-            execution_latency = latest_trade.get("execution_time", 0.01)
-            TRADE_LATENCY.observe(execution_latency)
-
-            last_checked = latest_trade["timestamp"]
-            print(f"✅ New trade detected: {latest_trade}")
-
-        time.sleep(10)
+        try:
+            if MESSAGE_TRANSPORT == "streams":
+                consumer = StreamConsumer(redis_client, METRICS_CHANNEL, MONITOR_CONSUMER_GROUP)
+                consumer.ensure_group()
+                while True:
+                    batch = consumer.read()
+                    for _, data in batch:
+                        if data is not None:
+                            pushed_metrics.apply(json.loads(data))
+                    consumer.ack([entry_id for entry_id, _ in batch])
+            else:
+                pubsub = redis_client.pubsub()
+                pubsub.subscribe(METRICS_CHANNEL)
+                for message in pubsub.listen():
+                    if message["type"] == "message":
+                        pushed_metrics.apply(json.loads(message["data"]))
+        except Exception as e:
+            logger.error(f"❌ Error consuming pushed metrics: {e}")
+            time.sleep(5)
 
 if __name__ == "__main__":
-    from threading import Thread
-    Thread(target=monitor_metrics, daemon=True).start()
-    Thread(target=monitor_trades, daemon=True).start()
+    setup_logging("monitor")
+    threading.Thread(target=monitor_metrics, daemon=True).start()
+    threading.Thread(target=consume_pushed_metrics, daemon=True).start()
     app.run(host="0.0.0.0", port=5001)
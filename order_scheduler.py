@@ -0,0 +1,198 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from configuration import ORDER_SIZE, ORDER_COALESCE_WINDOW_SECONDS, REQUEST_WEIGHT_LIMIT, ORDER_RATE_LIMIT
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Binance spot request weights of the REST calls execute.py makes through ccxt
+REQUEST_WEIGHTS = {
+    "load_markets": 20,  # GET /api/v3/exchangeInfo
+    "fetch_balance": 20,  # GET /api/v3/account
+    "fetch_ticker": 2,  # GET /api/v3/ticker/24hr, one symbol
+    "create_order": 1,  # POST /api/v3/order
+    "create_market_buy_order": 1,
+    "create_market_sell_order": 1,
+}
+ORDER_METHODS = {"create_order", "create_market_buy_order", "create_market_sell_order"}
+DEFAULT_PRIORITY = 10  # Signals may carry a "priority"; lower values are sent first
+
+
+class TokenBucket:
+    """`capacity` tokens refilled evenly over `period` seconds, approximating one of Binance's rolling limits."""
+
+    def __init__(self, capacity, period, clock=time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def delay(self, amount):
+        """Seconds until `amount` tokens are available (0 when they are now)."""
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def take(self, amount):
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """Request weight per minute and order count per 10 s, the two limits an order has to fit in."""
+
+    def __init__(self, weight_limit=REQUEST_WEIGHT_LIMIT, order_limit=ORDER_RATE_LIMIT, clock=time.monotonic):
+        self.weight = TokenBucket(weight_limit, 60, clock)
+        self.orders = TokenBucket(order_limit, 10, clock)
+
+    async def acquire(self, weight, orders=0):
+        """Wait until both buckets can cover the call, then take from them; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            delay = max(self.weight.delay(weight), self.orders.delay(orders) if orders else 0.0)
+            if not delay:
+                break
+            await asyncio.sleep(delay)
+            waited += delay
+        self.weight.take(weight)
+        self.orders.take(orders)
+        metrics.set("rate_limit_weight_available", self.weight.tokens)
+        return waited
+
+
+class RateLimitedExchange:
+    """
+    Wraps a ccxt (or paper) exchange so every weighted REST call first takes its weight from the limiter. Replaces
+    ccxt's enableRateLimit, which only spaces calls evenly and knows nothing about weights.
+    """
+
+    def __init__(self, exchange, limiter=None):
+        self.exchange = exchange
+        self.limiter = limiter or RateLimiter()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.exchange, name)
+        if name not in REQUEST_WEIGHTS:
+            return attribute
+
+        async def call(*args, **kwargs):
+            waited = await self.limiter.acquire(REQUEST_WEIGHTS[name], 1 if name in ORDER_METHODS else 0)
+            metrics.observe("rate_limit_wait_seconds", waited, endpoint=name)
+            return await attribute(*args, **kwargs)
+
+        return call
+
+
+def net_order(signals, size=ORDER_SIZE):
+    """
+    Net a window of signals for one symbol: each SELL cancels the earliest open BUY (and vice versa), the signals
+    left over become one order for their combined size. Returns (order or None, cancelled signals).
+    """
+    open_signals, cancelled = [], []
+    for signal in signals:
+        if open_signals and open_signals[0]["signal"] != signal["signal"]:
+            cancelled += [open_signals.pop(0), signal]
+        else:
+            open_signals.append(signal)
+    if not open_signals:
+        return None, cancelled
+    last = open_signals[-1]
+    return {
+        "side": last["signal"],
+        "amount": size * len(open_signals),
+        "price": last["price"],
+        "signal_id": last.get("_id"),
+        "merged_ids": [signal.get("_id") for signal in open_signals[:-1]],
+        "trace": last.get("trace"),
+        "priority": min(signal.get("priority", DEFAULT_PRIORITY) for signal in open_signals),
+    }, cancelled
+
+
+class OrderScheduler:
+    """
+    Sits between signal intake and place_order. The first signal for a symbol opens a coalescing window; when it
+    closes, everything received in it is netted into at most one order (see net_order). Orders leave a priority
+    queue one at a time, lowest priority value first, then oldest; the rate-limited exchange spaces the calls.
+    """
+
+    def __init__(self, execute_order, cancel_signals, window=ORDER_COALESCE_WINDOW_SECONDS, size=ORDER_SIZE,
+                 clock=time.monotonic):
+        self.execute_order = execute_order  # async (order dict) -> exchange order or None
+        self.cancel_signals = cancel_signals  # (signals, reason) for signals that netted out
+        self.window = window
+        self.size = size
+        self.clock = clock
+        self.windows = {}
+        self.queue = []
+        self._sequence = itertools.count()
+        self._timers = {}
+        self._ready = asyncio.Event()
+
+    def depth(self):
+        return len(self.queue) + sum(len(signals) for signals in self.windows.values())
+
+    def submit(self, signal):
+        """Schedule a claimed signal (the dict store_signal published)."""
+        if signal["signal"] not in ("BUY", "SELL"):
+            self.cancel_signals([signal], "invalid_signal")
+            return
+        symbol = signal.get("symbol")
+        signal["queued_at"] = self.clock()
+        if symbol in self.windows:
+            self.windows[symbol].append(signal)
+        else:
+            self.windows[symbol] = [signal]
+            if self.window > 0:
+                self._timers[symbol] = asyncio.get_running_loop().call_later(self.window, self._close, symbol)
+            else:
+                self._close(symbol)
+        metrics.set("order_queue_depth", self.depth())
+
+    def _close(self, symbol):
+        self._timers.pop(symbol, None)
+        signals = self.windows.pop(symbol, [])
+        order, cancelled = net_order(signals, self.size)
+        if cancelled:
+            metrics.inc("signals_coalesced_total", len(cancelled), outcome="cancelled")
+            self.cancel_signals(cancelled, "coalesced")
+        if order is None:
+            return
+        if order["merged_ids"]:
+            metrics.inc("signals_coalesced_total", len(order["merged_ids"]), outcome="merged")
+        order["queued_at"] = min(signal["queued_at"] for signal in signals)
+        heapq.heappush(self.queue, (order["priority"], next(self._sequence), order))
+        self._ready.set()
+
+    async def dispatch(self):
+        """Send the next queued order; False when the queue is empty."""
+        if not self.queue:
+            return False
+        _, _, order = heapq.heappop(self.queue)
+        metrics.set("order_queue_depth", self.depth())
+        metrics.observe("order_queue_wait_seconds", self.clock() - order["queued_at"])
+        try:
+            await self.execute_order(order)
+        except Exception as e:
+            logger.error(f"❌ Scheduled {order['side']} order failed: {e}")
+        return True
+
+    async def run(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while await self.dispatch():
+                pass
+
+    async def drain(self):
+        """Close every open window now and send what is queued (shutdown, tests)."""
+        for symbol in list(self.windows):
+            timer = self._timers.get(symbol)
+            if timer is not None:
+                timer.cancel()
+            self._close(symbol)
+        while await self.dispatch():
+            pass
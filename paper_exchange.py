@@ -0,0 +1,52 @@
+import asyncio
+from configuration import ORDER_SYMBOL
+from storage import recent_trades
+
+PAPER_BALANCES = {"BTC": 1.0, "USDT": 100_000.0}
+FALLBACK_PRICE = 50_000.0  # Until the first trade is stored
+
+
+class PaperExchange:
+    """
+    Fills market orders locally at the last stored trade price, so execute.py runs without Binance (EXCHANGE=paper).
+    Implements the part of the ccxt exchange API that execute.py and Ledger use.
+    """
+
+    def __init__(self, trades, symbol=ORDER_SYMBOL, balances=None, fallback_price=FALLBACK_PRICE):
+        self.trades = trades
+        self.symbol = symbol
+        self.base, self.quote = symbol.split("/")
+        self.balances = dict(PAPER_BALANCES if balances is None else balances)
+        self.fallback_price = fallback_price
+        self.orders = 0
+
+    async def load_markets(self):
+        return {self.symbol: {"symbol": self.symbol}}
+
+    async def close(self):
+        pass
+
+    async def fetch_balance(self):
+        return {asset: {"free": amount} for asset, amount in self.balances.items()}
+
+    async def fetch_ticker(self, symbol):
+        return {"symbol": symbol, "last": await self._price()}
+
+    async def create_market_buy_order(self, symbol, amount):
+        return await self._fill("BUY", amount)
+
+    async def create_market_sell_order(self, symbol, amount):
+        return await self._fill("SELL", amount)
+
+    async def _price(self):
+        trade = await asyncio.to_thread(lambda: next(recent_trades(self.trades, self.symbol.replace("/", ""), 1), None))
+        return trade["price"] if trade else self.fallback_price
+
+    async def _fill(self, side, amount):
+        price = await self._price()
+        direction = 1 if side == "BUY" else -1
+        self.balances[self.base] = self.balances.get(self.base, 0.0) + direction * amount
+        self.balances[self.quote] = self.balances.get(self.quote, 0.0) - direction * amount * price
+        self.orders += 1
+        return {"id": f"paper-{self.orders}", "symbol": self.symbol, "side": side.lower(), "type": "market",
+                "amount": amount, "filled": amount, "average": price, "status": "closed"}
@@ -0,0 +1,174 @@
+import logging
+import os
+import socket
+import time
+import redis
+from configuration import MESSAGE_TRANSPORT, STREAM_MAXLEN
+
+logger = logging.getLogger(__name__)
+
+STREAM_READ_COUNT = 100  # Entries per XREADGROUP batch
+STREAM_BLOCK_MS = 1000
+CLAIM_IDLE_MS = 30_000  # Pending entries idle this long are taken over from dead consumers
+CLAIM_INTERVAL_SECONDS = 10
+
+
+def consumer_name():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def publish(client, channel, data, transport=MESSAGE_TRANSPORT, maxlen=STREAM_MAXLEN):
+    """
+    Send one JSON message over the configured transport: PUBLISH, or a capped XADD to a stream named after the
+    channel. Works on clients, pipelines and asyncio clients (await the result there).
+    """
+    if transport == "streams":
+        return client.xadd(channel, {"data": data}, maxlen=maxlen, approximate=True)
+    return client.publish(channel, data)
+
+
+class StreamConsumer:
+    """
+    Consumer-group reader for one stream. read() returns batches of (entry_id, data); entries stay pending until
+    ack()ed, so a consumer that dies mid-batch gets them redelivered on restart, or another consumer of the group
+    claims them once they have been idle for claim_idle_ms.
+    """
+
+    def __init__(self, client, stream, group, consumer=None, count=STREAM_READ_COUNT, block_ms=STREAM_BLOCK_MS,
+                 claim_idle_ms=CLAIM_IDLE_MS):
+        self.client = client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer or consumer_name()
+        self.count = count
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self._recovering = True  # Drain our own pending entries (id "0") before reading new ones
+        self._claim_start = "0-0"
+        self._next_claim = 0.0
+
+    def ensure_group(self):
+        try:
+            self.client.xgroup_create(self.stream, self.group, id="$", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def read(self):
+        batch = self.backlog()
+        if batch is not None:
+            return batch
+        return self._split(self.client.xreadgroup(self.group, self.consumer, {self.stream: ">"}, count=self.count,
+                                                  block=self.block_ms)) or []
+
+    def backlog(self):
+        """Our own pending entries after a restart, then idle ones claimed from dead consumers; None if neither."""
+        if self._recovering:
+            batch = self._split(self.client.xreadgroup(self.group, self.consumer, {self.stream: "0"}, count=self.count))
+            if batch is not None:
+                return batch
+            self._recovering = False
+
+        if self._claim_due():
+            claimed = self.client.xautoclaim(self.stream, self.group, self.consumer, self.claim_idle_ms,
+                                             self._claim_start, count=self.count)
+            return self._claimed(claimed)
+        return None
+
+    def ack(self, entry_ids):
+        if entry_ids:
+            self.client.xack(self.stream, self.group, *entry_ids)
+
+    def _claim_due(self):
+        now = time.monotonic()
+        if now < self._next_claim:
+            return False
+        self._next_claim = now + CLAIM_INTERVAL_SECONDS
+        return True
+
+    def _claimed(self, response):
+        self._claim_start, entries = response[0], response[1]
+        if not entries:
+            return None
+        logger.warning(f"⚠️ Claimed {len(entries)} idle entries from {self.stream} ({self.group})")
+        return self._entries(entries)
+
+    def _split(self, response):
+        """Entries of an XREADGROUP reply, or None when it is empty."""
+        entries = [entry for _, stream_entries in response or [] for entry in stream_entries]
+        return self._entries(entries) if entries else None
+
+    @staticmethod
+    def _entries(entries):
+        # Entries trimmed by MAXLEN while pending come back without fields: data is None, but they still need an ack.
+        # Clients without decode_responses (binary codecs) return the field name as bytes.
+        return [(entry_id, fields.get("data", fields.get(b"data")) if fields else None) for entry_id, fields in entries]
+
+
+class MultiStreamConsumer:
+    """
+    StreamConsumer over several streams of one group, reading new entries of all of them with a single blocking
+    XREADGROUP, so a worker serving many symbols needs neither a thread nor a connection per stream.
+    read() returns (stream, entry_id, data) triples; recovery and claiming work stream by stream.
+    """
+
+    def __init__(self, client, streams, group, consumer=None, count=STREAM_READ_COUNT, block_ms=STREAM_BLOCK_MS,
+                 claim_idle_ms=CLAIM_IDLE_MS):
+        self.client = client
+        self.group = group
+        self.consumer = consumer or consumer_name()
+        self.count = count
+        self.block_ms = block_ms
+        self.streams = {stream: StreamConsumer(client, stream, group, self.consumer, count, block_ms, claim_idle_ms)
+                        for stream in streams}
+
+    def ensure_group(self):
+        for stream in self.streams.values():
+            stream.ensure_group()
+
+    def read(self):
+        for name, stream in self.streams.items():
+            batch = stream.backlog()
+            if batch is not None:
+                return [(name, entry_id, data) for entry_id, data in batch]
+
+        response = self.client.xreadgroup(self.group, self.consumer, {name: ">" for name in self.streams},
+                                          count=self.count, block=self.block_ms)
+        return [(name.decode() if isinstance(name, bytes) else name, entry_id, data)
+                for name, entries in response or [] for entry_id, data in StreamConsumer._entries(entries)]
+
+    def ack(self, stream, entry_ids):
+        self.streams[stream].ack(entry_ids)
+
+
+class AsyncStreamConsumer(StreamConsumer):
+    """StreamConsumer for redis.asyncio clients."""
+
+    async def ensure_group(self):
+        try:
+            await self.client.xgroup_create(self.stream, self.group, id="$", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read(self):
+        if self._recovering:
+            batch = self._split(await self.client.xreadgroup(self.group, self.consumer, {self.stream: "0"},
+                                                             count=self.count))
+            if batch is not None:
+                return batch
+            self._recovering = False
+
+        if self._claim_due():
+            claimed = await self.client.xautoclaim(self.stream, self.group, self.consumer, self.claim_idle_ms,
+                                                   self._claim_start, count=self.count)
+            batch = self._claimed(claimed)
+            if batch is not None:
+                return batch
+
+        return self._split(await self.client.xreadgroup(self.group, self.consumer, {self.stream: ">"},
+                                                        count=self.count, block=self.block_ms)) or []
+
+    async def ack(self, entry_ids):
+        if entry_ids:
+            await self.client.xack(self.stream, self.group, *entry_ids)
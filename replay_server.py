@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import heapq
+import json
+import logging
+import math
+import random
+import time
+import zlib
+from collections import Counter
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+import websockets
+from configuration import REPLAY_PORT, REPLAY_SPEED, REPLAY_RATE, REPLAY_PROFILE, REPLAY_FILE
+from latency import wall_ms
+
+logger = logging.getLogger(__name__)
+
+STEP_SECONDS = 0.005  # Replay clock resolution; trades due within one step go out back to back
+STATS_PATH = "/stats"
+STATS_LOG_INTERVAL = 10
+
+
+class BurstProfile:
+    """
+    Speed multiplier over time, as "seconds x multiplier" segments that repeat: "30x1,5x20" replays 30 s at the
+    base speed, then 5 s at 20 times that. An empty profile is always 1x.
+    """
+
+    def __init__(self, segments=()):
+        self.segments = [(float(seconds), float(multiplier)) for seconds, multiplier in segments]
+        self.period = sum(seconds for seconds, _ in self.segments)
+
+    @classmethod
+    def parse(cls, spec):
+        return cls(item.strip().split("x") for item in spec.split(",") if item.strip())
+
+    def multiplier(self, elapsed):
+        if not self.period:
+            return 1.0
+        elapsed %= self.period
+        for seconds, multiplier in self.segments:
+            if elapsed < seconds:
+                return multiplier
+            elapsed -= seconds
+        return self.segments[-1][1]
+
+
+def synthetic_trades(symbol, rate=REPLAY_RATE, price=50_000.0):
+    """Endless random-walk trades with Poisson arrivals at `rate` per second: (offset seconds, price, quantity)."""
+    rng = random.Random(zlib.crc32(symbol.encode()))  # Same sequence for a symbol on every run
+    offset = 0.0
+    while True:
+        offset += rng.expovariate(rate)
+        price *= math.exp(rng.gauss(0, 0.0005))
+        yield offset, price, rng.expovariate(100)
+
+
+def recorded_trades(path):
+    """
+    Trades per symbol from an exported trades file (symbol/price/quantity/timestamp, see backtest.py), as offsets
+    from the first trade in the file.
+    """
+    from backtest import load_ticks_from_file
+    frame = load_ticks_from_file(path)
+    frame["offset"] = (frame["timestamp"] - frame["timestamp"].min()) / 1000
+    return {symbol.upper(): list(zip(rows["offset"].tolist(), rows["price"].tolist(), rows["quantity"].tolist()))
+            for symbol, rows in frame.sort_values("timestamp").groupby("symbol")}
+
+
+def looped(trades):
+    """Replay a recorded sequence over and over, each pass starting where the previous one ended."""
+    if not trades:
+        return
+    span = trades[-1][0] + (trades[-1][0] - trades[0][0]) / max(len(trades) - 1, 1)
+    shift = 0.0
+    while True:
+        for offset, price, quantity in trades:
+            yield offset + shift, price, quantity
+        shift += span
+
+
+def parse_streams(path):
+    """Streams requested by a Binance URL: /stream?streams=a@trade/b@trade (combined) or /ws/a@trade (raw)."""
+    url = urlsplit(path)
+    if url.path.rstrip("/") == "/stream":
+        return [s for s in parse_qs(url.query).get("streams", [""])[0].split("/") if s], True
+    if url.path.startswith("/ws/"):
+        return [s for s in url.path[len("/ws/"):].split("/") if s], False
+    return [], False
+
+
+def trade_message(stream, symbol, trade_id, price, quantity, trade_time, combined):
+    """A trade event the way Binance sends it (prices and quantities are decimal strings)."""
+    data = {"e": "trade", "E": trade_time, "s": symbol, "t": trade_id, "p": f"{price:.8f}", "q": f"{quantity:.8f}",
+            "T": trade_time, "m": False, "M": True}
+    return json.dumps({"stream": stream, "data": data} if combined else data)
+
+
+class ReplayServer:
+    """
+    Serves Binance-style <symbol>@trade websocket streams from synthetic or recorded trades, at `speed` times real
+    time shaped by a burst profile. Point data_feed at it with BINANCE_WS_URL=ws://<host>:<port>.
+    Trades carry the wall-clock time they are sent as their trade time, so tick-to-trade latency stays meaningful.
+    """
+
+    def __init__(self, source, speed=REPLAY_SPEED, profile=None, clock=time.monotonic):
+        self.source = source  # symbol -> iterator of (offset seconds, price, quantity)
+        self.speed = speed
+        self.profile = profile or BurstProfile()
+        self.clock = clock
+        self.started = clock()
+        self.trade_ids = {}
+        self.stats = {"connections": 0, "open_connections": 0, "sent": 0, "max_batch": 0}
+        self.sent_by_symbol = Counter()
+
+    def snapshot(self):
+        elapsed = self.clock() - self.started
+        return {**self.stats, "sent_by_symbol": dict(self.sent_by_symbol), "uptime_seconds": elapsed,
+                "speed": self.speed, "multiplier": self.profile.multiplier(elapsed)}
+
+    async def process_request(self, path, request_headers):
+        if urlsplit(path).path == STATS_PATH:
+            return HTTPStatus.OK, [("Content-Type", "application/json")], json.dumps(self.snapshot()).encode()
+        return None
+
+    async def handler(self, websocket):
+        streams, combined = parse_streams(websocket.path)
+        streams = [stream for stream in streams if stream.endswith("@trade")]
+        self.stats["connections"] += 1
+        self.stats["open_connections"] += 1
+        logger.info(f"📡 Replaying {len(streams)} stream(s) to {websocket.remote_address}")
+        try:
+            await self.replay(websocket, streams, combined)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.stats["open_connections"] -= 1
+
+    async def replay(self, websocket, streams, combined):
+        trades = heapq.merge(*(self._tagged(stream) for stream in streams), key=lambda trade: trade[0])
+        due = next(trades, None)
+        virtual, last = 0.0, self.clock()
+        while due is not None:
+            await asyncio.sleep(STEP_SECONDS)
+            now = self.clock()
+            virtual += (now - last) * self.speed * self.profile.multiplier(now - self.started)
+            last = now
+            batch = 0
+            while due is not None and due[0] <= virtual:
+                _, stream, price, quantity = due
+                symbol = stream.split("@")[0].upper()
+                trade_id = self.trade_ids[symbol] = self.trade_ids.get(symbol, wall_ms() * 1000) + 1
+                await websocket.send(trade_message(stream, symbol, trade_id, price, quantity, wall_ms(), combined))
+                self.sent_by_symbol[symbol] += 1
+                batch += 1
+                due = next(trades, None)
+            self.stats["sent"] += batch
+            self.stats["max_batch"] = max(self.stats["max_batch"], batch)
+
+    def _tagged(self, stream):
+        for offset, price, quantity in self.source(stream.split("@")[0].upper()):
+            yield offset, stream, price, quantity
+
+
+async def serve(server, host, port):
+    async with websockets.serve(server.handler, host, port, process_request=server.process_request):
+        logger.info(f"🚀 Replay server listening on ws://{host}:{port} (speed {server.speed}x)")
+        while True:
+            await asyncio.sleep(STATS_LOG_INTERVAL)
+            logger.info(f"📊 Replay stats: {server.snapshot()}")
+
+
+if __name__ == "__main__":
+    from logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="Serve synthetic or recorded trades as Binance trade streams.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=REPLAY_PORT)
+    parser.add_argument("--speed", type=float, default=REPLAY_SPEED, help="Multiple of real time")
+    parser.add_argument("--rate", type=float, default=REPLAY_RATE, help="Synthetic trades per second and symbol")
+    parser.add_argument("--profile", default=REPLAY_PROFILE, help='Burst profile, e.g. "30x1,5x20"')
+    parser.add_argument("--file", default=REPLAY_FILE, help="Recorded trades (.jsonl/.csv) instead of synthetic")
+    args = parser.parse_args()
+
+    setup_logging("replay_server")
+    if args.file:
+        recorded = recorded_trades(args.file)
+        source = lambda symbol: looped(recorded.get(symbol, []))
+    else:
+        source = lambda symbol: synthetic_trades(symbol, args.rate)
+    asyncio.run(serve(ReplayServer(source, args.speed, BurstProfile.parse(args.profile)), args.host, args.port))
@@ -0,0 +1,47 @@
+import logging
+from bars import BarAggregator
+from storage import ROLLUPS, BAR_FIELDS, bars_name, recent_bars, upsert_bars
+from tick_store import to_epoch_ms
+
+logger = logging.getLogger(__name__)
+
+
+class Rollups:
+    """
+    Keeps the 1s/1m/1h OHLCV bar collections current from the tick stream. Every batch of ticks is folded into
+    one aggregator per symbol and interval, then the bars it closed and the bars still in progress are upserted,
+    so readers see the current minute and hour without waiting for them to close. Intervals without trades are
+    not stored; readers forward-fill.
+    """
+
+    def __init__(self, db, intervals=ROLLUPS):
+        self.db = db
+        self.intervals = dict(intervals)
+        self.aggregators = {}
+
+    def add(self, records):
+        touched = {interval: {} for interval in self.intervals}
+        for record in records:
+            symbol = record["symbol"]
+            timestamp = to_epoch_ms(record["timestamp"])
+            for interval in self.intervals:
+                aggregator = self._aggregator(symbol, interval)
+                for bar in aggregator.add(timestamp, record["price"], record.get("quantity", 0.0)):
+                    touched[interval][(symbol, bar["timestamp"])] = bar
+                if aggregator.current is not None:
+                    touched[interval][(symbol, aggregator.current["timestamp"])] = aggregator.current
+
+        written = 0
+        for interval, bars in touched.items():
+            written += upsert_bars(self.db[bars_name(interval)], [(symbol, bar) for (symbol, _), bar in bars.items()])
+        return written
+
+    def _aggregator(self, symbol, interval):
+        aggregator = self.aggregators.get((symbol, interval))
+        if aggregator is None:
+            # No forward-filled bars are stored; resume the last stored bar so a restart keeps adding to it.
+            aggregator = self.aggregators[(symbol, interval)] = BarAggregator(self.intervals[interval], max_fill=0)
+            last = next(recent_bars(self.db[bars_name(interval)], symbol, 1), None)
+            if last is not None:
+                aggregator.current = dict({field: last[field] for field in BAR_FIELDS}, filled=False)
+        return aggregator
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from bson import ObjectId
+from pymongo import UpdateOne
+from latency import wall_ms
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 0.25
+FLUSH_BATCH_SIZE = 100  # Flush right away once this many status updates are queued
+LOCK_TIMEOUT_SECONDS = 300  # A lock this old belongs to a crashed instance; must outlast the order queue
+RECENT_SIGNALS = 10000  # Finished ids remembered, so a redelivered signal skips the MongoDB round trip
+
+
+class SignalBook:
+    """
+    Status bookkeeping for the trade signals store_signal publishes. A signal is claimed with one atomic
+    pending -> locked update in MongoDB, so of several execute instances that receive it only one trades it, and
+    stays in the in-memory `pending` index until its final status (filled/failed, cancelled when the order
+    scheduler nets it out, or ignored when it is for a symbol this bot does not trade) is queued. Final statuses are
+    written with one bulk_write per flush instead of an update_one per signal; on_finished then gets the ids written.
+    """
+
+    def __init__(self, collection, flush_interval=FLUSH_INTERVAL_SECONDS, batch_size=FLUSH_BATCH_SIZE,
+                 lock_timeout=LOCK_TIMEOUT_SECONDS, on_finished=None):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.lock_timeout = lock_timeout
+        self.on_finished = on_finished  # async (signal ids), e.g. to ack their stream entries
+        self.pending = {}  # signal id -> signal claimed by this instance, awaiting its final status
+        self.recent = OrderedDict()
+        self._updates = []
+        self._wakeup = asyncio.Event()
+
+    async def claim(self, signal_id):
+        """
+        Lock a pending signal for execution, or take over one whose lock has timed out (its instance crashed
+        before the final status was written). Returns the signal as it was before the claim; None if it is
+        unknown or claimed/finished by anyone else.
+        """
+        if not signal_id or signal_id in self.pending or signal_id in self.recent:
+            return None
+        now = wall_ms()
+        abandoned = {"status": "locked", "locked_at": {"$lt": now - self.lock_timeout * 1000}}
+        signal = await asyncio.to_thread(self.collection.find_one_and_update,
+                                         {"_id": ObjectId(signal_id), "$or": [{"status": "pending"}, abandoned]},
+                                         {"$set": {"status": "locked", "locked_at": now}})
+        if signal is not None:
+            self.pending[signal_id] = signal
+        return signal
+
+    def finish(self, signal_id, status, **fields):
+        if signal_id is not None:
+            self.pending.pop(signal_id, None)
+            self._remember(signal_id)
+            self._queue(signal_id, {"status": status, **fields})
+
+    async def flush(self):
+        updates, self._updates = self._updates, []
+        if not updates:
+            return 0
+        try:
+            await asyncio.to_thread(self.collection.bulk_write, [update for _, update in updates], ordered=True)
+        except Exception as e:
+            logger.error(f"❌ Failed to write {len(updates)} signal status updates: {e}")
+            self._updates = updates + self._updates
+            return 0
+        if self.on_finished is not None:
+            await self.on_finished([signal_id for signal_id, _ in updates])
+        return len(updates)
+
+    async def flush_forever(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def _queue(self, signal_id, fields):
+        self._updates.append((signal_id, UpdateOne({"_id": ObjectId(signal_id)}, {"$set": fields})))
+        if len(self._updates) >= self.batch_size:
+            self._wakeup.set()
+
+    def _remember(self, signal_id):
+        self.recent[signal_id] = True
+        if len(self.recent) > RECENT_SIGNALS:
+            self.recent.popitem(last=False)
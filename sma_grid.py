@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+GRID_CHUNK_BYTES = 256 * 1024 * 1024  # Scratch memory allowed per chunk of (short, long) pairs
+BYTES_PER_CELL = 40  # Approximate scratch bytes per pair per tick across the intermediate arrays
+
+
+def parameter_grid(short_windows, long_windows):
+    return [(short, long) for short in short_windows for long in long_windows if short < long]
+
+
+def offset_cumsum(prices):
+    # Offsetting by the first price keeps the cumulative sum small, so window differences stay precise.
+    base = prices[0] if len(prices) else 0.0
+    return np.concatenate(([0.0], np.cumsum(prices - base))), base
+
+
+def rolling_means(prices, windows):
+    """SMA of each window via a single cumulative sum; NaN until the window is filled."""
+    prices = np.asarray(prices, dtype=np.float64)
+    cumsum, base = offset_cumsum(prices)
+    means = np.full((len(windows), len(prices)), np.nan)
+    for row, window in enumerate(windows):
+        if window <= len(prices):
+            means[row, window - 1:] = (cumsum[window:] - cumsum[:-window]) / window + base
+    return means
+
+
+def sma_spreads(cumsum, pairs):
+    """short SMA - long SMA for each pair, 0 until the long window is filled."""
+    n = len(cumsum) - 1
+    spreads = np.zeros((len(pairs), n))
+    for row, (short, long) in enumerate(pairs):
+        if long > n:
+            continue
+        out = spreads[row, long - 1:]
+        np.subtract(cumsum[long:], cumsum[long - short:n + 1 - short], out=out)
+        out /= short
+        out -= (cumsum[long:] - cumsum[:n + 1 - long]) / long
+    return spreads
+
+
+def crossover_signals(spreads):
+    """
+    Vectorized version of strategy.generate_trade_signal over rows of short-long SMA spreads: +1 (BUY) / -1 (SELL)
+    is emitted whenever the SMA ordering differs from the last emitted signal. Returns (signals, positions).
+    """
+    positions = (spreads > 0).view(np.int8) - (spreads < 0).view(np.int8)
+    if positions.shape[1] == 0:  # No prices: nothing to signal, and argmax cannot reduce an empty row
+        return positions.copy(), positions
+
+    # A tie keeps the previous position; forward-fill only the rows that have one after their first signal.
+    leading = np.argmax(positions != 0, axis=1)
+    ties = np.count_nonzero(positions, axis=1) < positions.shape[1] - leading
+    if ties.any():
+        tied = positions[ties]
+        columns = np.arange(tied.shape[1])
+        last_nonzero = np.maximum.accumulate(np.where(tied != 0, columns, 0), axis=1)
+        positions[ties] = np.take_along_axis(tied, last_nonzero, axis=1)
+
+    signals = positions.copy()
+    signals[:, 1:] *= positions[:, 1:] != positions[:, :-1]
+    return signals, positions
+
+
+def evaluate_grid(prices, pairs, fee_rate=0.0, long_only=False, keep_signals=True, with_drawdown=False,
+                  max_chunk_bytes=GRID_CHUNK_BYTES):
+    """
+    Evaluate SMA crossover for every (short, long) pair in one pass per chunk of pairs.
+    PnL is per unit of the asset: the position (+1 after BUY, -1 or 0 after SELL) is held from the signal tick.
+    Max drawdown needs the full mark-to-market equity curve, so it is only computed when asked for.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    pairs = [(int(short), int(long)) for short, long in pairs]
+    n = len(prices)
+    cumsum, _ = offset_cumsum(prices)
+
+    pnl = np.zeros(len(pairs))
+    trades = np.zeros(len(pairs), dtype=np.int64)
+    max_drawdown = np.zeros(len(pairs)) if with_drawdown else None
+    signals_out = [] if keep_signals else None
+
+    chunk_size = max(1, max_chunk_bytes // max(1, n * BYTES_PER_CELL))
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        end = start + len(chunk)
+        signals, positions = crossover_signals(sma_spreads(cumsum, chunk))
+        if long_only:
+            np.maximum(positions, 0, out=positions)
+        trades[start:end] = np.count_nonzero(signals, axis=1)
+        if keep_signals:
+            signals_out.extend(signals)
+        if n < 2:
+            continue
+
+        # sum(pos[t] * (p[t+1] - p[t])) only changes where the position does, i.e. on signal ticks.
+        rows, ticks = np.divmod(np.flatnonzero(signals), n)
+        held = ticks < n - 1
+        rows, ticks = rows[held], ticks[held]
+        previous = np.where(ticks > 0, positions[rows, ticks - 1], 0)
+        sizes = (positions[rows, ticks] - previous).astype(np.float64)
+        entry_cost = np.bincount(rows, weights=sizes * prices[ticks], minlength=len(chunk))
+        pnl[start:end] = positions[:, -2] * prices[-1] - entry_cost
+        if fee_rate:
+            pnl[start:end] -= fee_rate * np.bincount(rows, weights=np.abs(sizes) * prices[ticks], minlength=len(chunk))
+
+        if with_drawdown:
+            equity = positions[:, :-1] * np.diff(prices)
+            if fee_rate:
+                equity -= fee_rate * np.abs(np.diff(positions[:, :-1], axis=1, prepend=0)) * prices[:-1]
+            np.cumsum(equity, axis=1, out=equity)
+            peak = np.maximum(equity, 0)
+            np.maximum.accumulate(peak, axis=1, out=peak)
+            peak -= equity
+            max_drawdown[start:end] = peak.max(axis=1)
+
+    return {"pairs": pairs, "pnl": pnl, "trades": trades, "max_drawdown": max_drawdown, "signals": signals_out}
+
+
+def summary_frame(result):
+    frame = pd.DataFrame(result["pairs"], columns=["short_window", "long_window"])
+    frame["pnl"] = result["pnl"]
+    frame["trades"] = result["trades"]
+    if result["max_drawdown"] is not None:
+        frame["max_drawdown"] = result["max_drawdown"]
+    return frame.sort_values("pnl", ascending=False, ignore_index=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    import storage
+
+    parser = argparse.ArgumentParser(description="Sweep SMA crossover windows over stored trades.")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--limit", type=int, default=1_000_000, help="Most recent ticks to evaluate")
+    parser.add_argument("--short", default="10:200:10", help="start:stop:step for short windows")
+    parser.add_argument("--long", default="50:2000:50", help="start:stop:step for long windows")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--bars", choices=["1s", "1m", "1h"], help="Sweep over the close of stored OHLCV bars instead of ticks")
+    args = parser.parse_args()
+
+    db = storage.connect()
+    if args.bars:
+        cursor = storage.recent_bars(db[storage.bars_name(args.bars)], args.symbol, args.limit)
+        prices = np.array([doc["close"] for doc in cursor][::-1])
+    else:
+        cursor = storage.recent_trades(db[storage.TRADES], args.symbol, args.limit, {"price": 1, "_id": 0})
+        prices = np.array([doc["price"] for doc in cursor][::-1])
+
+    grid = parameter_grid(range(*map(int, args.short.split(":"))), range(*map(int, args.long.split(":"))))
+    if not grid:
+        raise SystemExit("No (short, long) pairs with short < long in the given ranges.")
+    if len(prices) < min(short for short, _ in grid):
+        raise SystemExit(f"Only {len(prices)} prices stored for {args.symbol}, fewer than the shortest window.")
+    result = evaluate_grid(prices, grid, keep_signals=False)
+    print(summary_frame(result).head(args.top).to_string(index=False))
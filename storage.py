@@ -0,0 +1,162 @@
+import logging
+from datetime import datetime, timezone
+from pymongo import ASCENDING, DESCENDING, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from configuration import MONGO_URI, MONGO_DATABASE, TRADES_TIMESERIES, TICK_RETENTION_SECONDS, ROLLUP_RETENTION
+
+logger = logging.getLogger(__name__)
+
+TRADES = "trades"
+SIGNALS = "trade_signals"
+ORDERS = "trade_orders"
+ROLLUPS = {"1s": 1_000, "1m": 60_000, "1h": 3_600_000}  # OHLCV collections bars_<interval>, interval in ms
+
+TICK_FIELDS = {"price": 1, "quantity": 1, "timestamp": 1, "trade_id": 1, "_id": 0}
+BAR_FIELDS = ("timestamp", "open", "high", "low", "close", "volume", "trades")
+TIME_FIELD = "time"  # BSON date copy of "timestamp", for TTL indexes and time-series buckets
+INDEX_OPTIONS_CONFLICT = (85, 86)
+DUPLICATE_KEY = 11000
+# BSON sorts strings after numbers: unmigrated ISO-string timestamps (see migrate_timestamps.py) are left out of
+# every timestamp-sorted query, or a descending sort would return them first.
+EPOCH_MS = {"$type": "number"}
+
+
+def bars_name(interval):
+    return f"bars_{interval}"
+
+
+# Every hot query below is served by one of these (see test_storage.py)
+INDEXES = {
+    TRADES: [[("symbol", ASCENDING), ("timestamp", ASCENDING)]],
+    ORDERS: [[("side", ASCENDING), ("timestamp", DESCENDING)], [("signal_id", ASCENDING)],
+             [("merged_signal_ids", ASCENDING)]],
+}
+BAR_KEY = [("symbol", ASCENDING), ("timestamp", ASCENDING)]  # Unique on every bars_<interval> collection
+TRADE_ID_KEY = [("symbol", ASCENDING), ("trade_id", ASCENDING)]  # Unique exchange trade id; ticks stored twice are dropped
+
+
+def connect(uri=MONGO_URI, database=MONGO_DATABASE):
+    """The trading database. Lazy like MongoClient itself; services call ensure_schema once at startup."""
+    return MongoClient(uri)[database]
+
+
+def ensure_schema(db, timeseries=TRADES_TIMESERIES, tick_retention=TICK_RETENTION_SECONDS,
+                  rollup_retention=ROLLUP_RETENTION):
+    """Create the trades time-series collection (if enabled and not there yet), the indexes and TTLs; idempotent."""
+    if timeseries and TRADES not in db.list_collection_names():
+        options = {"timeseries": {"timeField": TIME_FIELD, "metaField": "symbol", "granularity": "seconds"}}
+        if tick_retention:
+            options["expireAfterSeconds"] = tick_retention
+        db.create_collection(TRADES, **options)
+        logger.info(f"🗄️ Created {TRADES} as a time-series collection")
+    for name, indexes in INDEXES.items():
+        for keys in indexes:
+            db[name].create_index(keys)
+    if not timeseries:
+        # Time-series collections can't have unique indexes; ticks migrated from before trade ids are left out.
+        db[TRADES].create_index(TRADE_ID_KEY, unique=True, partialFilterExpression={"trade_id": {"$exists": True}})
+    for interval in ROLLUPS:
+        db[bars_name(interval)].create_index(BAR_KEY, unique=True)
+        ensure_ttl(db[bars_name(interval)], rollup_retention.get(interval, 0))
+
+    if not timeseries:
+        ensure_ttl(db[TRADES], tick_retention)
+    elif tick_retention:
+        db.command("collMod", TRADES, expireAfterSeconds=tick_retention)  # Time-series TTL is a collection option
+
+
+def ensure_ttl(collection, seconds):
+    """TTL index on the time field; an existing one is retuned in place, 0 drops it."""
+    if not seconds:
+        for name, index in collection.index_information().items():
+            if index["key"] == [(TIME_FIELD, ASCENDING)]:
+                collection.drop_index(name)
+        return
+    try:
+        collection.create_index(TIME_FIELD, expireAfterSeconds=seconds)
+    except OperationFailure as e:
+        if e.code not in INDEX_OPTIONS_CONFLICT:
+            raise
+        collection.database.command("collMod", collection.name,
+                                    index={"keyPattern": {TIME_FIELD: 1}, "expireAfterSeconds": seconds})
+
+
+def insert_trades(trades, records):
+    """Unordered bulk insert, returning how many trades were new (see insert_new_trades)."""
+    return len(insert_new_trades(trades, records))
+
+
+def insert_new_trades(trades, records):
+    """
+    Unordered bulk insert, returning the records that were new. Each document also gets the BSON date its TTL
+    (and time-series bucket) is based on; the records themselves are left untouched since they are published
+    afterwards. Trades already stored (same _id or exchange trade id) are skipped; any other error is raised.
+    """
+    records = list(records)
+    documents = [dict(record, **{TIME_FIELD: to_datetime(record["timestamp"])}) for record in records]
+    if not documents:
+        return []
+    try:
+        trades.insert_many(documents, ordered=False)
+        return records
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != DUPLICATE_KEY for error in errors):
+            raise
+        rejected = {error["index"] for error in errors}
+        return [record for i, record in enumerate(records) if i not in rejected]
+
+
+def to_datetime(timestamp):
+    if isinstance(timestamp, (int, float)):
+        return datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+    return datetime.fromisoformat(timestamp)
+
+
+def upsert_bars(bars, symbol_bars):
+    """Write (symbol, bar) pairs. Bars are keyed by symbol and open time, so rewriting a bar in progress is safe."""
+    requests = []
+    for symbol, bar in symbol_bars:
+        document = {field: bar[field] for field in BAR_FIELDS}
+        document[TIME_FIELD] = to_datetime(bar["timestamp"])
+        requests.append(UpdateOne({"symbol": symbol, "timestamp": bar["timestamp"]}, {"$set": document}, upsert=True))
+    if requests:
+        bars.bulk_write(requests, ordered=False)
+    return len(requests)
+
+
+def trades_range(trades, symbol, start=None, end=None, after=None, fields=TICK_FIELDS):
+    """Trades of a symbol in [start, end), or strictly after `after`, oldest first."""
+    bounds = {op: value for op, value in (("$gte", start), ("$gt", after), ("$lt", end)) if value is not None}
+    return trades.find({"symbol": symbol, "timestamp": EPOCH_MS | bounds}, fields).sort("timestamp", ASCENDING)
+
+
+def recent_trades(trades, symbol, limit, fields=TICK_FIELDS):
+    """The `limit` most recent trades of a symbol, newest first."""
+    return trades.find({"symbol": symbol, "timestamp": EPOCH_MS}, fields).sort("timestamp", DESCENDING).limit(limit)
+
+
+def latest_trade(trades, symbol):
+    return next(recent_trades(trades, symbol, 1, {"timestamp": 1, "_id": 0}), None)
+
+
+def bars_range(bars, symbol, start=None, end=None):
+    """Bars of a symbol opened in [start, end) (epoch ms), oldest first. Intervals without trades have no bar."""
+    return trades_range(bars, symbol, start, end, fields=dict.fromkeys(BAR_FIELDS, 1) | {"_id": 0})
+
+
+def recent_bars(bars, symbol, limit):
+    return recent_trades(bars, symbol, limit, fields=dict.fromkeys(BAR_FIELDS, 1) | {"_id": 0})
+
+
+def recent_orders(orders, side, limit=1):
+    return orders.find({"side": side, "timestamp": EPOCH_MS}).sort("timestamp", DESCENDING).limit(limit)
+
+
+def last_order(orders, side):
+    return next(recent_orders(orders, side), None)
+
+
+def signal_orders(orders, signal_id):
+    """Orders placed for a signal, alone or coalesced with others."""
+    return orders.find({"$or": [{"signal_id": signal_id}, {"merged_signal_ids": signal_id}]})
@@ -1,209 +1,218 @@
 import asyncio
-import pandas as pd
-from pymongo import MongoClient
 import logging
 import redis
+import storage
 import json
 import time
-from collections import deque
-from bson import ObjectId
-from datetime import timedelta
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s",
-    handlers=[
-        logging.FileHandler("/app/logs/strategy.log"),
-        logging.StreamHandler()
-    ]
-)
+from collections import defaultdict
+from configuration import (MESSAGE_TRANSPORT, TICK_STORE_DIR, TRADE_SIGNALS_CHANNEL, STRATEGY_WORKERS,
+                           trade_channel)
+from codec import decode, encode
+from latency import now_ns, observe
+from metrics import metrics
+from redis_streams import MultiStreamConsumer, publish
+from strategy_pool import LoadReporter, StrategySupervisor
+from strategy_runtime import StrategyRuntime, build_strategies
+from tick_store import TickStore
+from logger import get_sampled_logger, setup_logging
+
+setup_logging("strategy")
 logger = logging.getLogger(__name__)
+tick_logger = get_sampled_logger(__name__)  # Per-tick messages, rate-limited
 
-client = MongoClient("mongodb://mongodb:27017/")
-db = client["trading_db"]
-collection = db["trades"]
-signals_collection = db["trade_signals"]
+db = storage.connect()
+collection = db[storage.TRADES]
+signals_collection = db[storage.SIGNALS]
 
-redis_client = redis.Redis(host="redis", port=6379, db=0, decode_responses=True)
-REDIS_SIGNAL_KEY = "latest_trade_signal"
-REDIS_PRICE_HISTORY = "price_history"
-
-EXECUTION_MODE = "HFT"  # Options: "HFT", "TIME_BASED"
-TIME_UNIT = "seconds"  # Options: "seconds", "minutes"
-DATA_COLLECTION_MODE = "STRICT"  # Options: "STRICT", "FLEXIBLE"
-
-SHORT_WINDOW = 50
-LONG_WINDOW = 200
-
-price_buffer = deque(maxlen=LONG_WINDOW)
-
-
-def convert_mongo_document(doc):
-    if isinstance(doc, dict):
-        return {k: (str(v) if isinstance(v, ObjectId) else v) for k, v in doc.items()}
-    return doc
-
-
-async def fetch_price_data():
-    try:
-        if EXECUTION_MODE == "HFT":
-            limit = 1000
-            cursor = collection.find({}, {"price": 1, "timestamp": 1}).sort("timestamp", -1).limit(limit)
-
-        else:
-            if TIME_UNIT == "seconds":
-                time_range = LONG_WINDOW
-            elif TIME_UNIT == "minutes":
-                time_range = LONG_WINDOW * 60
-            else:
-                time_range = LONG_WINDOW * 60
-
-            latest_timestamp_entry = collection.find_one({}, {"timestamp": 1}, sort=[("timestamp", -1)])
-
-            if latest_timestamp_entry:
-                latest_timestamp = latest_timestamp_entry["timestamp"]
-                start_time = (pd.to_datetime(latest_timestamp) - timedelta(seconds=time_range)).isoformat()
+tick_store = TickStore(TICK_STORE_DIR) if TICK_STORE_DIR else None  # Read-only view of the data feed's archive
 
-                query = {"timestamp": {"$gte": start_time}}
-                logger.info(f"🔍 Querying MongoDB with: {query}")
-
-                cursor = collection.find(query, {"price": 1, "timestamp": 1}).sort("timestamp", 1)
-
-            else:
-                logger.warning("⚠️ No recent trade data found in MongoDB. Skipping execution.")
-                return None
-
-        data = [convert_mongo_document(doc) for doc in cursor]
-        df = pd.DataFrame(data)
-
-        if df.empty:
-            logger.warning("⚠️ No trade data found in MongoDB. Skipping strategy execution.")
-            return None
-
-        df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601", errors="coerce")
-        df = df.sort_values("timestamp")
-
-        df.set_index("timestamp", inplace=True)
-        df = df.resample(f"{1 if TIME_UNIT == 'seconds' else 60}S").ffill()  # Forward-fill missing values
-
-        if len(df) < LONG_WINDOW:
-            logger.warning(f"⚠️ Not enough data ({len(df)}/{LONG_WINDOW}). Waiting for more trades.")
-            return None
-
-        logger.info(f"📊 Successfully fetched {len(df)} price data points from MongoDB.")
-        return df.reset_index()
-
-    except Exception as e:
-        logger.error(f"❌ Error fetching price data: {e}")
+redis_client = redis.Redis(host="redis", port=6379, db=0, decode_responses=True)
+raw_redis_client = redis.Redis(host="redis", port=6379, db=0)  # Trade messages may use the binary codec
+REDIS_SIGNAL_KEY = "latest_trade_signal"  # Suffixed with the strategy instance name
+STRATEGY_CONSUMER_GROUP = "strategy"
+IDLE_POLL_SECONDS = 1.0
+
+runtime = StrategyRuntime()  # Filled in __main__, or with its share of the instances in run_worker
+load_reporter = None  # Set in pool workers
+
+
+def fetch_history(symbol, history_ms):
+    """Stored ticks covering the last history_ms of a symbol, oldest first."""
+    if tick_store is not None:
+        latest = tick_store.latest_timestamp(symbol)
+        if latest is None:
+            return []
+        ticks = tick_store.read(symbol, latest - history_ms, latest + 1)
+        return [{"symbol": symbol, "timestamp": timestamp, "price": price, "quantity": quantity}
+                for timestamp, price, quantity in zip(ticks["timestamp"].tolist(), ticks["price"].tolist(),
+                                                      ticks["quantity"].tolist())]
+
+    latest = storage.latest_trade(collection, symbol)
+    if not latest:
+        return []
+    start = latest["timestamp"] - history_ms
+    return [dict(doc, symbol=symbol) for doc in storage.trades_range(collection, symbol, start=start)]
+
+
+def fetch_bars(symbol, interval_ms, history_ms):
+    """Closed rollup bars covering the last history_ms of a symbol, oldest first (None without a rollup)."""
+    interval = {ms: name for name, ms in storage.ROLLUPS.items()}.get(interval_ms)
+    if interval is None:
         return None
+    bars = db[storage.bars_name(interval)]
+    latest = next(storage.recent_bars(bars, symbol, 1), None)
+    if latest is None:
+        return None
+    return list(storage.bars_range(bars, symbol, latest["timestamp"] - history_ms, latest["timestamp"]))
+
+
+def restore_strategies(states=None):
+    """
+    Resume each instance from the state handed over by the supervisor, or else reload its last signal and replay
+    the history bar-based instances need.
+    """
+    states = states or {}
+    for strategy in runtime.strategies.values():
+        if strategy.name in states:
+            strategy.load_state(states[strategy.name])
+            continue
+        last_signal = redis_client.get(f"{REDIS_SIGNAL_KEY}:{strategy.name}")
+        strategy.last_signal = json.loads(last_signal).get("signal") if last_signal else None
+        if strategy.history_ms:
+            try:
+                bars = fetch_bars(strategy.symbol, strategy.bar_interval_ms, strategy.history_ms)
+                if bars:
+                    strategy.warm_up_bars(bars)
+                    logger.info(f"🔥 Warmed up {strategy.name} with {len(bars)} stored bars")
+                    continue
+                ticks = fetch_history(strategy.symbol, strategy.history_ms)
+                strategy.warm_up(ticks)
+                logger.info(f"🔥 Warmed up {strategy.name} with {len(ticks)} stored ticks")
+            except Exception as e:
+                logger.error(f"❌ Error warming up {strategy.name}: {e}")
 
 
-async def calculate_sma():
-    if len(price_buffer) < LONG_WINDOW:
-        logger.warning("⚠️ Not enough data for SMA calculation.")
-        return None, None
-
-    short_sma = sum(list(price_buffer)[-SHORT_WINDOW:]) / SHORT_WINDOW
-    long_sma = sum(list(price_buffer)[-LONG_WINDOW:]) / LONG_WINDOW
-    logger.info(f"📉 SMA Calculated - Short SMA: {short_sma}, Long SMA: {long_sma}")
-    return short_sma, long_sma
-
-
-async def generate_trade_signal(price, short_sma, long_sma, timestamp):
-    last_signal = redis_client.get(REDIS_SIGNAL_KEY)
-    last_signal = json.loads(last_signal) if last_signal else {}
-
-    if short_sma > long_sma and last_signal.get("signal") != "BUY":
-        logger.info(f"📈 BUY Signal Detected at {price} USDT")
-        await store_signal("BUY", price, timestamp)
-
-    elif short_sma < long_sma and last_signal.get("signal") != "SELL":
-        logger.info(f"📉 SELL Signal Detected at {price} USDT")
-        await store_signal("SELL", price, timestamp)
-
-
-async def store_signal(signal, price, timestamp):
+async def store_signal(signal, trace=None):
+    # The trace carries the tick's stage stamps on to execute.place_order (see latency.py).
+    trace = dict(trace or {}, signal_at=now_ns())
+    observe("strategy_to_signal", trace.get("strategy_at"), trace["signal_at"])
+    metrics.inc("signals_total", strategy=signal["strategy"], symbol=signal["symbol"], side=signal["signal"])
     signal_data = {
-        "timestamp": str(timestamp),
-        "signal": signal,
-        "price": price,
-        "status": "pending"
+        "strategy": signal["strategy"],
+        "symbol": signal["symbol"],
+        "timestamp": signal["timestamp"],  # Epoch ms of the tick (or bar open) that triggered it
+        "signal": signal["signal"],
+        "price": signal["price"],
+        "status": "pending",
+        "trace": trace
     }
 
     result = signals_collection.insert_one(signal_data)
     signal_data["_id"] = str(result.inserted_id)
-    redis_client.set(REDIS_SIGNAL_KEY, json.dumps(signal_data))
-    redis_client.publish("trade_signals", json.dumps(signal_data))
-    logger.info(f"✅ Published Signal to Redis: {signal_data}")
+    redis_client.set(f"{REDIS_SIGNAL_KEY}:{signal['strategy']}", json.dumps(signal_data))
+    publish(redis_client, TRADE_SIGNALS_CHANNEL, encode(TRADE_SIGNALS_CHANNEL, signal_data))
+    logger.info(f"{'📈' if signal['signal'] == 'BUY' else '📉'} {signal['strategy']} published {signal['signal']} "
+                f"for {signal['symbol']} at {signal['price']}")
 
 
 async def process_new_trades():
-    logger.info("🎧 Listening for new trade data...")
-    pubsub = redis_client.pubsub()
-    pubsub.subscribe("raw_trades")
+    symbols = runtime.symbols()
+    logger.info(f"🎧 Listening for new trade data on {symbols} ({len(runtime.strategies)} strategy instances)...")
+    if MESSAGE_TRANSPORT == "streams":
+        await consume_trade_streams(symbols)
+        return
 
-    for message in pubsub.listen():
-        if message["type"] == "message":
+    pubsub = raw_redis_client.pubsub()
+    pubsub.subscribe(*(trade_channel(symbol) for symbol in symbols))
+
+    while True:
+        # A timeout rather than listen(), so quiet symbols still get their load reported
+        message = pubsub.get_message(timeout=IDLE_POLL_SECONDS)
+        report_load()
+        if message is not None and message["type"] == "message":
             try:
-                trade_data = convert_mongo_document(json.loads(message["data"]))
-                logger.info(f"📊 New Trade Received: {trade_data}") #exhaust logging file much
+                trade_data = decode(message["data"])
+                tick_logger.info("📊 New Trade Received: %s", trade_data)
                 await handle_trade(trade_data)
 
             except Exception as e:
                 logger.error(f"⚠️ Error processing trade data: {e}")
 
 
+async def consume_trade_streams(symbols):
+    """
+    Streams transport: strategy workers share the "strategy" consumer group and handle trades in batches. All of
+    the worker's symbol streams are read with one blocking XREADGROUP, so busy symbols never wait behind quiet ones.
+    """
+    consumer = MultiStreamConsumer(raw_redis_client, [trade_channel(symbol) for symbol in symbols],
+                                   STRATEGY_CONSUMER_GROUP)
+    consumer.ensure_group()
+
+    while True:
+        try:
+            batch = await asyncio.to_thread(consumer.read)
+        except Exception as e:
+            logger.error(f"⚠️ Error reading trade streams: {e}")
+            await asyncio.sleep(5)
+            continue
+
+        acks = defaultdict(list)
+        for stream, entry_id, data in batch:
+            acks[stream].append(entry_id)
+            if data is None:
+                continue
+            try:
+                await handle_trade(decode(data))
+            except Exception as e:
+                logger.error(f"⚠️ Error processing trade data: {e}")
+        for stream, entry_ids in acks.items():
+            consumer.ack(stream, entry_ids)
+        report_load()
+
+
 async def handle_trade(trade_data):
-    price = trade_data["price"]
-    timestamp = trade_data["timestamp"]
+    started = time.perf_counter()
+    strategy_at = now_ns()
+    observe("feed_to_strategy", trade_data.get("received_at"), strategy_at)
+    metrics.inc("trades_processed_total", symbol=trade_data["symbol"])
 
-    price_buffer.append(price)
+    signals = runtime.on_tick(trade_data)
+    if signals:
+        trace = {"tick_received_at": trade_data.get("received_at"), "tick_event_time": trade_data.get("timestamp"),
+                 "strategy_at": strategy_at}
+        for signal in signals:
+            await store_signal(signal, trace)
 
-    if len(price_buffer) >= LONG_WINDOW:
-        short_sma, long_sma = await calculate_sma()
-        await generate_trade_signal(price, short_sma, long_sma, timestamp)
+    if load_reporter is not None:
+        load_reporter.record(time.perf_counter() - started)
 
 
-async def run_sma_strategy():
-    while True:
-        df = await fetch_price_data()
-        if df is not None and not df.empty:
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df["interval"] = df["timestamp"].dt.floor("T" if TIME_UNIT == "minutes" else "S")
-            grouped_df = df.groupby("interval")["price"].first().dropna()
-
-            if DATA_COLLECTION_MODE == "STRICT":
-                latest_time = grouped_df.index[-1]
-                start_time = latest_time - timedelta(seconds=LONG_WINDOW - 1)
-
-                while len(grouped_df[(grouped_df.index >= start_time)]) < LONG_WINDOW:
-                    start_time -= timedelta(seconds=1)  # Move back one second at a time
-
-                time_filtered_df = grouped_df[(grouped_df.index >= start_time)]
-                logger.info(f"📌 STRICT Mode: Filtering data from {start_time} to {latest_time}. Found {len(time_filtered_df)} intervals.")
-
-            elif DATA_COLLECTION_MODE == "FLEXIBLE":
-                time_filtered_df = grouped_df.tail(max(SHORT_WINDOW, min(LONG_WINDOW, len(grouped_df))))
-                logger.info(f"📌 FLEXIBLE Mode: Using last {len(time_filtered_df)} available intervals.")
-
-            if len(time_filtered_df) >= LONG_WINDOW:
-                price_buffer.clear()
-                price_buffer.extend(time_filtered_df[-LONG_WINDOW:].values)
-                short_sma, long_sma = await calculate_sma()
-                if short_sma and long_sma:
-                    await generate_trade_signal(time_filtered_df.iloc[-1], short_sma, long_sma, time_filtered_df.index[-1])
-            else:
-                logger.warning(f"⚠️ Not enough unique time points for SMA. Available: {len(time_filtered_df)}/{LONG_WINDOW}. Waiting for more data...")
-        else:
-            logger.warning("df is empty")
-        await asyncio.sleep(1)
+def report_load():
+    if load_reporter is not None:
+        load_reporter.poll()
+
+
+def run_worker(worker, strategies, states, reports):
+    """Pool worker: serves its share of the instances, resuming from the supervisor's checkpoint."""
+    global load_reporter
+    setup_logging(f"strategy-{worker}")
+    metrics.start("strategy", redis_client)
+    for strategy in strategies:
+        runtime.add(strategy)
+    restore_strategies(states)
+    load_reporter = LoadReporter(worker, reports, runtime)
+    asyncio.run(process_new_trades())
 
 
 if __name__ == "__main__":
     logger.info("🚀 Starting Strategy Process...")
-    loop = asyncio.get_event_loop()
-    if EXECUTION_MODE == "HFT":
-        loop.create_task(process_new_trades())
+    storage.ensure_schema(db)
+    metrics.start("strategy", redis_client)
+    strategies = build_strategies()
+    if STRATEGY_WORKERS <= 1:
+        for strategy in strategies:
+            runtime.add(strategy)
+        restore_strategies()
+        asyncio.run(process_new_trades())
     else:
-        loop.create_task(run_sma_strategy())
-    loop.run_forever()
+        StrategySupervisor(strategies, STRATEGY_WORKERS, run_worker).run()
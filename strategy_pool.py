@@ -0,0 +1,197 @@
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from collections import defaultdict
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+VIRTUAL_NODES = 100  # Points per worker on the ring; evens out the share of symbols each worker gets
+REPORT_INTERVAL_SECONDS = 5
+SUPERVISE_INTERVAL_SECONDS = 1
+RESTART_BACKOFF_SECONDS = 1  # Delay before the second restart in a row, doubled for every further one
+MAX_RESTART_BACKOFF_SECONDS = 60
+STABLE_UPTIME_SECONDS = 60  # A worker that ran this long before dying is restarted right away again
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring: adding or removing a worker only moves the symbols that hashed to it."""
+
+    def __init__(self, nodes=(), virtual_nodes=VIRTUAL_NODES):
+        self.virtual_nodes = virtual_nodes
+        self._points = []
+        self._nodes = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.virtual_nodes):
+            point = _hash(f"{node}#{i}")
+            bisect.insort(self._points, point)
+            self._nodes[point] = node
+
+    def remove(self, node):
+        for i in range(self.virtual_nodes):
+            point = _hash(f"{node}#{i}")
+            self._points.remove(point)
+            del self._nodes[point]
+
+    def node_for(self, key):
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._nodes[self._points[index]]
+
+
+def assign(strategies, ring):
+    """Instances grouped by worker. The symbol is the key, so every tick of a symbol is handled by one worker."""
+    assignments = defaultdict(list)
+    for strategy in strategies:
+        assignments[ring.node_for(strategy.symbol)].append(strategy)
+    return dict(assignments)
+
+
+class LoadReporter:
+    """
+    Worker side: counts ticks and busy time, and every `interval` seconds sends them to the supervisor together
+    with a checkpoint of the worker's strategy state. The worker calls poll() while its symbols are quiet, so
+    the load gauges drop to zero instead of keeping the last busy interval.
+    """
+
+    def __init__(self, worker, reports, runtime, interval=REPORT_INTERVAL_SECONDS, clock=time.monotonic):
+        self.worker = worker
+        self.reports = reports
+        self.runtime = runtime
+        self.interval = interval
+        self.clock = clock
+        self.ticks = 0
+        self.busy_seconds = 0.0
+        self._started = clock()
+
+    def record(self, busy_seconds):
+        self.ticks += 1
+        self.busy_seconds += busy_seconds
+        self.poll()
+
+    def poll(self):
+        """Send the report if the interval is up."""
+        if self.clock() - self._started >= self.interval:
+            self.flush()
+
+    def flush(self):
+        now = self.clock()
+        self.reports.put({
+            "worker": self.worker,
+            "pid": os.getpid(),
+            "ticks": self.ticks,
+            "busy_seconds": self.busy_seconds,
+            "elapsed": now - self._started,
+            "instances": len(self.runtime.strategies),
+            "states": self.runtime.state(),
+        })
+        self.ticks, self.busy_seconds, self._started = 0, 0.0, now
+
+
+class StrategySupervisor:
+    """
+    Spreads strategy instances over `worker_count` processes with a consistent hash ring on the symbol.
+    Workers run `target(worker, strategies, states, reports)`. A worker that dies is restarted with the same
+    instances and the state from its last checkpoint, with exponential backoff when it keeps dying (e.g. Redis
+    down at startup); per-worker load is exported as gauges.
+    """
+
+    def __init__(self, strategies, worker_count, target, context=None, clock=time.monotonic):
+        self.context = context or multiprocessing.get_context("spawn")
+        self.target = target
+        self.clock = clock
+        self.ring = HashRing(range(worker_count))
+        self.assignments = assign(strategies, self.ring)
+        self.reports = self.context.Queue()
+        self.processes = {}
+        self.states = {}  # Latest checkpoint per strategy instance
+        self.load = {}  # Latest report per worker
+        self.restarts = defaultdict(int)
+        self.failures = defaultdict(int)  # Deaths in a row, each within STABLE_UPTIME_SECONDS of its start
+        self._started_at = {}
+        self._restart_at = {}
+
+    def start(self):
+        for worker, strategies in self.assignments.items():
+            symbols = sorted({strategy.symbol for strategy in strategies})
+            logger.info(f"🧩 Worker {worker}: {len(strategies)} instances on {symbols}")
+            self._spawn(worker)
+
+    def poll(self):
+        self._drain_reports()
+        now = self.clock()
+        for worker, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            if worker not in self._restart_at:
+                self._schedule_restart(worker, process.exitcode, now)
+            if now >= self._restart_at[worker]:
+                del self._restart_at[worker]
+                self._spawn(worker)
+
+    def run(self, should_stop=None, interval=SUPERVISE_INTERVAL_SECONDS):
+        if should_stop is None:
+            stopping = []
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda signum, frame: stopping.append(signum))
+            should_stop = lambda: bool(stopping)
+
+        self.start()
+        try:
+            while not should_stop():
+                time.sleep(interval)
+                self.poll()
+        finally:
+            self.stop()
+
+    def stop(self):
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            process.join()
+        self._drain_reports()
+
+    def _schedule_restart(self, worker, exitcode, now):
+        uptime = now - self._started_at[worker]
+        self.failures[worker] = 1 if uptime >= STABLE_UPTIME_SECONDS else self.failures[worker] + 1
+        self.restarts[worker] += 1
+        # The first restart is immediate; a worker that keeps dying waits 1, 2, 4 ... seconds.
+        failures = self.failures[worker]
+        delay = min(RESTART_BACKOFF_SECONDS * 2 ** (failures - 2), MAX_RESTART_BACKOFF_SECONDS) if failures > 1 else 0
+        self._restart_at[worker] = now + delay
+        metrics.inc("strategy_worker_restarts_total", worker=str(worker))
+        logger.error(f"❌ Strategy worker {worker} exited with {exitcode} after {uptime:.0f}s, "
+                     f"restart #{self.restarts[worker]} from checkpoint in {delay:.0f}s")
+
+    def _spawn(self, worker):
+        strategies = self.assignments[worker]
+        states = {s.name: self.states[s.name] for s in strategies if s.name in self.states}
+        process = self.context.Process(target=self.target, args=(worker, strategies, states, self.reports),
+                                       name=f"strategy-{worker}", daemon=True)
+        process.start()
+        self.processes[worker] = process
+        self._started_at[worker] = self.clock()
+
+    def _drain_reports(self):
+        while True:
+            try:
+                report = self.reports.get_nowait()
+            except queue.Empty:
+                return
+            self.states.update(report.pop("states"))
+            worker, elapsed = report["worker"], report["elapsed"] or 1e-9
+            self.load[worker] = report
+            metrics.set("strategy_worker_ticks_per_second", report["ticks"] / elapsed, worker=str(worker))
+            metrics.set("strategy_worker_busy_ratio", report["busy_seconds"] / elapsed, worker=str(worker))
+            metrics.set("strategy_worker_instances", report["instances"], worker=str(worker))
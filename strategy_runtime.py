@@ -0,0 +1,188 @@
+import logging
+from collections import defaultdict
+from bars import INTERVAL_MS, BarAggregator
+from configuration import STRATEGIES
+from indicators import IndicatorEngine, crossover_signal
+from metrics import metrics
+from tick_store import to_epoch_ms
+
+logger = logging.getLogger(__name__)
+
+
+class Strategy:
+    """
+    Base class for strategy plugins. One instance trades one symbol and owns all of its state, so any number of
+    instances (different parameters, different symbols) can share a process.
+    on_tick returns the signals the tick produced as a list of dicts.
+    """
+
+    plugin = None
+
+    def __init__(self, name, symbol):
+        self.name = name
+        self.symbol = symbol.upper()
+        self.last_signal = None
+
+    @property
+    def history_ms(self):
+        """How much stored history to replay through warm_up before going live."""
+        return 0
+
+    @property
+    def bar_interval_ms(self):
+        """Bar size the instance trades on, or None when it works tick by tick."""
+        return None
+
+    def on_tick(self, tick, emit=True):
+        raise NotImplementedError
+
+    def warm_up_bars(self, bars):
+        """Prime from stored OHLCV bars (oldest first) instead of raw ticks; see rollups.py."""
+        raise NotImplementedError
+
+    def warm_up(self, ticks):
+        for tick in ticks:
+            self.on_tick(tick, emit=False)
+
+    def state(self):
+        """Picklable snapshot of everything the instance has learned, for handing it to another process."""
+        return {"last_signal": self.last_signal}
+
+    def load_state(self, state):
+        self.last_signal = state.get("last_signal")
+
+    def _signal(self, side, price, timestamp):
+        self.last_signal = side
+        return {"strategy": self.name, "symbol": self.symbol, "signal": side, "price": price, "timestamp": timestamp}
+
+
+class SmaCrossover(Strategy):
+    """
+    SMA crossover, tick by tick (HFT) or on closed bars (TIME_BASED). With TIME_BASED, STRICT counts every
+    interval (quiet ones forward-filled) and FLEXIBLE only intervals that had trades.
+    """
+
+    plugin = "sma_crossover"
+
+    def __init__(self, name, symbol, short_window=50, long_window=200, execution_mode="HFT", time_unit="seconds",
+                 data_collection_mode="STRICT"):
+        super().__init__(name, symbol)
+        self.short_window = short_window
+        self.long_window = long_window
+        self.execution_mode = execution_mode
+        self.data_collection_mode = data_collection_mode
+        self.interval_ms = INTERVAL_MS[time_unit]
+        self.indicators = IndicatorEngine(sma_windows=(short_window, long_window))
+        self.bars = BarAggregator(self.interval_ms, max_fill=long_window) if execution_mode == "TIME_BASED" else None
+
+    @property
+    def history_ms(self):
+        return self.long_window * self.interval_ms if self.bars is not None else 0
+
+    @property
+    def bar_interval_ms(self):
+        return self.interval_ms if self.bars is not None else None
+
+    def on_tick(self, tick, emit=True):
+        quantity = tick.get("quantity", 0.0)
+        if self.bars is None:
+            return self._update(tick["price"], quantity, tick["timestamp"], emit)
+
+        signals = []
+        for bar in self.bars.add(to_epoch_ms(tick["timestamp"]), tick["price"], quantity):
+            if self.data_collection_mode == "FLEXIBLE" and bar["filled"]:
+                continue
+            signals.extend(self._update(bar["open"], bar["volume"], bar["timestamp"], emit))
+        return signals
+
+    def warm_up_bars(self, bars):
+        # Stored bars skip quiet intervals; STRICT forward-fills them the way BarAggregator does live.
+        previous = None
+        for bar in bars:
+            if previous is not None and self.data_collection_mode == "STRICT":
+                gap = min((bar["timestamp"] - previous["timestamp"]) // self.interval_ms - 1, self.long_window)
+                for _ in range(gap):
+                    self.indicators.update(previous["close"], 0.0)
+            self.indicators.update(bar["open"], bar["volume"])
+            previous = bar
+
+    def state(self):
+        count = len(self.indicators.prices)
+        return dict(super().state(), prices=self.indicators.prices.last(count),
+                    quantities=self.indicators.quantities.last(count),
+                    bar=dict(self.bars.current) if self.bars is not None and self.bars.current else None)
+
+    def load_state(self, state):
+        super().load_state(state)
+        self.indicators.reset()
+        for price, quantity in zip(state.get("prices", ()), state.get("quantities", ())):
+            self.indicators.update(price, quantity)
+        if self.bars is not None:
+            self.bars.current = state.get("bar")
+
+    def _update(self, price, quantity, timestamp, emit):
+        self.indicators.update(price, quantity)
+        if not emit or not self.indicators.ready(self.long_window):
+            return []
+        side = crossover_signal(self.indicators.sma(self.short_window), self.indicators.sma(self.long_window),
+                                self.last_signal)
+        return [self._signal(side, price, timestamp)] if side else []
+
+
+PLUGINS = {plugin.plugin: plugin for plugin in (SmaCrossover,)}
+
+
+def build_strategies(config=STRATEGIES):
+    """Instantiate the configured strategies; an entry with several symbols becomes one instance per symbol."""
+    strategies = []
+    for entry in config:
+        plugin = PLUGINS[entry["plugin"]]
+        symbols = entry["symbols"]
+        for symbol in symbols:
+            name = entry["name"] if len(symbols) == 1 else f"{entry['name']}:{symbol.upper()}"
+            strategies.append(plugin(name, symbol, **entry.get("params", {})))
+    return strategies
+
+
+class StrategyRuntime:
+    """Hosts strategy instances and routes each tick only to the instances subscribed to its symbol."""
+
+    def __init__(self, strategies=()):
+        self.strategies = {}
+        self.routes = defaultdict(list)
+        for strategy in strategies:
+            self.add(strategy)
+
+    def add(self, strategy):
+        if strategy.name in self.strategies:
+            raise ValueError(f"Duplicate strategy name: {strategy.name}")
+        self.strategies[strategy.name] = strategy
+        self.routes[strategy.symbol].append(strategy)
+
+    def remove(self, name):
+        strategy = self.strategies.pop(name)
+        self.routes[strategy.symbol].remove(strategy)
+        if not self.routes[strategy.symbol]:
+            del self.routes[strategy.symbol]
+        return strategy
+
+    def symbols(self):
+        return sorted(self.routes)
+
+    def state(self):
+        return {name: strategy.state() for name, strategy in self.strategies.items()}
+
+    def load_state(self, states):
+        for name, state in states.items():
+            if name in self.strategies:
+                self.strategies[name].load_state(state)
+
+    def on_tick(self, tick):
+        signals = []
+        for strategy in self.routes.get(tick["symbol"].upper(), ()):
+            try:
+                signals.extend(strategy.on_tick(tick))
+            except Exception as e:
+                metrics.inc("strategy_errors_total", strategy=strategy.name)
+                logger.error(f"❌ Strategy {strategy.name} failed on tick: {e}")
+        return signals
@@ -0,0 +1,74 @@
+import mongomock
+import numpy as np
+import pytest
+
+from backtest import Backtester, iter_ticks_from_collection, load_ticks_from_collection, load_ticks_from_file
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(3)
+    return 50000 * np.exp(np.cumsum(rng.normal(0, 0.002, 20000)))
+
+
+def comparable(report):
+    return {k: v for k, v in report.items() if k not in ("exits", "elapsed_seconds", "ticks_per_second")}
+
+
+@pytest.mark.parametrize("chunk_size", [777, 1_000_000])
+def test_fast_path_matches_tick_by_tick(prices, chunk_size):
+    timestamps = np.arange(len(prices))
+    slow = Backtester(short_window=20, long_window=100, fee_rate=0.001)
+    slow_report = slow.run({"price": p, "timestamp": t} for p, t in zip(prices, timestamps))
+    fast = Backtester(short_window=20, long_window=100, fee_rate=0.001)
+    fast_report = fast.run_arrays(prices, timestamps, chunk_size=chunk_size)
+
+    assert fast_report["exits"] == slow_report["exits"]
+    assert comparable(fast_report) == pytest.approx(comparable(slow_report))
+    assert fast.signal_sink.signals == slow.signal_sink.signals
+    assert fast.order_sink.orders == slow.order_sink.orders
+    assert slow_report["exits"]["stop_loss"] > 0
+    assert slow_report["exits"]["take_profit"] > 0
+
+
+def test_brackets_follow_place_order():
+    backtester = Backtester(short_window=1, long_window=2, order_size=1, sl_percent=1, tp_percent=2)
+    for price in [100, 101, 103.5]:
+        backtester.on_tick(price)
+
+    buy, take_profit = backtester.order_sink.orders
+    assert buy["side"] == "BUY" and buy["price"] == 101
+    assert buy["stop_loss"] == pytest.approx(99.99)
+    assert buy["take_profit"] == pytest.approx(103.02)
+    assert take_profit["reason"] == "take_profit"
+
+    report = backtester.report()
+    assert report["pnl"] == pytest.approx(2.5)
+    assert report["trades"] == report["wins"] == 1
+    assert report["open_position"] is None
+
+
+def test_reads_ticks_from_collection_and_file(tmp_path):
+    collection = mongomock.MongoClient()["trading_db"]["trades"]
+    collection.insert_many([
+        {"symbol": "BTCUSDT", "price": 2.0, "quantity": 1.0, "timestamp": 1739361601000},
+        {"symbol": "BTCUSDT", "price": 1.0, "quantity": 1.0, "timestamp": 1739361600000},
+        {"symbol": "ETHUSDT", "price": 9.0, "quantity": 1.0, "timestamp": 1739361600000},
+    ])
+    assert [tick["price"] for tick in iter_ticks_from_collection(collection, "BTCUSDT")] == [1.0, 2.0]
+
+    path = tmp_path / "ticks.csv"
+    path.write_text("price,timestamp\n1.0,2025-02-12T12:00:00\n2.0,2025-02-12T12:00:01\n")
+    frame = load_ticks_from_file(str(path))
+    assert frame["price"].tolist() == [1.0, 2.0]
+    assert frame["quantity"].tolist() == [0.0, 0.0]
+    assert frame["timestamp"].tolist() == [1739361600000, 1739361601000]  # Legacy ISO export
+
+
+def test_empty_collection_gives_an_empty_report():
+    collection = mongomock.MongoClient()["trading_db"]["trades"]
+    frame = load_ticks_from_collection(collection, "BTCUSDT")
+    assert frame.empty and list(frame.columns) == ["price", "quantity", "timestamp"]
+
+    report = Backtester(2, 4).run_arrays(frame["price"].to_numpy(), frame["timestamp"].to_numpy())
+    assert (report["trades"], report["pnl"], report["open_position"]) == (0, 0, None)
@@ -0,0 +1,26 @@
+from bars import BarAggregator
+
+
+def test_ohlcv_and_forward_fill():
+    aggregator = BarAggregator(1000)
+    assert aggregator.add(10_100, 5.0, 1.0) == []
+    assert aggregator.add(10_900, 7.0, 2.0) == []
+    assert aggregator.add(10_950, 4.0, 1.0) == []
+
+    closed = aggregator.add(13_200, 6.0, 0.5)
+    assert [bar["timestamp"] for bar in closed] == [10_000, 11_000, 12_000]
+    assert closed[0] == {"timestamp": 10_000, "open": 5.0, "high": 7.0, "low": 4.0, "close": 4.0,
+                         "volume": 4.0, "trades": 3, "filled": False}
+    assert all(bar["filled"] and bar["open"] == bar["close"] == 4.0 for bar in closed[1:])
+
+    assert aggregator.add(12_999, 100.0) == []  # late tick is ignored
+    assert (aggregator.current["timestamp"], aggregator.current["close"]) == (13_000, 6.0)  # Still in progress
+
+
+def test_fill_is_capped():
+    aggregator = BarAggregator(60_000, max_fill=3)
+    aggregator.add(0, 1.0)
+    closed = aggregator.add(60_000 * 100, 2.0)
+
+    assert len(closed) == 4
+    assert [bar["timestamp"] for bar in closed[1:]] == [60_000 * 97, 60_000 * 98, 60_000 * 99]
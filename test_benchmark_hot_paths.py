@@ -0,0 +1,37 @@
+import json
+import pytest
+import execute
+import strategy
+from benchmark_hot_paths import compare, run
+
+PATCHED = {
+    strategy: ("db", "collection", "signals_collection", "redis_client", "tick_store", "runtime"),
+    execute: ("redis_client", "exchange", "ledger", "orders_collection", "signals_collection", "signal_book",
+              "order_scheduler"),
+}
+
+
+@pytest.fixture
+def restore_services(monkeypatch):
+    for module, names in PATCHED.items():
+        for name in names:
+            monkeypatch.setattr(module, name, getattr(module, name))
+
+
+def test_benchmarks_run_offline(restore_services):
+    report = json.loads(json.dumps(run(ticks=500, cycles=2, orders=10, short_window=5, long_window=20)))
+    results = report["results"]
+
+    assert results["handle_trade"]["ticks"] == 500 and results["handle_trade"]["signals"] > 0
+    assert results["warm_up"]["history_ticks"] == 2000  # 20 one-second bars of ticks 10 ms apart
+    assert results["place_order"]["filled"] == 10
+    assert compare(report, report) == []
+
+
+def test_compare_flags_slower_runs():
+    baseline = {"results": {"handle_trade": {"ticks_per_second": 1000.0}, "place_order": {"p99_ms": 10.0}}}
+    current = {"results": {"handle_trade": {"ticks_per_second": 700.0}, "place_order": {"p99_ms": 11.0}}}
+
+    assert compare(current, baseline) == [("handle_trade", "ticks_per_second", 1000.0, 700.0)]
+    assert compare(current, baseline, tolerance=0.05) == [("handle_trade", "ticks_per_second", 1000.0, 700.0),
+                                                           ("place_order", "p99_ms", 10.0, 11.0)]
@@ -0,0 +1,66 @@
+import asyncio
+import json
+import pytest
+import websockets
+
+from binance_stream import combined_stream_urls, parse_trade_message, shard, stream_trades
+
+
+def test_combined_stream_urls_respect_cap():
+    symbols = [f"sym{i}usdt" for i in range(5)]
+    urls = combined_stream_urls(symbols, "wss://stream.binance.com:9443/", 2)
+
+    assert urls == [
+        "wss://stream.binance.com:9443/stream?streams=sym0usdt@trade/sym1usdt@trade",
+        "wss://stream.binance.com:9443/stream?streams=sym2usdt@trade/sym3usdt@trade",
+        "wss://stream.binance.com:9443/stream?streams=sym4usdt@trade",
+    ]
+
+
+def test_shard_spreads_round_robin():
+    assert shard(["a", "b", "c", "d", "e"], 2) == [["a", "c", "e"], ["b", "d"]]
+    assert shard(["a"], 4) == [["a"]]
+
+
+def test_parse_trade_message_accepts_raw_and_combined_payloads():
+    trade = {"e": "trade", "s": "ETHUSDT", "t": 1530201, "p": "3000.5", "q": "0.2", "T": 1739361601120}
+    raw = parse_trade_message(json.dumps(trade))
+    combined = parse_trade_message(json.dumps({"stream": "ethusdt@trade", "data": trade}))
+
+    for record in (raw, combined):
+        assert record["symbol"] == "ETHUSDT"
+        assert record["price"] == 3000.5
+        assert record["quantity"] == 0.2
+        assert record["timestamp"] == 1739361601120
+        assert record["trade_id"] == 1530201
+        assert record["received_at"] > 0
+
+
+@pytest.mark.asyncio
+async def test_stream_trades_against_local_server():
+    requested_paths = []
+
+    async def handler(websocket, path):
+        requested_paths.append(path)
+        for stream in path.split("streams=")[1].split("/"):
+            symbol = stream.split("@")[0].upper()
+            trade = {"s": symbol, "t": 1, "p": "1.5", "q": "2", "T": 1739361601120}
+            await websocket.send(json.dumps({"stream": stream, "data": trade}))
+        await websocket.wait_closed()
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        urls = combined_stream_urls(["btcusdt", "ethusdt", "solusdt"], f"ws://127.0.0.1:{port}", 2)
+        received = []
+
+        tasks = [asyncio.create_task(stream_trades(url, received.append)) for url in urls]
+        for _ in range(50):
+            if len(received) == 3:
+                break
+            await asyncio.sleep(0.05)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert len(requested_paths) == 2
+    assert sorted(record["symbol"] for record in received) == ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
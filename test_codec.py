@@ -0,0 +1,29 @@
+import pytest
+from bson import ObjectId
+
+from codec import CODECS, TickCodec, codec_for, decode
+
+
+def tick(**extra):
+    return {"symbol": "BTCUSDT", "price": 97234.51, "quantity": 0.00213, "timestamp": 1739361601120,
+            "trade_id": 4521873301, "received_at": 123456789012, **extra}
+
+
+@pytest.mark.parametrize("record", [tick(_id=ObjectId()), tick(_id="65ac0f2b9d1e8a0012345678"), tick()])
+def test_binary_and_json_decode_to_the_same_record(record):
+    binary = CODECS["binary"].encode(record)
+    text = CODECS["json"].encode(record)
+
+    assert binary[0] == 3 and len(binary) == TickCodec.layout.size + len("BTCUSDT")
+    assert decode(binary) == decode(text) == {**record, **({"_id": str(record["_id"])} if "_id" in record else {})}
+
+
+def test_codec_selection_and_versioning():
+    codecs = {"raw_trades": "binary", "trade_signals": "json"}
+    assert codec_for("raw_trades:ETHUSDT", codecs).name == "binary"
+    assert codec_for("trade_signals", codecs).name == "json"
+    assert codec_for("something_else", codecs).name == "json"
+
+    assert decode(b'{"signal": "BUY"}') == decode('{"signal": "BUY"}') == {"signal": "BUY"}
+    with pytest.raises(ValueError):
+        CODECS["binary"].decode(b"\x04" + CODECS["binary"].encode(tick())[1:])
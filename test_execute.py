@@ -0,0 +1,295 @@
+import asyncio
+import json
+
+import fakeredis.aioredis
+from bson import ObjectId
+import mongomock
+import pytest
+
+import execute
+from latency import wall_ms
+from ledger import Ledger
+from order_scheduler import OrderScheduler
+from signal_book import SignalBook
+
+
+class FakeExchange:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.orders = []
+        self.rest_calls = 0
+
+    async def fetch_balance(self):
+        self.rest_calls += 1
+        await asyncio.sleep(self.delay)
+        return {"BTC": {"free": 1.0}, "USDT": {"free": 100000.0}}
+
+    async def fetch_ticker(self, symbol):
+        self.rest_calls += 1
+        await asyncio.sleep(self.delay)
+        return {"last": 50000.0}
+
+    async def create_market_buy_order(self, symbol, amount):
+        self.orders.append(("BUY", symbol, amount))
+        return {"id": len(self.orders)}
+
+    async def create_market_sell_order(self, symbol, amount):
+        self.orders.append(("SELL", symbol, amount))
+        return {"id": len(self.orders)}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    db = mongomock.MongoClient()["trading_db"]
+    exchange = FakeExchange()
+    monkeypatch.setattr(execute, "redis_client", fakeredis.aioredis.FakeRedis(decode_responses=True))
+    monkeypatch.setattr(execute, "exchange", exchange)
+    monkeypatch.setattr(execute, "ledger", Ledger(exchange, execute.ORDER_SYMBOL))
+    monkeypatch.setattr(execute, "orders_collection", db["trade_orders"])
+    monkeypatch.setattr(execute, "signals_collection", db["trade_signals"])
+    monkeypatch.setattr(execute, "signal_book", SignalBook(db["trade_signals"]))
+    monkeypatch.setattr(execute, "order_scheduler", OrderScheduler(execute.execute_order, execute.cancel_signals, 0))
+    return exchange
+
+
+@pytest.mark.asyncio
+async def test_place_order_fetches_balance_and_ticker_concurrently(service):
+    signal_id = str(execute.signals_collection.insert_one({"signal": "BUY", "price": 50000.0, "status": "pending"})
+                    .inserted_id)
+
+    started = asyncio.get_running_loop().time()
+    order = await execute.place_order("BUY", 50000.0, signal_id=signal_id)
+    elapsed = asyncio.get_running_loop().time() - started
+
+    assert order == {"id": 1}
+    assert elapsed < 2 * service.delay
+    assert execute.orders_collection.count_documents({"side": "BUY", "status": "filled", "signal_id": signal_id}) == 1
+    assert await execute.signal_book.flush() == 1
+    assert execute.signals_collection.find_one()["status"] == "filled"
+    assert await execute.redis_client.get(f"trade_lock_{signal_id}") is None
+
+    # The second order is checked against the ledger, which already holds the first fill.
+    assert await execute.place_order("BUY", 50100.0) == {"id": 2}
+    assert service.rest_calls == 2
+    assert execute.ledger.free("BTC") == pytest.approx(1.0 + 2 * execute.ORDER_SIZE)
+
+
+@pytest.mark.asyncio
+async def test_place_order_respects_lock(service):
+    await execute.redis_client.set("trade_lock_SELL_50000.0", "locked", ex=5, nx=True)
+
+    assert await execute.place_order("SELL", 50000.0) is None
+    assert service.orders == []
+
+
+@pytest.mark.asyncio
+async def test_listener_reacts_to_published_signal(service):
+    signal_id = str(execute.signals_collection.insert_one({"signal": "SELL", "price": 51000.0, "status": "pending"})
+                    .inserted_id)
+    listener = asyncio.create_task(execute.listen_for_trade_signals())
+    scheduler = asyncio.create_task(execute.order_scheduler.run())
+    while not (await execute.redis_client.pubsub_numsub(execute.SIGNAL_CHANNEL))[0][1]:
+        await asyncio.sleep(0.01)
+
+    await execute.redis_client.publish(execute.SIGNAL_CHANNEL, json.dumps({"_id": signal_id, "signal": "SELL", "price": 51000.0}))
+    for _ in range(100):
+        if service.orders:
+            break
+        await asyncio.sleep(0.01)
+    listener.cancel()
+    scheduler.cancel()
+
+    assert service.orders == [("SELL", execute.ORDER_SYMBOL, execute.ORDER_SIZE)]
+
+
+@pytest.mark.asyncio
+async def test_order_records_stage_latencies(service):
+    from latency import now_ns, observe
+    from metrics import metrics
+
+    metrics.drain()
+    start = now_ns()
+    trace = {"tick_received_at": start, "tick_event_time": 1739361601120, "strategy_at": start + 1_000_000,
+             "signal_at": start + 3_000_000}
+    assert await execute.place_order("BUY", 50000.0, trace)
+
+    order = execute.orders_collection.find_one()
+    assert order["latency"]["feed_to_strategy"] == pytest.approx(0.001)
+    assert order["latency"]["strategy_to_signal"] == pytest.approx(0.002)
+    assert order["latency"]["order_to_ack"] >= 0
+    assert order["execution_time"] >= order["latency"]["signal_to_order"] + 0.003
+
+    pushed = metrics.drain()
+    stages = {labels["stage"]: sum(counts) for name, labels, _, counts, _ in pushed["histograms"]
+              if name == "tick_to_trade_stage_seconds"}
+    assert stages == {"signal_to_order": 1, "order_to_ack": 1}
+    assert ["trade_executed_total", {"symbol": execute.ORDER_SYMBOL, "side": "BUY"}, 1] in pushed["counters"]
+    with pytest.raises(ValueError):
+        observe("signal_to_fill", start, start + 1)  # Not one of latency.STAGES
+
+
+@pytest.mark.asyncio
+async def test_signal_lifecycle_is_keyed_by_id(service):
+    same_price = {"signal": "BUY", "price": 50000.0, "status": "pending", "timestamp": 1735689600000}
+    first = str(execute.signals_collection.insert_one(dict(same_price)).inserted_id)
+    second = str(execute.signals_collection.insert_one(dict(same_price, timestamp=1735689601000))
+                 .inserted_id)
+
+    await execute.handle_signal(dict(same_price, _id=first))
+    await execute.handle_signal(dict(same_price, _id=first))  # Redelivered
+    await execute.handle_signal(dict(same_price, _id=second))
+    await execute.order_scheduler.drain()
+
+    assert len(service.orders) == 2  # Same side and price, but two distinct signals
+    assert await execute.signal_book.flush() == 2  # The final statuses, in one bulk_write
+    assert {s["status"] for s in execute.signals_collection.find()} == {"filled"}
+
+
+@pytest.mark.asyncio
+async def test_a_signal_is_traded_by_one_instance_only(service):
+    signal_id = str(execute.signals_collection.insert_one({"signal": "BUY", "price": 50000.0, "status": "pending"})
+                    .inserted_id)
+    other_instance = SignalBook(execute.signals_collection)
+
+    assert await other_instance.claim(signal_id)
+    await execute.handle_signal({"_id": signal_id, "signal": "BUY", "price": 50000.0})
+    await execute.order_scheduler.drain()
+
+    assert service.orders == []
+    assert execute.signals_collection.find_one()["status"] == "locked"
+
+
+@pytest.mark.asyncio
+async def test_signal_is_retried_after_a_failed_claim(service, monkeypatch):
+    signal_id = str(execute.signals_collection.insert_one({"signal": "BUY", "price": 50000.0, "status": "pending"})
+                    .inserted_id)
+    signal = {"_id": signal_id, "signal": "BUY", "price": 50000.0}
+
+    def unreachable(*args, **kwargs):
+        raise ConnectionError("MongoDB unreachable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(execute.signals_collection, "find_one_and_update", unreachable)
+        with pytest.raises(ConnectionError):
+            await execute.handle_signal(signal)
+    assert execute.signal_book.pending == {}
+
+    assert await execute.handle_signal(signal)  # Redelivered once MongoDB is back
+    assert signal_id in execute.signal_book.pending
+    await execute.order_scheduler.drain()
+    await execute.signal_book.flush()
+
+    assert service.orders == [("BUY", execute.ORDER_SYMBOL, execute.ORDER_SIZE)]
+    assert execute.signal_book.pending == {}
+    assert execute.signals_collection.find_one()["status"] == "filled"
+
+
+@pytest.mark.asyncio
+async def test_stream_entry_is_acked_once_the_final_status_is_written(service, monkeypatch):
+    monkeypatch.setattr(execute, "signal_book", SignalBook(execute.signals_collection, on_finished=execute.ack_signals))
+    monkeypatch.setattr(execute, "unacked_signals", {})
+    signal_id = str(execute.signals_collection.insert_one({"signal": "SELL", "price": 51000.0, "status": "pending"})
+                    .inserted_id)
+    await execute.redis_client.xgroup_create(execute.SIGNAL_CHANNEL, execute.EXECUTE_CONSUMER_GROUP, mkstream=True)
+    await execute.redis_client.xadd(execute.SIGNAL_CHANNEL,
+                                    {"data": json.dumps({"_id": signal_id, "signal": "SELL", "price": 51000.0})})
+    consumer = asyncio.create_task(execute.consume_signal_stream())
+
+    async def pending():
+        return (await execute.redis_client.xpending(execute.SIGNAL_CHANNEL, execute.EXECUTE_CONSUMER_GROUP))["pending"]
+
+    for _ in range(100):
+        if execute.unacked_signals:
+            break
+        await asyncio.sleep(0.01)
+    assert await pending() == 1  # Queued, not traded yet
+    await execute.order_scheduler.drain()
+    assert await pending() == 1  # Traded, status not written yet
+    await execute.signal_book.flush()
+    consumer.cancel()
+
+    assert await pending() == 0
+    assert execute.signals_collection.find_one()["status"] == "filled"
+
+
+@pytest.mark.asyncio
+async def test_signal_abandoned_by_a_crashed_instance_is_taken_over(service):
+    stale = wall_ms() - 2 * execute.signal_book.lock_timeout * 1000
+    traded, abandoned = (str(execute.signals_collection.insert_one(
+        {"signal": "BUY", "price": 50000.0, "status": "locked", "locked_at": stale}).inserted_id) for _ in range(2))
+    execute.orders_collection.insert_one({"side": "BUY", "status": "filled", "signal_id": traded, "timestamp": stale})
+
+    for signal_id in (traded, abandoned):
+        assert await execute.handle_signal({"_id": signal_id, "signal": "BUY", "price": 50000.0})
+    await execute.order_scheduler.drain()
+    await execute.signal_book.flush()
+
+    assert service.orders == [("BUY", execute.ORDER_SYMBOL, execute.ORDER_SIZE)]  # Only the abandoned one
+    statuses = {str(s["_id"]): s["status"] for s in execute.signals_collection.find()}
+    assert statuses == {traded: "filled", abandoned: "filled"}
+
+
+@pytest.mark.asyncio
+async def test_signal_for_another_symbol_is_marked_ignored(service):
+    signal_id = str(execute.signals_collection.insert_one({"signal": "BUY", "price": 3000.0, "symbol": "ETHUSDT",
+                                                           "status": "pending"}).inserted_id)
+
+    assert not await execute.handle_signal({"_id": signal_id, "signal": "BUY", "price": 3000.0, "symbol": "ETHUSDT"})
+    await execute.order_scheduler.drain()
+    await execute.signal_book.flush()
+
+    assert service.orders == []
+    signal = execute.signals_collection.find_one()
+    assert (signal["status"], signal["reason"]) == ("ignored", "symbol_not_traded")
+
+
+@pytest.mark.asyncio
+async def test_rejected_signal_is_marked_failed(service):
+    await execute.ledger.refresh()
+    execute.ledger.balances["USDT"] = 0.0
+    signal_id = str(execute.signals_collection.insert_one({"signal": "BUY", "price": 50000.0, "status": "pending"})
+                    .inserted_id)
+
+    await execute.handle_signal({"_id": signal_id, "signal": "BUY", "price": 50000.0})
+    await execute.order_scheduler.drain()
+    await execute.signal_book.flush()
+
+    signal = execute.signals_collection.find_one()
+    assert (signal["status"], signal["reason"]) == ("failed", "insufficient_balance")
+
+
+@pytest.mark.asyncio
+async def test_signals_in_one_window_are_netted(service, monkeypatch):
+    monkeypatch.setattr(execute, "order_scheduler", OrderScheduler(execute.execute_order, execute.cancel_signals, 60))
+    ids = [str(execute.signals_collection.insert_one({"signal": side, "price": 50000.0, "status": "pending"})
+               .inserted_id) for side in ("BUY", "SELL", "BUY", "BUY")]
+
+    for signal_id, side in zip(ids, ("BUY", "SELL", "BUY", "BUY")):
+        await execute.handle_signal({"_id": signal_id, "signal": side, "price": 50000.0})
+    assert service.orders == []  # Window still open
+    await execute.order_scheduler.drain()
+    await execute.signal_book.flush()
+
+    assert service.orders == [("BUY", execute.ORDER_SYMBOL, 2 * execute.ORDER_SIZE)]
+    statuses = {signal_id: execute.signals_collection.find_one({"_id": ObjectId(signal_id)})["status"]
+                for signal_id in ids}
+    assert statuses == {ids[0]: "cancelled", ids[1]: "cancelled", ids[2]: "filled", ids[3]: "filled"}
+    order = execute.orders_collection.find_one()
+    assert (order["signal_id"], order["merged_signal_ids"]) == (ids[3], [ids[2]])
+
+
+@pytest.mark.asyncio
+async def test_cooldown_compares_epoch_ms(service, monkeypatch):
+    monkeypatch.setattr(execute, "ORDER_COOLDOWN_SECONDS", 60)
+    execute.orders_collection.insert_one({"side": "BUY", "status": "filled", "timestamp": "2025-01-01T00:00:00"})
+    execute.orders_collection.insert_one({"side": "BUY", "status": "filled", "timestamp": wall_ms() - 30_000})
+    signal_id = str(execute.signals_collection.insert_one({"signal": "BUY", "price": 50000.0, "status": "pending"})
+                    .inserted_id)
+
+    assert await execute.place_order("BUY", 50000.0, signal_id=signal_id) is None
+    await execute.signal_book.flush()
+    assert execute.signals_collection.find_one()["reason"] == "cooldown"
+
+    monkeypatch.setattr(execute, "ORDER_COOLDOWN_SECONDS", 10)
+    assert await execute.place_order("BUY", 50000.0) == {"id": 1}
+    assert isinstance(execute.orders_collection.find_one({}, sort=[("_id", -1)])["timestamp"], int)
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+from indicators import IndicatorEngine
+
+
+@pytest.fixture
+def ticks():
+    rng = np.random.default_rng(42)
+    prices = 50000 + np.cumsum(rng.normal(0, 5, 3000))
+    quantities = rng.uniform(0.001, 0.5, 3000)
+    return prices, quantities
+
+
+def assert_matches(actual, expected, rtol=1e-9):
+    actual = np.array([np.nan if v is None else v for v in actual], dtype=float)
+    expected = expected.to_numpy(dtype=float)
+    assert np.array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual[~np.isnan(actual)], expected[~np.isnan(expected)], rtol=rtol)
+
+
+def test_matches_pandas_rolling(ticks):
+    prices, quantities = ticks
+    engine = IndicatorEngine(sma_windows=(5, 50, 200), ema_windows=(12, 26), bollinger_windows=(20,),
+                             rsi_windows=(14,), vwap_windows=(30,))
+    series = pd.Series(prices)
+
+    results = {key: [] for key in ("sma5", "sma50", "sma200", "ema12", "ema26", "std20", "upper20", "rsi14", "vwap30")}
+    for price, quantity in zip(prices, quantities):
+        engine.update(price, quantity)
+        results["sma5"].append(engine.sma(5))
+        results["sma50"].append(engine.sma(50))
+        results["sma200"].append(engine.sma(200))
+        results["ema12"].append(engine.ema(12))
+        results["ema26"].append(engine.ema(26))
+        results["std20"].append(engine.std(20))
+        bands = engine.bollinger(20)
+        results["upper20"].append(bands[1] if bands else None)
+        results["rsi14"].append(engine.rsi(14))
+        results["vwap30"].append(engine.vwap(30))
+
+    for window in (5, 50, 200):
+        assert_matches(results[f"sma{window}"], series.rolling(window).mean())
+    for span in (12, 26):
+        assert_matches(results[f"ema{span}"], series.ewm(span=span, adjust=False).mean())
+    # Both sides accumulate a sliding second moment, so allow for float drift around 1e-8.
+    assert_matches(results["std20"], series.rolling(20).std(), rtol=1e-6)
+    assert_matches(results["upper20"], series.rolling(20).mean() + 2 * series.rolling(20).std(), rtol=1e-6)
+
+    delta = series.diff()
+    gains = delta.clip(lower=0).rolling(14).mean()
+    losses = (-delta.clip(upper=0)).rolling(14).mean()
+    assert_matches(results["rsi14"], 100 - 100 / (1 + gains / losses), rtol=1e-6)
+
+    volume = pd.Series(quantities)
+    assert_matches(results["vwap30"], (series * volume).rolling(30).sum() / volume.rolling(30).sum())
+
+
+def test_resync_keeps_values(ticks, monkeypatch):
+    monkeypatch.setattr(indicators, "RESYNC_INTERVAL", 97)
+    prices, quantities = ticks
+    engine = IndicatorEngine(sma_windows=(50,), bollinger_windows=(50,), rsi_windows=(14,), vwap_windows=(50,))
+    for price, quantity in zip(prices, quantities):
+        engine.update(price, quantity)
+
+    assert engine.sma(50) == pytest.approx(prices[-50:].mean(), rel=1e-12)
+    assert engine.std(50) == pytest.approx(prices[-50:].std(ddof=1), rel=1e-9)
+    assert engine.vwap(50) == pytest.approx(np.dot(prices[-50:], quantities[-50:]) / quantities[-50:].sum(), rel=1e-12)
+
+
+def test_not_ready_until_window_filled():
+    engine = IndicatorEngine(sma_windows=(3,), rsi_windows=(2,), vwap_windows=(3,))
+    engine.update(1.0)
+    engine.update(2.0)
+    assert engine.sma(3) is None
+    assert engine.rsi(2) is None
+
+    engine.update(3.0)
+    assert engine.sma(3) == pytest.approx(2.0)
+    assert engine.rsi(2) == 100.0
+    assert engine.vwap(3) is None  # no traded volume
+
+    engine.reset()
+    assert not engine.ready(1)
@@ -0,0 +1,221 @@
+import json
+import fakeredis
+import mongomock
+import pytest
+from bson import ObjectId
+from confluent_kafka import KafkaError, KafkaException, Producer
+from codec import decode
+from kafka_pipeline import KafkaTickSink, TradeBatchConsumer, producer_config
+from metrics import metrics
+from rollups import Rollups
+
+
+class FakeMessage:
+    def __init__(self, value=None, error=None, offset=0):
+        self._value = value
+        self._error = error
+        self._offset = offset
+
+    def value(self):
+        return self._value
+
+    def error(self):
+        return self._error
+
+    def offset(self):
+        return self._offset
+
+
+class FakeConsumer:
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.commits = 0
+        self.consume_calls = []
+        self.uncommitted = False
+
+    def consume(self, num_messages=1, timeout=-1):
+        self.consume_calls.append(num_messages)
+        batch = self.batches.pop(0) if self.batches else []
+        self.uncommitted |= any(msg.error() is None for msg in batch)
+        return batch
+
+    def commit(self, asynchronous=True):
+        assert asynchronous is False
+        if not self.uncommitted:  # Like librdkafka when no offset moved since the last commit
+            raise KafkaException(KafkaError(KafkaError._NO_OFFSET))
+        self.uncommitted = False
+        self.commits += 1
+
+
+def trade(price, symbol="BTCUSDT", _id=None):
+    return FakeMessage(json.dumps({
+        "_id": str(_id or ObjectId()), "symbol": symbol, "price": price, "quantity": 0.1,
+        "timestamp": 1735689600000,
+    }).encode())
+
+
+class FlakyCollection:
+    def __init__(self, collection, failures):
+        self.collection = collection
+        self.failures = failures
+
+    def insert_many(self, records, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("mongo down")
+        return self.collection.insert_many(records, ordered=ordered)
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient()["trading_db"]["trades"]
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+def test_batch_is_stored_published_and_committed(collection, redis_client):
+    consumer = FakeConsumer([[trade(100.0), trade(101.0, "ETHUSDT")]])
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe("raw_trades:BTCUSDT")
+    pubsub.get_message(timeout=1)
+
+    written = TradeBatchConsumer(consumer, collection, redis_client, batch_size=500, transport="pubsub").poll_batch()
+
+    assert written == 2
+    assert consumer.consume_calls == [500]
+    assert consumer.commits == 1
+    assert collection.count_documents({}) == 2
+    assert decode(pubsub.get_message(timeout=1)["data"])["price"] == 100.0
+
+
+def test_offsets_are_not_committed_until_the_writes_succeed(collection, redis_client):
+    consumer = FakeConsumer([[trade(100.0), trade(101.0)], [trade(102.0)]])
+    batcher = TradeBatchConsumer(consumer, FlakyCollection(collection, failures=1), redis_client, transport="pubsub")
+
+    with pytest.raises(ConnectionError):
+        batcher.poll_batch()
+    assert consumer.commits == 0
+
+    # The failed batch is retried before anything new is consumed
+    assert batcher.poll_batch() == 2
+    assert consumer.commits == 1
+    assert len(consumer.consume_calls) == 1
+    assert batcher.poll_batch() == 1
+    assert collection.count_documents({}) == 3
+
+
+def test_replayed_batch_does_not_duplicate_trades(collection, redis_client):
+    _id = ObjectId()
+    consumer = FakeConsumer([[trade(100.0, _id=_id)], [trade(100.0, _id=_id), trade(101.0)]])
+    batcher = TradeBatchConsumer(consumer, collection, redis_client, transport="pubsub")
+
+    batcher.poll_batch()
+    batcher.poll_batch()
+
+    assert consumer.commits == 2
+    assert collection.count_documents({}) == 2
+
+
+def test_only_new_trades_are_rolled_up(collection, redis_client):
+    _id = ObjectId()
+    consumer = FakeConsumer([[trade(100.0, _id=_id)], [trade(100.0, _id=_id), trade(101.0)]])
+    batcher = TradeBatchConsumer(consumer, collection, redis_client, transport="pubsub",
+                                 rollups=Rollups(collection.database))
+
+    batcher.poll_batch()
+    batcher.poll_batch()
+
+    bar = collection.database["bars_1m"].find_one()
+    assert (bar["trades"], bar["close"]) == (2, 101.0)
+
+
+def test_errors_and_malformed_messages_are_skipped(collection, redis_client):
+    eof = FakeMessage(error=KafkaError(KafkaError._PARTITION_EOF))
+    consumer = FakeConsumer([[eof, FakeMessage(b"not json"), trade(100.0)]])
+
+    assert TradeBatchConsumer(consumer, collection, redis_client, transport="pubsub").poll_batch() == 1
+    assert consumer.commits == 1
+
+
+def test_error_only_batch_does_not_wedge_the_consumer(collection, redis_client):
+    broker_down = FakeMessage(error=KafkaError(KafkaError._TRANSPORT))
+    consumer = FakeConsumer([[broker_down], [trade(100.0)]])
+    batcher = TradeBatchConsumer(consumer, collection, redis_client, transport="pubsub")
+
+    assert batcher.poll_batch() == 0
+    assert consumer.commits == 0
+    assert batcher.poll_batch() == 1
+    assert consumer.commits == 1
+    assert len(consumer.consume_calls) == 2
+
+
+class FakeProducer:
+    """Holds deliveries until poll()/flush(), like librdkafka's background delivery."""
+
+    def __init__(self):
+        self.produced = []
+        self._reports = []
+
+    def produce(self, topic, key=None, value=None, on_delivery=None):
+        message = FakeMessage(value)
+        message.key = lambda: key
+        self.produced.append((topic, key, value))
+        self._reports.append((on_delivery, message))
+
+    def poll(self, timeout=0):
+        reports, self._reports = self._reports, []
+        for on_delivery, message in reports:
+            on_delivery(None, message)
+        return len(reports)
+
+    def flush(self, timeout=None):
+        self.poll()
+        return 0
+
+
+def tick(price, symbol="BTCUSDT"):
+    return {"_id": ObjectId(), "symbol": symbol, "price": price, "quantity": 0.1, "timestamp": 1735689600000}
+
+
+def test_sink_keys_by_symbol_and_round_trips_through_the_consumer(collection, redis_client):
+    producer = FakeProducer()
+    sink = KafkaTickSink(producer, topic="trade_data")
+    ticks = [tick(100.0), tick(2000.0, "ETHUSDT")]
+    for record in ticks:
+        assert sink.submit(record)
+
+    assert [key for _, key, _ in producer.produced] == [b"BTCUSDT", b"ETHUSDT"]
+    assert sink.flush() == 0
+    assert sink.stats["delivered"] == 2 and sink.in_flight == 0
+
+    consumer = FakeConsumer([[FakeMessage(value) for _, _, value in producer.produced]])
+    TradeBatchConsumer(consumer, collection, redis_client, transport="pubsub").poll_batch()
+    assert collection.find_one({"_id": ticks[0]["_id"]})["price"] == 100.0
+
+
+def test_sink_drops_ticks_beyond_the_in_flight_bound():
+    producer = FakeProducer()
+    producer.poll = lambda timeout=0: 0  # Broker not acknowledging anything
+    sink = KafkaTickSink(producer, max_in_flight=2)
+
+    metrics.drain()
+    results = [sink.submit(tick(100.0 + i)) for i in range(3)]
+
+    assert results == [True, True, False]
+    assert sink.stats["dropped"] == 1 and sink.in_flight == 2
+    assert [value for name, _, value in metrics.drain()["gauges"] if name == "kafka_in_flight"] == [2]
+
+
+def test_sink_delivers_through_the_librdkafka_mock_cluster():
+    config = producer_config(compression="zstd")
+    config["test.mock.num.brokers"] = 1  # In-process mock broker, no Kafka needed
+    sink = KafkaTickSink(Producer(config), topic="trade_data")
+
+    for i in range(10):
+        sink.submit(tick(100.0 + i))
+
+    assert sink.flush() == 0
+    assert sink.stats["delivered"] == 10 and sink.stats["failed"] == 0
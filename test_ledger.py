@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from ledger import Ledger
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingExchange:
+    def __init__(self):
+        self.balance_calls = 0
+        self.ticker_calls = 0
+        self.btc = 1.0
+
+    async def fetch_balance(self):
+        self.balance_calls += 1
+        await asyncio.sleep(0.01)
+        return {"BTC": {"free": self.btc}, "USDT": {"free": 1000.0}, "ETH": {"free": 3.0}}
+
+    async def fetch_ticker(self, symbol):
+        self.ticker_calls += 1
+        await asyncio.sleep(0.01)
+        return {"last": 100.0}
+
+
+@pytest.mark.asyncio
+async def test_snapshot_refreshes_only_stale_parts():
+    exchange, clock = CountingExchange(), FakeClock()
+    ledger = Ledger(exchange, "BTC/USDT", balance_max_staleness=30, price_max_staleness=2, clock=clock)
+
+    # Concurrent callers share one refresh.
+    results = await asyncio.gather(*(ledger.snapshot() for _ in range(5)))
+    assert results[0] == ({"BTC": 1.0, "USDT": 1000.0}, 100.0)
+    assert (exchange.balance_calls, exchange.ticker_calls) == (1, 1)
+
+    clock.now = 10
+    ledger.on_tick(101.0)
+    assert await ledger.snapshot() == ({"BTC": 1.0, "USDT": 1000.0}, 101.0)
+    assert (exchange.balance_calls, exchange.ticker_calls) == (1, 1)
+
+    clock.now = 13
+    assert (await ledger.snapshot())[1] == 100.0
+    assert (exchange.balance_calls, exchange.ticker_calls) == (1, 2)
+
+    clock.now = 45
+    await ledger.snapshot()
+    assert (exchange.balance_calls, exchange.ticker_calls) == (2, 3)
+
+
+@pytest.mark.asyncio
+async def test_fills_and_reconcile():
+    exchange = CountingExchange()
+    ledger = Ledger(exchange, "BTC/USDT")
+    await ledger.refresh()
+
+    ledger.apply_fill("BUY", 0.5, 100.0, fee=0.05)
+    assert ledger.free("BTC") == pytest.approx(1.5)
+    assert ledger.free("USDT") == pytest.approx(949.95)
+    ledger.apply_fill("SELL", 0.25, 120.0)
+    assert ledger.free("BTC") == pytest.approx(1.25)
+    assert ledger.free("USDT") == pytest.approx(979.95)
+
+    exchange.btc = 1.2
+    await ledger.reconcile()
+    assert ledger.balances == {"BTC": 1.2, "USDT": 1000.0}
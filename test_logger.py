@@ -0,0 +1,61 @@
+import json
+import logging
+
+import pytest
+
+import logger as log_setup
+from logger import RateLimitFilter, get_sampled_logger, setup_logging, shutdown_logging
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def record(msg, level=logging.INFO):
+    return logging.LogRecord("strategy", level, __file__, 1, msg, ("x",), None)
+
+
+def test_rate_limit_filter_counts_suppressed_records():
+    clock = FakeClock()
+    rate_limit = RateLimitFilter(per_second=2, clock=clock)
+
+    assert rate_limit.filter(record("📊 New Trade Received: %s"))
+    assert not rate_limit.filter(record("📊 New Trade Received: %s"))
+    assert not rate_limit.filter(record("📊 New Trade Received: %s"))
+    assert rate_limit.filter(record("📉 SMA Calculated: %s"))  # Separate budget per template
+    assert rate_limit.filter(record("❌ failed: %s", logging.ERROR))
+
+    clock.now = 0.5
+    passed = record("📊 New Trade Received: %s")
+    assert rate_limit.filter(passed)
+    assert passed.getMessage() == "📊 New Trade Received: x [+2 similar suppressed]"
+
+
+@pytest.fixture
+def service_logs(tmp_path):
+    root = setup_logging("strategy", directory=str(tmp_path), console=False, json_lines=True)
+    yield root, tmp_path
+    shutdown_logging()
+
+
+def test_queue_listener_writes_text_and_json_lines(service_logs):
+    root, directory = service_logs
+    assert sum(isinstance(h, log_setup.DeferredQueueHandler) for h in root.handlers) == 1
+
+    logging.getLogger("strategy").info("✅ Published Signal %s", "BUY", extra={"fields": {"price": 50000.0}})
+    sampled = get_sampled_logger("strategy", per_second=0.001)
+    for i in range(100):
+        sampled.info("📊 New Trade Received: %s", i)
+    shutdown_logging()
+
+    text = (directory / "strategy.log").read_text()
+    assert "✅ Published Signal BUY" in text
+    assert text.count("New Trade Received") == 1
+
+    entries = [json.loads(line) for line in (directory / "strategy.jsonl").read_text().splitlines()]
+    published = next(e for e in entries if e["msg"] == "✅ Published Signal BUY")
+    assert published["service"] == "strategy" and published["price"] == 50000.0
@@ -0,0 +1,74 @@
+import json
+
+import fakeredis
+from prometheus_client import CollectorRegistry, generate_latest
+
+from metrics import MetricsBuffer
+from monitor import PushedMetrics
+
+
+def test_buffer_pushes_deltas_and_monitor_aggregates_them():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    pubsub = client.pubsub()
+    pubsub.subscribe("service_metrics")
+    pubsub.get_message(timeout=1)
+
+    buffer = MetricsBuffer("data_feed", channel="service_metrics", transport="pubsub")
+    buffer.client = client
+    for _ in range(3):
+        buffer.inc("ticks_received_total", symbol="BTCUSDT")
+    buffer.inc("ticks_received_total", 2, symbol="ETHUSDT")
+    buffer.set("write_queue_depth", 7)
+    for value in (0.0004, 0.003, 0.003, 20.0):
+        buffer.observe("tick_to_trade_stage_seconds", value, stage="feed_to_strategy")
+    buffer.flush()
+    resent = buffer.flush()  # Nothing new since the last push: only the gauge, kept alive in the monitor
+    assert (resent["counters"], resent["gauges"], resent["histograms"]) == ([], [["write_queue_depth", {}, 7]], [])
+
+    buffer.inc("ticks_received_total", symbol="BTCUSDT")
+    buffer.set("write_queue_depth", 2)
+    buffer.flush()
+
+    monitor = PushedMetrics()
+    for _ in range(3):
+        monitor.apply(json.loads(pubsub.get_message(timeout=1)["data"]))
+
+    registry = CollectorRegistry()
+    registry.register(monitor)
+    sample = registry.get_sample_value
+    assert sample("ticks_received_total", {"service": "data_feed", "symbol": "BTCUSDT"}) == 4
+    assert sample("ticks_received_total", {"service": "data_feed", "symbol": "ETHUSDT"}) == 2
+    assert sample("write_queue_depth", {"service": "data_feed", "instance": buffer.instance}) == 2
+
+    stage = {"service": "data_feed", "stage": "feed_to_strategy"}
+    assert sample("tick_to_trade_stage_seconds_bucket", {**stage, "le": "0.0005"}) == 1
+    assert sample("tick_to_trade_stage_seconds_bucket", {**stage, "le": "0.005"}) == 3
+    assert sample("tick_to_trade_stage_seconds_bucket", {**stage, "le": "+Inf"}) == 4
+    assert sample("tick_to_trade_stage_seconds_sum", stage) == 20.0064
+    assert b"ticks_received_total" in generate_latest(registry)
+
+
+def test_monitor_expires_silent_gauges_and_unions_label_names():
+    now = [0.0]
+    monitor = PushedMetrics(gauge_ttl=15, clock=lambda: now[0])
+
+    def push(instance, gauges):
+        monitor.apply({"service": "strategy_pool", "instance": instance, "counters": [], "gauges": gauges,
+                       "histograms": []})
+
+    push("old", [["strategy_worker_instances", {}, 4]])
+    now[0] = 10
+    push("new", [["strategy_worker_instances", {}, 4], ["strategy_worker_load", {"worker": "w1"}, 0.5]])
+    push("new", [["strategy_worker_load", {}, 0.7]])
+
+    registry = CollectorRegistry()
+    registry.register(monitor)
+    sample = registry.get_sample_value
+    pool = {"service": "strategy_pool", "instance": "new"}
+    assert sample("strategy_worker_load", {**pool, "worker": "w1"}) == 0.5
+    assert sample("strategy_worker_load", {**pool, "worker": ""}) == 0.7  # Missing labels are left empty
+    assert sample("strategy_worker_instances", {**pool, "instance": "old"}) == 4
+
+    now[0] = 20  # The restarted instance has not pushed for longer than the TTL
+    assert sample("strategy_worker_instances", {**pool, "instance": "old"}) is None
+    assert sample("strategy_worker_instances", pool) == 4
@@ -0,0 +1,25 @@
+from datetime import datetime
+import mongomock
+import storage
+from migrate_timestamps import MIGRATIONS, migrate
+
+
+def test_iso_timestamps_become_epoch_ms():
+    db = mongomock.MongoClient()["trading_db"]
+    db[storage.TRADES].insert_many([
+        {"symbol": "BTCUSDT", "price": 1.0, "timestamp": "2025-01-01T00:00:01.500000"},
+        {"symbol": "BTCUSDT", "price": 2.0, "timestamp": "2025-01-01T00:00:02", "event_time": 1735689601900},
+        {"symbol": "BTCUSDT", "price": 3.0, "timestamp": 1735689603000, "trade_id": 7},
+    ])
+    db[storage.SIGNALS].insert_one({"status": "pending", "timestamp": "2025-01-01 00:00:00"})  # str(pd.Timestamp)
+
+    assert migrate(db[storage.TRADES], MIGRATIONS[storage.TRADES], dry_run=True) == 2
+    assert migrate(db[storage.TRADES], MIGRATIONS[storage.TRADES], batch_size=1) == 2
+    assert migrate(db[storage.SIGNALS], MIGRATIONS[storage.SIGNALS]) == 1
+    assert migrate(db[storage.TRADES], MIGRATIONS[storage.TRADES]) == 0  # Rerunning is a no-op
+
+    trades = list(db[storage.TRADES].find().sort("price", 1))
+    assert [t["timestamp"] for t in trades] == [1735689601500, 1735689601900, 1735689603000]
+    assert "event_time" not in trades[1]
+    assert trades[0]["time"] == datetime(2025, 1, 1, 0, 0, 1, 500000)
+    assert db[storage.SIGNALS].find_one()["timestamp"] == 1735689600000
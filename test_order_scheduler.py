@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from metrics import metrics
+from order_scheduler import OrderScheduler, RateLimitedExchange, RateLimiter, TokenBucket, net_order
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def signal(side, signal_id, **fields):
+    return {"_id": signal_id, "signal": side, "price": 50000.0, "symbol": "BTCUSDT", **fields}
+
+
+def test_token_bucket_refills_over_period():
+    clock = FakeClock()
+    bucket = TokenBucket(100, 10, clock)
+    assert bucket.delay(100) == 0
+    bucket.take(100)
+    assert bucket.delay(1) == pytest.approx(0.1)
+
+    clock.now = 5
+    assert bucket.delay(50) == 0
+    assert bucket.delay(60) == pytest.approx(1.0)
+    clock.now = 100
+    assert bucket.delay(100) == 0 and bucket.tokens == 100  # Capped at capacity
+
+
+def test_opposing_signals_cancel_and_duplicates_merge():
+    assert net_order([signal("BUY", "a"), signal("SELL", "b")], 0.001) == (None, [signal("BUY", "a"),
+                                                                                 signal("SELL", "b")])
+
+    order, cancelled = net_order([signal("BUY", "a"), signal("BUY", "b", priority=1)], 0.001)
+    assert cancelled == []
+    assert (order["side"], order["amount"], order["signal_id"], order["merged_ids"], order["priority"]) == \
+        ("BUY", 0.002, "b", ["a"], 1)
+
+    order, cancelled = net_order([signal("BUY", "a"), signal("SELL", "b"), signal("BUY", "c")], 0.001)
+    assert [s["_id"] for s in cancelled] == ["a", "b"]
+    assert (order["side"], order["amount"], order["signal_id"], order["merged_ids"]) == ("BUY", 0.001, "c", [])
+
+
+@pytest.mark.asyncio
+async def test_queue_sends_lowest_priority_first():
+    sent, cancelled = [], []
+
+    async def execute_order(order):
+        sent.append(order["signal_id"])
+
+    scheduler = OrderScheduler(execute_order, lambda signals, reason: cancelled.append(reason), window=0)
+    scheduler.submit(signal("BUY", "late", symbol="ETHUSDT"))
+    scheduler.submit(signal("SELL", "urgent", priority=0))
+    scheduler.submit(signal("HOLD", "bad"))
+    assert scheduler.depth() == 2
+
+    await scheduler.drain()
+    assert sent == ["urgent", "late"]
+    assert cancelled == ["invalid_signal"]
+    assert scheduler.depth() == 0
+
+
+@pytest.mark.asyncio
+async def test_window_closes_on_its_own():
+    sent, cancelled = [], []
+
+    async def execute_order(order):
+        sent.append(order)
+
+    scheduler = OrderScheduler(execute_order, lambda signals, reason: cancelled.extend(signals), window=0.02)
+    runner = asyncio.create_task(scheduler.run())
+    metrics.drain()
+    for side, signal_id in (("BUY", "a"), ("BUY", "b"), ("SELL", "c")):
+        scheduler.submit(signal(side, signal_id))
+    assert sent == []
+    for _ in range(100):
+        if sent:
+            break
+        await asyncio.sleep(0.01)
+    runner.cancel()
+
+    assert [(order["signal_id"], order["amount"]) for order in sent] == [("b", scheduler.size)]
+    assert [s["_id"] for s in cancelled] == ["a", "c"]
+    pushed = metrics.drain()
+    assert ["signals_coalesced_total", {"outcome": "cancelled"}, 2] in pushed["counters"]
+    assert any(name == "order_queue_wait_seconds" for name, *_ in pushed["histograms"])
+
+
+@pytest.mark.asyncio
+async def test_exchange_calls_wait_for_request_weight(monkeypatch):
+    clock = FakeClock()
+    slept = []
+
+    async def sleep(seconds):
+        slept.append(seconds)
+        clock.now += seconds
+
+    class Exchange:
+        async def fetch_balance(self):
+            return {"USDT": {"free": 1.0}}
+
+        async def create_market_buy_order(self, symbol, amount):
+            return {"amount": amount}
+
+        def market(self, symbol):
+            return symbol
+
+    monkeypatch.setattr("order_scheduler.asyncio.sleep", sleep)
+    exchange = RateLimitedExchange(Exchange(), RateLimiter(weight_limit=30, order_limit=1, clock=clock))
+    metrics.drain()
+
+    await exchange.fetch_balance()
+    await exchange.fetch_balance()  # 10 weight short at 0.5 per second
+    assert slept == [pytest.approx(20)]
+    await exchange.create_market_buy_order("BTC/USDT", 0.001)  # Weight is empty again: 1 takes 2 s
+    await exchange.create_market_buy_order("BTC/USDT", 0.001)  # The order bucket holds one per 10 s
+    assert slept[1:] == [pytest.approx(2), pytest.approx(10)]
+    assert exchange.market("BTC/USDT") == "BTC/USDT"  # Unweighted attributes pass through
+
+    waits = {labels["endpoint"]: total for name, labels, _, _, total in metrics.drain()["histograms"]
+             if name == "rate_limit_wait_seconds"}
+    assert waits == {"fetch_balance": pytest.approx(20), "create_market_buy_order": pytest.approx(12)}
@@ -0,0 +1,100 @@
+import json
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+from redis_streams import AsyncStreamConsumer, MultiStreamConsumer, StreamConsumer, publish
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def test_publish_uses_capped_streams(client):
+    pubsub = client.pubsub()
+    pubsub.subscribe("raw_trades:BTCUSDT")
+    pubsub.get_message(timeout=1)
+
+    assert publish(client, "raw_trades:BTCUSDT", "{}", transport="pubsub") == 1
+    assert pubsub.get_message(timeout=1)["data"] == "{}"
+
+    pipe = client.pipeline(transaction=False)
+    for i in range(500):
+        publish(pipe, "raw_trades:BTCUSDT", json.dumps({"price": i}), transport="streams", maxlen=10)
+    pipe.execute()
+    # MAXLEN ~ trims whole macro nodes, so the stream stays near (not exactly at) the cap.
+    assert 10 <= client.xlen("raw_trades:BTCUSDT") < 500
+
+
+def test_group_batches_and_acks(client):
+    first = StreamConsumer(client, "trade_signals", "execute", consumer="a", count=3, block_ms=10)
+    second = StreamConsumer(client, "trade_signals", "execute", consumer="b", count=3, block_ms=10)
+    first.ensure_group()
+    second.ensure_group()
+    for i in range(5):
+        publish(client, "trade_signals", str(i), transport="streams")
+
+    batch_a, batch_b = first.read(), second.read()
+    assert [data for _, data in batch_a] == ["0", "1", "2"]
+    assert [data for _, data in batch_b] == ["3", "4"]
+
+    first.ack([entry_id for entry_id, _ in batch_a])
+    assert client.xpending("trade_signals", "execute")["pending"] == 2
+    assert first.read() == []
+
+
+def test_pending_entries_are_recovered(client):
+    consumer = StreamConsumer(client, "trade_signals", "execute", consumer="a", block_ms=10)
+    consumer.ensure_group()
+    publish(client, "trade_signals", "BUY", transport="streams")
+    assert [data for _, data in consumer.read()] == ["BUY"]
+
+    # Same consumer name after a restart: its unacked entry is redelivered first.
+    restarted = StreamConsumer(client, "trade_signals", "execute", consumer="a", block_ms=10)
+    batch = restarted.read()
+    assert [data for _, data in batch] == ["BUY"]
+
+    # A different consumer claims it once it has been idle long enough.
+    other = StreamConsumer(client, "trade_signals", "execute", consumer="b", block_ms=10, claim_idle_ms=0)
+    claimed = other.read()
+    assert claimed == batch
+    other.ack([entry_id for entry_id, _ in claimed])
+    assert client.xpending("trade_signals", "execute")["pending"] == 0
+
+
+def test_multi_stream_consumer_reads_every_stream_at_once():
+    client = fakeredis.FakeRedis()  # Raw client, as the strategy uses: stream names come back as bytes
+    streams = ["raw_trades:BTCUSDT", "raw_trades:ETHUSDT", "raw_trades:XRPUSDT"]
+    consumer = MultiStreamConsumer(client, streams, "strategy", consumer="a", block_ms=10)
+    consumer.ensure_group()
+    publish(client, streams[0], "btc", transport="streams")
+    publish(client, streams[1], "eth", transport="streams")
+
+    batch = consumer.read()
+    assert sorted((stream, data) for stream, _, data in batch) == [(streams[0], b"btc"), (streams[1], b"eth")]
+    for stream, entry_id, _ in batch:
+        consumer.ack(stream, [entry_id])
+    assert consumer.read() == []
+    assert all(client.xpending(stream, "strategy")["pending"] == 0 for stream in streams)
+
+    # An unacked entry is redelivered to the same consumer after a restart, tagged with its stream.
+    publish(client, streams[2], "xrp", transport="streams")
+    consumer.read()
+    restarted = MultiStreamConsumer(client, streams, "strategy", consumer="a", block_ms=10)
+    assert [(stream, data) for stream, _, data in restarted.read()] == [(streams[2], b"xrp")]
+
+
+@pytest.mark.asyncio
+async def test_async_consumer():
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    consumer = AsyncStreamConsumer(client, "trade_signals", "execute", consumer="a", block_ms=10)
+    await consumer.ensure_group()
+    await consumer.ensure_group()
+    await publish(client, "trade_signals", "SELL", transport="streams")
+
+    batch = await consumer.read()
+    assert [data for _, data in batch] == ["SELL"]
+    await consumer.ack([entry_id for entry_id, _ in batch])
+    assert await consumer.read() == []
@@ -0,0 +1,74 @@
+import asyncio
+import mongomock
+import pytest
+import websockets
+from binance_stream import combined_stream_urls, stream_trades
+from load_harness import PipelineStats, server_stats
+from paper_exchange import PaperExchange
+from replay_server import BurstProfile, ReplayServer, looped, parse_streams, synthetic_trades
+
+
+def test_burst_profile_repeats_its_segments():
+    profile = BurstProfile.parse("30x1, 5x20")
+
+    assert [profile.multiplier(t) for t in (0, 29.9, 30, 34.9, 35, 65)] == [1, 1, 20, 20, 1, 20]
+    assert BurstProfile.parse("").multiplier(123) == 1.0
+
+
+def test_stream_paths_and_sources():
+    assert parse_streams("/stream?streams=btcusdt@trade/ethusdt@trade") == (["btcusdt@trade", "ethusdt@trade"], True)
+    assert parse_streams("/ws/btcusdt@trade") == (["btcusdt@trade"], False)
+
+    offsets = [offset for _, (offset, _, _) in zip(range(1000), synthetic_trades("BTCUSDT", rate=100))]
+    assert offsets[-1] == pytest.approx(10, rel=0.2) and offsets == sorted(offsets)
+    replayed = looped([(0.0, 1.0, 1.0), (1.0, 2.0, 1.0)])
+    assert [next(replayed)[0] for _ in range(4)] == [0.0, 1.0, 2.0, 3.0]
+
+
+@pytest.mark.asyncio
+async def test_data_feed_parser_reads_the_replayed_streams():
+    server = ReplayServer(lambda symbol: synthetic_trades(symbol, rate=200), speed=2)
+    async with websockets.serve(server.handler, "127.0.0.1", 0, process_request=server.process_request) as ws:
+        port = ws.sockets[0].getsockname()[1]
+        received = []
+        tasks = [asyncio.create_task(stream_trades(url, received.append))
+                 for url in combined_stream_urls(["btcusdt", "ethusdt"], f"ws://127.0.0.1:{port}", 1)]
+        await asyncio.sleep(0.5)
+        stats = await asyncio.to_thread(server_stats, f"http://127.0.0.1:{port}/stats")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert len(received) > 100 and stats["sent"] >= len(received)
+    assert set(stats["sent_by_symbol"]) == {"BTCUSDT", "ETHUSDT"}
+    btc = [record for record in received if record["symbol"] == "BTCUSDT"]
+    assert [r["trade_id"] for r in btc] == sorted(r["trade_id"] for r in btc)
+    assert all(isinstance(r["timestamp"], int) and r["price"] > 0 for r in received)
+
+
+def test_pipeline_stats_sum_pushed_batches():
+    stats = PipelineStats()
+    for instance in ("a", "b"):
+        stats.apply({"service": "data_feed", "instance": instance,
+                     "counters": [["ticks_received_total", {"symbol": "BTCUSDT"}, 10]],
+                     "gauges": [["write_queue_depth", {}, 5 if instance == "a" else 7]],
+                     "histograms": [["tick_to_trade_seconds", {}, [0.1, 1.0], [8, 1, 1], 3.0]]})
+
+    assert stats.total("ticks_received_total") == stats.total("ticks_received_total", symbol="BTCUSDT") == 20
+    assert stats.total("ticks_received_total", symbol="ETHUSDT") == 0
+    assert stats.gauge_max("write_queue_depth") == 7
+    assert stats.quantile("tick_to_trade_seconds", 0.5) == 0.1
+    assert stats.quantile("tick_to_trade_seconds", 0.99) == float("inf")
+
+
+@pytest.mark.asyncio
+async def test_paper_exchange_fills_at_the_last_stored_price():
+    trades = mongomock.MongoClient()["trading_db"]["trades"]
+    exchange = PaperExchange(trades, balances={"BTC": 0.0, "USDT": 1000.0})
+    assert (await exchange.fetch_ticker("BTC/USDT"))["last"] == exchange.fallback_price
+
+    trades.insert_one({"symbol": "BTCUSDT", "price": 100.0, "timestamp": 1})
+    order = await exchange.create_market_buy_order("BTC/USDT", 2.0)
+
+    assert (order["filled"], order["average"]) == (2.0, 100.0)
+    assert await exchange.fetch_balance() == {"BTC": {"free": 2.0}, "USDT": {"free": 800.0}}
@@ -0,0 +1,60 @@
+import mongomock
+import pytest
+import storage
+from rollups import Rollups
+from strategy_runtime import SmaCrossover
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient()["trading_db"]
+    storage.ensure_schema(db, timeseries=False, tick_retention=0, rollup_retention={})  # mongomock enforces TTLs
+    return db
+
+
+def tick(ms, price, quantity=1.0, symbol="BTCUSDT"):
+    return {"symbol": symbol, "price": price, "quantity": quantity, "timestamp": ms}
+
+
+def bars(db, interval, symbol="BTCUSDT"):
+    return list(storage.bars_range(db[storage.bars_name(interval)], symbol))
+
+
+def test_ticks_roll_up_into_every_interval(db):
+    rollups = Rollups(db)
+    rollups.add([tick(0, 10.0), tick(500, 12.0, 2.0), tick(1500, 9.0), tick(61_000, 11.0)])
+
+    one_second = bars(db, "1s")
+    assert [(b["timestamp"], b["open"], b["high"], b["low"], b["close"], b["volume"], b["trades"])
+            for b in one_second] == [(0, 10.0, 12.0, 10.0, 12.0, 3.0, 2), (1000, 9.0, 9.0, 9.0, 9.0, 1.0, 1),
+                                     (61_000, 11.0, 11.0, 11.0, 11.0, 1.0, 1)]  # Quiet seconds are not stored
+    assert [(b["timestamp"], b["close"], b["trades"]) for b in bars(db, "1m")] == [(0, 9.0, 3), (60_000, 11.0, 1)]
+    assert [(b["timestamp"], b["high"], b["low"], b["trades"]) for b in bars(db, "1h")] == [(0, 12.0, 9.0, 4)]
+
+
+def test_bars_in_progress_are_updated_incrementally(db):
+    rollups = Rollups(db)
+    rollups.add([tick(0, 10.0)])
+    rollups.add([tick(10_000, 14.0)])
+
+    assert [(b["open"], b["close"], b["trades"]) for b in bars(db, "1m")] == [(10.0, 14.0, 2)]
+
+
+def test_a_restarted_writer_keeps_adding_to_the_stored_bar(db):
+    Rollups(db).add([tick(0, 10.0, 1.0)])
+    Rollups(db).add([tick(30_000, 8.0, 2.0)])
+
+    assert [(b["low"], b["volume"], b["trades"]) for b in bars(db, "1m")] == [(8.0, 3.0, 2)]
+
+
+def test_strict_warm_up_from_bars_matches_the_live_aggregator(db):
+    prices = [(0, 10.0), (1000, 11.0), (4000, 12.0), (5000, 13.0)]
+    Rollups(db).add([tick(ms, price) for ms, price in prices])
+
+    from_ticks = SmaCrossover("a", "BTCUSDT", short_window=2, long_window=4, execution_mode="TIME_BASED")
+    from_ticks.warm_up([tick(ms, price) for ms, price in prices])
+    from_bars = SmaCrossover("b", "BTCUSDT", short_window=2, long_window=4, execution_mode="TIME_BASED")
+    from_bars.warm_up_bars([b for b in bars(db, "1s") if b["timestamp"] < 5000])  # The last bar is still open
+
+    assert from_bars.indicators.updates == from_ticks.indicators.updates == 5
+    assert from_bars.indicators.prices.last(5) == from_ticks.indicators.prices.last(5) == [10.0, 11.0, 11.0, 11.0, 12.0]
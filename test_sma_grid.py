@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from sma_grid import evaluate_grid, parameter_grid, rolling_means, summary_frame
+
+
+def naive_crossover(prices, short, long, long_only=False):
+    """Tick-by-tick replica of strategy.handle_trade / generate_trade_signal."""
+    signals = np.zeros(len(prices), dtype=np.int8)
+    last_signal, position, pnl, peak, drawdown = 0, 0, 0.0, 0.0, 0.0
+    for t in range(len(prices)):
+        if t + 1 >= long:
+            short_sma = prices[t + 1 - short:t + 1].mean()
+            long_sma = prices[t + 1 - long:t + 1].mean()
+            if short_sma > long_sma and last_signal != 1:
+                signals[t] = last_signal = 1
+            elif short_sma < long_sma and last_signal != -1:
+                signals[t] = last_signal = -1
+            position = max(last_signal, 0) if long_only else last_signal
+        if t + 1 < len(prices):
+            pnl += position * (prices[t + 1] - prices[t])
+            peak = max(peak, pnl)
+            drawdown = max(drawdown, peak - pnl)
+    return signals, pnl, drawdown
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(7)
+    return 50000 + np.cumsum(rng.normal(0, 3, 2000))
+
+
+def test_rolling_means_match_numpy(prices):
+    means = rolling_means(prices, [1, 20])
+    np.testing.assert_allclose(means[0], prices)
+    assert np.isnan(means[1, :19]).all()
+    np.testing.assert_allclose(means[1, 19:], np.convolve(prices, np.ones(20) / 20, mode="valid"))
+
+
+@pytest.mark.parametrize("long_only", [False, True])
+@pytest.mark.parametrize("max_chunk_bytes", [1, 10 ** 9])
+def test_matches_tick_by_tick_strategy(prices, long_only, max_chunk_bytes):
+    pairs = parameter_grid([5, 10, 30], [20, 50, 120])
+    result = evaluate_grid(prices, pairs, long_only=long_only, with_drawdown=True, max_chunk_bytes=max_chunk_bytes)
+
+    for i, (short, long) in enumerate(pairs):
+        signals, pnl, drawdown = naive_crossover(prices, short, long, long_only)
+        np.testing.assert_array_equal(result["signals"][i], signals)
+        assert result["trades"][i] == np.count_nonzero(signals)
+        assert result["pnl"][i] == pytest.approx(pnl, abs=1e-6)
+        assert result["max_drawdown"][i] == pytest.approx(drawdown, abs=1e-6)
+
+
+def test_ties_keep_previous_position():
+    prices = np.array([1, 2, 3, 4, 4, 4, 4, 4, 4, 3, 2, 1, 1, 1, 1, 1, 1, 2], dtype=float)
+    result = evaluate_grid(prices, [(2, 4)], fee_rate=0.001)
+
+    signals, pnl, _ = naive_crossover(prices, 2, 4)
+    np.testing.assert_array_equal(result["signals"][0], signals)
+    turnover = np.abs(np.diff(signals_to_positions(signals), prepend=0))[:-1]
+    assert result["pnl"][0] == pytest.approx(pnl - 0.001 * np.dot(turnover, prices[:-1]))
+
+
+def signals_to_positions(signals):
+    positions, last = np.zeros(len(signals), dtype=int), 0
+    for t, signal in enumerate(signals):
+        last = signal or last
+        positions[t] = last
+    return positions
+
+
+def test_summary_frame_sorted_by_pnl(prices):
+    result = evaluate_grid(prices, parameter_grid([5, 10], [20, 40]), keep_signals=False, with_drawdown=True)
+    frame = summary_frame(result)
+
+    assert result["signals"] is None
+    assert list(frame.columns) == ["short_window", "long_window", "pnl", "trades", "max_drawdown"]
+    assert frame["pnl"].is_monotonic_decreasing
+
+
+@pytest.mark.parametrize("length", [0, 1, 5])
+def test_too_few_prices_give_an_empty_result(length):
+    result = evaluate_grid(np.arange(length, dtype=np.float64) + 100, [(2, 10), (3, 20)], with_drawdown=True)
+    assert result["pnl"].tolist() == [0.0, 0.0] and result["trades"].tolist() == [0, 0]
+    assert result["max_drawdown"].tolist() == [0.0, 0.0]
+    assert [signals.tolist() for signals in result["signals"]] == [[0] * length] * 2
@@ -0,0 +1,166 @@
+import os
+from datetime import datetime
+import mongomock
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+import storage
+
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI", "mongodb://localhost:27017/")
+REQUIRE_MONGO = "MONGO_TEST_URI" in os.environ  # Set explicitly (e.g. the storage_tests compose service): never skip
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient()["trading_db"]
+    storage.ensure_schema(db, timeseries=False, tick_retention=0, rollup_retention={})  # mongomock enforces TTLs
+    return db
+
+
+START = 1735689600000  # 2025-01-01T00:00:00 UTC
+
+
+def trade(symbol, second, price=100.0):
+    return {"symbol": symbol, "price": price, "quantity": 0.1, "timestamp": START + second * 1000,
+            "trade_id": 1000 + second}
+
+
+def test_schema_creates_the_compound_indexes(db):
+    trade_keys = [index["key"] for index in db[storage.TRADES].index_information().values()]
+    order_keys = [index["key"] for index in db[storage.ORDERS].index_information().values()]
+
+    assert [("symbol", 1), ("timestamp", 1)] in trade_keys
+    assert [("side", 1), ("timestamp", -1)] in order_keys
+
+
+def test_trade_queries(db):
+    trades = db[storage.TRADES]
+    storage.insert_trades(trades, [trade("BTCUSDT", s, 100.0 + s) for s in range(5)] + [trade("ETHUSDT", 9)])
+
+    assert [t["price"] for t in storage.trades_range(trades, "BTCUSDT", start=START + 1000,
+                                                      end=START + 3000)] == [101.0, 102.0]
+    assert [t["price"] for t in storage.trades_range(trades, "BTCUSDT", after=START + 3000)] == [104.0]
+    assert [t["price"] for t in storage.recent_trades(trades, "BTCUSDT", 2)] == [104.0, 103.0]
+    assert storage.latest_trade(trades, "ETHUSDT") == {"timestamp": START + 9000}
+    assert storage.latest_trade(trades, "XRPUSDT") is None
+
+
+def test_trade_queries_skip_unmigrated_iso_timestamps(db):
+    trades = db[storage.TRADES]
+    storage.insert_trades(trades, [trade("BTCUSDT", s, 100.0 + s) for s in range(3)])
+    trades.insert_one({"symbol": "BTCUSDT", "price": 1.0, "quantity": 0.1, "timestamp": "2025-01-01T00:00:05"})
+
+    assert storage.latest_trade(trades, "BTCUSDT") == {"timestamp": START + 2000}
+    assert [t["price"] for t in storage.recent_trades(trades, "BTCUSDT", 2)] == [102.0, 101.0]
+    assert [t["price"] for t in storage.trades_range(trades, "BTCUSDT")] == [100.0, 101.0, 102.0]
+    assert [t["price"] for t in storage.trades_range(trades, "BTCUSDT", after=START)] == [101.0, 102.0]
+
+
+def test_stored_trades_get_a_date_without_touching_the_records(db):
+    records = [trade("BTCUSDT", 1)]
+    storage.insert_trades(db[storage.TRADES], records)
+
+    assert "time" not in records[0]
+    assert db[storage.TRADES].find_one()["time"] == datetime(2025, 1, 1, 0, 0, 1)
+
+
+def test_trades_are_deduplicated_by_exchange_trade_id(db):
+    trades = db[storage.TRADES]
+    assert storage.insert_trades(trades, [trade("BTCUSDT", s) for s in range(3)]) == 3
+    # Same exchange trades again (fresh _ids), plus one new trade and one on another symbol with a clashing id
+    assert storage.insert_trades(trades, [trade("BTCUSDT", s) for s in range(4)] + [trade("ETHUSDT", 0)]) == 2
+    assert trades.count_documents({"symbol": "BTCUSDT"}) == 4
+    new = storage.insert_new_trades(trades, [trade("BTCUSDT", s) for s in range(3, 6)])
+    assert [record["trade_id"] for record in new] == [1004, 1005]
+    # Migrated ticks have no trade id and are not affected by the unique index
+    legacy = {"symbol": "BTCUSDT", "price": 1.0, "timestamp": START}
+    assert storage.insert_trades(trades, [dict(legacy), dict(legacy)]) == 2
+
+
+def test_order_queries(db):
+    db[storage.ORDERS].insert_many([{"side": "BUY", "timestamp": 1}, {"side": "BUY", "timestamp": 2}])
+
+    assert storage.last_order(db[storage.ORDERS], "BUY")["timestamp"] == 2
+    assert storage.last_order(db[storage.ORDERS], "SELL") is None
+
+
+def test_retention_ttls_follow_the_configuration(db):
+    storage.ensure_schema(db, timeseries=False, tick_retention=3600, rollup_retention={"1s": 60})
+
+    def ttl(name):
+        return [index.get("expireAfterSeconds") for index in db[name].index_information().values()
+                if index["key"] == [("time", 1)]]
+
+    assert ttl(storage.TRADES) == [3600]
+    assert ttl("bars_1s") == [60] and ttl("bars_1h") == []
+
+    storage.ensure_schema(db, timeseries=False, tick_retention=0, rollup_retention={})
+    assert ttl(storage.TRADES) == [] and ttl("bars_1s") == []
+
+
+@pytest.fixture(params=[False, True], ids=["collection", "timeseries"])
+def live_db(request):
+    client = MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        if REQUIRE_MONGO:
+            pytest.fail(f"No MongoDB at {MONGO_TEST_URI}: {e}")
+        pytest.skip(f"No MongoDB at {MONGO_TEST_URI}")
+    db = client["trading_db_explain_test"]
+    client.drop_database(db.name)
+    storage.ensure_schema(db, timeseries=request.param)
+    trades = (trade(symbol, s) for symbol in ("BTCUSDT", "ETHUSDT") for s in range(50))
+    storage.insert_trades(db[storage.TRADES], trades)  # Adds the time field a time-series collection requires
+    db[storage.ORDERS].insert_many([{"side": side, "timestamp": i} for side in ("BUY", "SELL") for i in range(50)])
+    db["bars_1m"].insert_many([{"symbol": "BTCUSDT", "timestamp": i * 60_000} for i in range(50)])
+    yield db
+    client.drop_database(db.name)
+    client.close()
+
+
+def explain_stages(explain):
+    """
+    Plan stages of an explain(). Time-series collections are views over buckets: depending on the server version
+    the plan sits in the first stage of an aggregation ($cursor), followed by pipeline stages such as $sort.
+    """
+    if "stages" in explain:
+        cursor, *pipeline = explain["stages"]
+        return explain_stages(cursor["$cursor"]) + [name for stage in pipeline for name in stage]
+    return plan_stages(explain["queryPlanner"]["winningPlan"])
+
+
+def plan_stages(plan):
+    stages = [plan["stage"]] if "stage" in plan else []
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+HOT_QUERIES = {
+    "trades_since": lambda db: storage.trades_range(db[storage.TRADES], "BTCUSDT", start=START + 10_000),
+    "trades_after": lambda db: storage.trades_range(db[storage.TRADES], "BTCUSDT", after=START + 10_000),
+    "recent_trades": lambda db: storage.recent_trades(db[storage.TRADES], "BTCUSDT", 10),
+    "recent_orders": lambda db: storage.recent_orders(db[storage.ORDERS], "BUY"),
+    "signal_orders": lambda db: storage.signal_orders(db[storage.ORDERS], "0" * 24),
+    "bars_range": lambda db: storage.bars_range(db["bars_1m"], "BTCUSDT", 600_000, 1_200_000),
+    "recent_bars": lambda db: storage.recent_bars(db["bars_1m"], "BTCUSDT", 10),
+}
+
+
+# On a time-series trades collection the index bounds the buckets, but the unpacked trades are sorted in memory
+TIMESERIES_SORTED = {"trades_since", "trades_after", "recent_trades"}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_queries_use_an_index(live_db, name):
+    stages = explain_stages(HOT_QUERIES[name](live_db).explain())
+    timeseries = "timeseries" in live_db[storage.TRADES].options()
+
+    assert "COLLSCAN" not in stages, f"{name} scans the whole collection: {stages}"
+    if not (timeseries and name in TIMESERIES_SORTED):
+        assert not {"SORT", "$sort"} & set(stages), f"{name} sorts in memory: {stages}"
+
@@ -0,0 +1,138 @@
+import os
+from collections import Counter
+from strategy_pool import HashRing, LoadReporter, StrategySupervisor, assign
+from strategy_runtime import SmaCrossover, StrategyRuntime
+
+
+def crash_once_worker(worker, strategies, states, reports):
+    """Checkpoints after a few ticks and dies; the restarted worker reports what it was handed."""
+    runtime = StrategyRuntime(strategies)
+    runtime.load_state(states)
+    reporter = LoadReporter(worker, reports, runtime)
+    if not states:
+        for price in (1.0, 2.0, 3.0):
+            runtime.on_tick({"symbol": "BTCUSDT", "price": price, "timestamp": 1735689600000})
+            reporter.record(0.001)
+        reporter.flush()
+        reports.close()
+        reports.join_thread()
+        os._exit(1)
+
+    strategy = runtime.strategies["sma"]
+    reporter.flush()
+    reports.put({"worker": worker, "ticks": 0, "busy_seconds": 0.0, "elapsed": 1.0, "instances": 1, "states": {},
+                 "restored": (strategy.last_signal, len(strategy.indicators.prices))})
+    reports.close()
+    reports.join_thread()
+
+
+def test_ring_spreads_symbols_and_moves_only_the_removed_workers_share():
+    ring = HashRing(range(4))
+    symbols = [f"SYM{i}USDT" for i in range(2000)]
+    before = {symbol: ring.node_for(symbol) for symbol in symbols}
+
+    shares = Counter(before.values())
+    assert len(shares) == 4 and min(shares.values()) > 2000 / 4 * 0.7
+
+    ring.remove(2)
+    after = {symbol: ring.node_for(symbol) for symbol in symbols}
+    moved = [symbol for symbol in symbols if before[symbol] != after[symbol]]
+    assert moved and all(before[symbol] == 2 for symbol in moved)
+
+
+def test_instances_of_a_symbol_share_a_worker():
+    strategies = [SmaCrossover(f"sma{i}:{symbol}", symbol) for i in range(3) for symbol in ("BTCUSDT", "ETHUSDT")]
+    assignments = assign(strategies, HashRing(range(8)))
+
+    for worker_strategies in assignments.values():
+        for symbol in {s.symbol for s in worker_strategies}:
+            assert sum(s.symbol == symbol for s in worker_strategies) == 3
+
+
+def test_load_reporter_sends_load_and_checkpoint_every_interval():
+    class Reports(list):
+        put = list.append
+
+    now = [0.0]
+    runtime = StrategyRuntime([SmaCrossover("sma", "BTCUSDT", short_window=1, long_window=2)])
+    reports = Reports()
+    reporter = LoadReporter(0, reports, runtime, interval=5, clock=lambda: now[0])
+
+    reporter.record(0.5)
+    now[0] = 5.0
+    reporter.record(0.5)
+
+    assert len(reports) == 1
+    assert reports[0]["ticks"] == 2 and reports[0]["busy_seconds"] == 1.0 and reports[0]["elapsed"] == 5.0
+    assert reports[0]["states"]["sma"]["last_signal"] is None
+
+
+def test_state_round_trips_between_instances():
+    source = SmaCrossover("sma", "BTCUSDT", short_window=2, long_window=3, execution_mode="TIME_BASED")
+    for i, price in enumerate((1.0, 2.0, 3.0, 4.0, 5.0)):
+        source.on_tick({"symbol": "BTCUSDT", "price": price, "timestamp": i * 1000})
+
+    target = SmaCrossover("sma", "BTCUSDT", short_window=2, long_window=3, execution_mode="TIME_BASED")
+    target.load_state(source.state())
+
+    assert target.last_signal == source.last_signal == "BUY"
+    assert target.indicators.sma(3) == source.indicators.sma(3)
+    assert target.bars.current == source.bars.current
+
+
+def exit_worker(worker, strategies, states, reports):
+    os._exit(1)
+
+
+def test_load_reporter_reports_an_idle_worker():
+    class Reports(list):
+        put = list.append
+
+    now = [0.0]
+    reports = Reports()
+    reporter = LoadReporter(0, reports, StrategyRuntime(), interval=5, clock=lambda: now[0])
+    reporter.record(0.5)
+
+    reporter.poll()
+    now[0] = 5.0
+    reporter.poll()
+    now[0] = 10.0
+    reporter.poll()
+
+    assert [(report["ticks"], report["busy_seconds"]) for report in reports] == [(1, 0.5), (0, 0.0)]
+
+
+def test_a_worker_that_keeps_dying_is_restarted_with_backoff():
+    now = [0.0]
+    supervisor = StrategySupervisor([SmaCrossover("sma", "BTCUSDT", short_window=1, long_window=2)], 1,
+                                    exit_worker, clock=lambda: now[0])
+    supervisor.start()
+    delays = []
+    for _ in range(3):
+        supervisor.processes[0].join(30)
+        started = now[0]
+        process = supervisor.processes[0]
+        supervisor.poll()
+        while supervisor.processes[0] is process:
+            now[0] += 0.5
+            supervisor.poll()
+        delays.append(now[0] - started)
+    supervisor.processes[0].join(30)
+
+    assert delays == [0.0, 1.0, 2.0]  # Immediate, then 1 s, then 2 s
+    assert supervisor.restarts[0] == 3
+
+
+def test_crashed_worker_is_restarted_with_its_checkpoint():
+    supervisor = StrategySupervisor([SmaCrossover("sma", "BTCUSDT", short_window=1, long_window=2)], 1,
+                                    crash_once_worker)
+    supervisor.start()
+    supervisor.processes[0].join(30)
+
+    supervisor.poll()
+    supervisor.processes[0].join(30)
+    supervisor._drain_reports()
+
+    assert supervisor.restarts[0] == 1
+    assert supervisor.processes[0].exitcode == 0
+    assert supervisor.load[0]["restored"] == ("BUY", 3)
@@ -0,0 +1,91 @@
+import pytest
+from strategy_runtime import SmaCrossover, Strategy, StrategyRuntime, build_strategies
+
+
+def tick(price, symbol="BTCUSDT", timestamp=1735689600000):
+    return {"symbol": symbol, "price": price, "quantity": 1.0, "timestamp": timestamp}
+
+
+def feed(runtime, prices, symbol="BTCUSDT"):
+    signals = []
+    for price in prices:
+        signals.extend(runtime.on_tick(tick(price, symbol)))
+    return signals
+
+
+def test_ticks_are_routed_only_to_subscribed_instances():
+    btc = SmaCrossover("sma:BTCUSDT", "btcusdt", short_window=2, long_window=3)
+    eth = SmaCrossover("sma:ETHUSDT", "ETHUSDT", short_window=2, long_window=3)
+    runtime = StrategyRuntime([btc, eth])
+
+    signals = feed(runtime, [1.0, 2.0, 3.0])
+
+    assert runtime.symbols() == ["BTCUSDT", "ETHUSDT"]
+    assert [s["strategy"] for s in signals] == ["sma:BTCUSDT"]
+    assert len(btc.indicators.prices) == 3 and len(eth.indicators.prices) == 0
+
+
+def test_instances_keep_their_own_parameters_and_last_signal():
+    fast = SmaCrossover("fast", "BTCUSDT", short_window=1, long_window=2)
+    slow = SmaCrossover("slow", "BTCUSDT", short_window=2, long_window=4)
+    runtime = StrategyRuntime([fast, slow])
+
+    signals = feed(runtime, [4.0, 3.0, 2.0, 1.0, 3.0])
+
+    assert [(s["strategy"], s["signal"]) for s in signals] == [
+        ("fast", "SELL"), ("slow", "SELL"), ("fast", "BUY")]
+    assert (fast.last_signal, slow.last_signal) == ("BUY", "SELL")
+
+
+def test_time_based_instances_signal_on_closed_bars():
+    strict = SmaCrossover("strict", "BTCUSDT", short_window=1, long_window=2, execution_mode="TIME_BASED")
+    flexible = SmaCrossover("flexible", "BTCUSDT", short_window=1, long_window=2, execution_mode="TIME_BASED",
+                            data_collection_mode="FLEXIBLE")
+    runtime = StrategyRuntime([strict, flexible])
+
+    runtime.on_tick(tick(10.0, timestamp=0))
+    signals = runtime.on_tick(tick(12.0, timestamp=3000))  # Closes the 0s bar and forward-fills 1s and 2s
+
+    assert [s["strategy"] for s in signals] == []
+    assert len(strict.indicators.prices) == 3 and len(flexible.indicators.prices) == 1
+    signals = runtime.on_tick(tick(8.0, timestamp=4000))
+    assert [(s["strategy"], s["signal"], s["timestamp"]) for s in signals] == [
+        ("strict", "BUY", 3000), ("flexible", "BUY", 3000)]
+
+
+def test_warm_up_fills_the_buffers_without_signalling():
+    strategy = SmaCrossover("sma", "BTCUSDT", short_window=1, long_window=2, execution_mode="TIME_BASED")
+    assert strategy.history_ms == 2000
+
+    strategy.warm_up([tick(10.0, timestamp=0), tick(11.0, timestamp=1000), tick(12.0, timestamp=2000)])
+
+    assert strategy.indicators.ready(2) and strategy.last_signal is None
+    assert strategy.on_tick(tick(13.0, timestamp=3000))[0]["signal"] == "BUY"
+
+
+def test_a_failing_instance_does_not_stop_the_others():
+    class Broken(Strategy):
+        def on_tick(self, tick, emit=True):
+            raise RuntimeError("boom")
+
+    healthy = SmaCrossover("sma", "BTCUSDT", short_window=1, long_window=2)
+    runtime = StrategyRuntime([Broken("broken", "BTCUSDT"), healthy])
+
+    assert feed(runtime, [1.0, 2.0])[0]["strategy"] == "sma"
+
+
+def test_build_strategies_expands_symbols():
+    strategies = build_strategies([
+        {"name": "sma", "plugin": "sma_crossover", "symbols": ["btcusdt", "ethusdt"], "params": {"short_window": 5}},
+        {"name": "sma_slow", "plugin": "sma_crossover", "symbols": ["BTCUSDT"], "params": {"long_window": 500}},
+    ])
+
+    assert [(s.name, s.symbol) for s in strategies] == [
+        ("sma:BTCUSDT", "BTCUSDT"), ("sma:ETHUSDT", "ETHUSDT"), ("sma_slow", "BTCUSDT")]
+    assert strategies[0].short_window == 5 and strategies[2].long_window == 500
+
+    runtime = StrategyRuntime(strategies)
+    with pytest.raises(ValueError):
+        runtime.add(strategies[0])
+    runtime.remove("sma:ETHUSDT")
+    assert runtime.symbols() == ["BTCUSDT"]
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import tick_store
+from tick_store import DAY_MS, TickStore, to_epoch_ms
+
+
+@pytest.fixture
+def small_strides(monkeypatch):
+    monkeypatch.setattr(tick_store, "INDEX_STRIDE", 16)
+    monkeypatch.setattr(tick_store, "GROWTH_ROWS", 64)
+
+
+def test_append_and_range_read_across_growth(tmp_path, small_strides):
+    writer = TickStore(str(tmp_path), writable=True)
+    reader = TickStore(str(tmp_path))
+    start = 1_739_361_600_000  # 2025-02-12T12:00:00Z
+    timestamps = start + np.arange(500) * 10
+
+    for batch in np.array_split(np.arange(500), 7):
+        writer.append("btcusdt", timestamps[batch], 50000.0 + batch, np.full(len(batch), 0.5))
+        ticks = reader.read("BTCUSDT", start, start + 5000)
+        assert len(ticks["timestamp"]) == batch[-1] + 1
+
+    ticks = reader.read("BTCUSDT", start + 1234, start + 2345)
+    expected = timestamps[(timestamps >= start + 1234) & (timestamps < start + 2345)]
+    np.testing.assert_array_equal(ticks["timestamp"], expected)
+    np.testing.assert_array_equal(ticks["price"], 50000.0 + (expected - start) // 10)
+    assert isinstance(ticks["price"], np.memmap)  # zero-copy view on the mapped file
+
+    last = reader.read_last("BTCUSDT", 1)
+    np.testing.assert_array_equal(last["timestamp"], timestamps[-100:])
+    np.testing.assert_array_equal(reader.read_tail("BTCUSDT", 3)["timestamp"], timestamps[-3:])
+    writer.close()
+    reader.close()
+
+
+def test_duplicate_timestamps_and_day_split(tmp_path, small_strides):
+    store = TickStore(str(tmp_path), writable=True)
+    midnight = 20_000 * DAY_MS
+    timestamps = np.concatenate((np.full(40, midnight - 1), np.full(40, midnight)))
+    store.append("ETHUSDT", timestamps, np.arange(80.0), np.ones(80))
+
+    assert store.days("ETHUSDT") == ["2024-10-03", "2024-10-04"]
+    assert len(store.read("ETHUSDT", midnight, midnight + 1)["price"]) == 40
+    both = store.read("ETHUSDT", midnight - 1, midnight + 1)
+    np.testing.assert_array_equal(both["price"], np.arange(80.0))
+    np.testing.assert_array_equal(store.read_tail("ETHUSDT", 50)["price"], np.arange(30.0, 80.0))
+
+
+def test_reopen_and_append_records(tmp_path):
+    store = TickStore(str(tmp_path), writable=True)
+    store.append_records([
+        {"symbol": "BTCUSDT", "price": 1.0, "quantity": 2.0, "timestamp": "2025-02-12T12:00:00.500000"},
+        {"symbol": "BTCUSDT", "price": 1.5, "quantity": 1.0, "timestamp": "2025-02-12T12:00:01"},
+    ])
+    store.close()
+
+    reopened = TickStore(str(tmp_path), writable=True)
+    reopened.append("BTCUSDT", [to_epoch_ms("2025-02-12T12:00:02")], [2.0], [3.0])
+    ticks = TickStore(str(tmp_path)).read_last("BTCUSDT", 60)
+    assert ticks["timestamp"].tolist() == [1_739_361_600_500, 1_739_361_601_000, 1_739_361_602_000]
+    assert ticks["quantity"].tolist() == [2.0, 1.0, 3.0]
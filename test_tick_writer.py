@@ -0,0 +1,123 @@
+import asyncio
+import json
+import fakeredis
+import mongomock
+import pytest
+
+import storage
+from rollups import Rollups
+from tick_store import TickStore
+from tick_writer import TickWriter
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient()["trading_db"]["trades"]
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def make_trade(i):
+    return {"symbol": "BTCUSDT", "price": 50000.0 + i, "quantity": 0.01, "timestamp": 1739361600000 + i,
+            "trade_id": i}
+
+
+@pytest.mark.asyncio
+async def test_flushes_by_size(collection, redis_client):
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe("raw_trades:BTCUSDT")
+    pubsub.get_message()
+
+    writer = TickWriter(collection, redis_client, batch_size=10, flush_interval=60)
+    writer.start()
+    for i in range(25):
+        writer.submit(make_trade(i))
+    await asyncio.sleep(0.2)
+
+    assert collection.count_documents({}) == 20
+    await writer.close()
+    assert collection.count_documents({}) == 25
+
+    published = [json.loads(m["data"]) for m in iter(pubsub.get_message, None)]
+    assert [m["price"] for m in published] == [50000.0 + i for i in range(25)]
+    assert all(isinstance(m["_id"], str) for m in published)
+
+
+@pytest.mark.asyncio
+async def test_flushes_by_time(collection, redis_client):
+    writer = TickWriter(collection, redis_client, batch_size=1000, flush_interval=0.05)
+    writer.start()
+    writer.submit(make_trade(1))
+    await asyncio.sleep(0.3)
+
+    assert collection.count_documents({}) == 1
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_drops_oldest_when_full(collection, redis_client):
+    writer = TickWriter(collection, redis_client, batch_size=100, max_queue=5)
+    for i in range(8):
+        writer.submit(make_trade(i))
+
+    assert writer.stats["dropped"] == 3
+    await writer.close()
+
+    prices = sorted(doc["price"] for doc in collection.find())
+    assert prices == [50000.0 + i for i in range(3, 8)]
+    assert writer.stats["written"] == 5
+
+
+@pytest.mark.asyncio
+async def test_appends_to_tick_store(collection, redis_client, tmp_path):
+    store = TickStore(str(tmp_path), writable=True)
+    writer = TickWriter(collection, redis_client, tick_store=store)
+    for i in range(3):
+        writer.submit(make_trade(i))
+    await writer.close()
+
+    ticks = TickStore(str(tmp_path)).read_last("BTCUSDT", 60)
+    assert ticks["price"].tolist() == [50000.0, 50001.0, 50002.0]
+
+
+@pytest.mark.asyncio
+async def test_archive_only_writer_neither_stores_nor_publishes(collection, redis_client, tmp_path):
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe("raw_trades:BTCUSDT")
+    pubsub.get_message()
+
+    writer = TickWriter(None, None, tick_store=TickStore(str(tmp_path), writable=True))
+    writer.submit(make_trade(0))
+    await writer.close()
+
+    assert TickStore(str(tmp_path)).read_last("BTCUSDT", 60)["price"].tolist() == [50000.0]
+    assert pubsub.get_message() is None
+    assert writer.stats["enqueued"] == 1 and writer.stats["published"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rolls_up_new_ticks_after_publishing(redis_client):
+    db = mongomock.MongoClient()["trading_db"]
+    storage.ensure_schema(db, timeseries=False, tick_retention=0, rollup_retention={})
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe("raw_trades:BTCUSDT")
+    pubsub.get_message()
+    published_first = []
+
+    class CheckedRollups(Rollups):
+        def add(self, records):
+            published_first.append(pubsub.get_message() is not None)
+            return super().add(records)
+
+    writer = TickWriter(db[storage.TRADES], redis_client, rollups=CheckedRollups(db))
+    writer.submit(make_trade(0))
+    writer.submit(make_trade(1))
+    writer.submit(make_trade(1))  # Same exchange trade id: stored once, counted once
+    await writer.close()
+
+    assert published_first == [True]
+    assert db["bars_1m"].find_one()["trades"] == 2
+    assert writer.stats["duplicates"] == 1
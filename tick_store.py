@@ -0,0 +1,233 @@
+import os
+from datetime import datetime, timezone
+import numpy as np
+
+INDEX_STRIDE = 4096  # One sparse index entry every N rows
+GROWTH_ROWS = 1 << 16  # Files are extended in steps of this many rows so appends rarely remap
+
+COLUMNS = (("timestamp", np.int64), ("price", np.float64), ("quantity", np.float64))
+DAY_MS = 86_400_000
+
+
+def to_epoch_ms(timestamp):
+    """Accepts epoch milliseconds or the ISO strings written by data_feed (naive values are UTC)."""
+    if isinstance(timestamp, (int, np.integer)):
+        return int(timestamp)
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp() * 1000)
+
+
+def day_of(timestamp_ms):
+    return datetime.fromtimestamp(timestamp_ms // DAY_MS * 86_400, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+class TickPartition:
+    """
+    Append-only columnar file set for one symbol and UTC day: <day>.timestamp / .price / .quantity hold raw
+    int64/float64 arrays and <day>.count the number of valid rows (files are pre-extended in GROWTH_ROWS steps).
+    A single writer process per symbol is assumed; readers remap when the writer publishes a new count.
+    """
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        self.count = 0
+        self.capacity = 0
+        self.columns = {}
+        self.index = np.empty(0, dtype=np.int64)
+        self._count_fd = None
+        self._map(0)
+        self.refresh()
+
+    def _file(self, suffix):
+        return f"{self.path}.{suffix}"
+
+    def _map(self, capacity):
+        if capacity == 0:
+            self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+        else:
+            mode = "r+" if self.writable else "r"
+            self.columns = {name: np.memmap(self._file(name), dtype=dtype, mode=mode, shape=(capacity,))
+                            for name, dtype in COLUMNS}
+        self.capacity = capacity
+
+    def refresh(self):
+        """Pick up rows published by the writer; costs one pread unless the row count changed."""
+        if self._count_fd is None:
+            flags = os.O_RDWR | os.O_CREAT if self.writable else os.O_RDONLY
+            try:
+                self._count_fd = os.open(self._file("count"), flags, 0o644)
+            except FileNotFoundError:
+                return
+        data = os.pread(self._count_fd, 8, 0)
+        count = int.from_bytes(data, "little", signed=True) if len(data) == 8 else 0
+        if count == self.count:
+            return
+        if count > self.capacity:
+            self._map(os.path.getsize(self._file("timestamp")) // 8)
+        previous, self.count = self.count, count
+        self._extend_index(previous)
+
+    def _extend_index(self, indexed_rows):
+        """Sparse time index: the timestamp of every INDEX_STRIDE-th row, kept in memory."""
+        start = -(-indexed_rows // INDEX_STRIDE) * INDEX_STRIDE
+        new_entries = np.array(self.columns["timestamp"][start:self.count:INDEX_STRIDE])
+        base = self.index[:start // INDEX_STRIDE]
+        self.index = np.concatenate((base, new_entries)) if len(base) else new_entries
+
+    def append(self, timestamps, prices, quantities):
+        n = len(timestamps)
+        if n == 0:
+            return
+        if self.count + n > self.capacity:
+            capacity = (self.count + n + GROWTH_ROWS - 1) // GROWTH_ROWS * GROWTH_ROWS
+            self.columns = {}
+            for name, dtype in COLUMNS:
+                with open(self._file(name), "ab") as f:
+                    f.truncate(capacity * np.dtype(dtype).itemsize)
+            self._map(capacity)
+
+        end = self.count + n
+        self.columns["timestamp"][self.count:end] = timestamps
+        self.columns["price"][self.count:end] = prices
+        self.columns["quantity"][self.count:end] = quantities
+
+        indexed_rows = self.count
+        self.count = end
+        self._extend_index(indexed_rows)
+        # The row count is published last, so readers never see rows that are not fully written.
+        os.pwrite(self._count_fd, self.count.to_bytes(8, "little", signed=True), 0)
+
+    def close(self):
+        self.columns = {}
+        if self._count_fd is not None:
+            os.close(self._count_fd)
+            self._count_fd = None
+
+    def locate(self, timestamp_ms, side="left"):
+        """Row position of a timestamp: binary search on the sparse index, then within one stride."""
+        block = max(int(np.searchsorted(self.index, timestamp_ms, side=side)) - 1, 0)
+        start = block * INDEX_STRIDE
+        stop = min(start + 2 * INDEX_STRIDE, self.count)
+        return start + int(np.searchsorted(self.columns["timestamp"][start:stop], timestamp_ms, side=side))
+
+    def read(self, start_ms, end_ms):
+        lo = self.locate(start_ms, "left")
+        hi = self.locate(end_ms, "left")
+        return {name: self.columns[name][lo:hi] for name, _ in COLUMNS}
+
+
+class TickStore:
+    """Per-symbol, per-day memory-mapped tick archive with zero-copy time-range reads."""
+
+    def __init__(self, root, writable=False):
+        self.root = root
+        self.writable = writable
+        self._partitions = {}
+
+    def _partition(self, symbol, day):
+        key = (symbol.upper(), day)
+        partition = self._partitions.get(key)
+        if partition is None:
+            directory = os.path.join(self.root, key[0])
+            if self.writable:
+                os.makedirs(directory, exist_ok=True)
+            partition = self._partitions[key] = TickPartition(os.path.join(directory, day), self.writable)
+        elif not self.writable:
+            partition.refresh()
+        return partition
+
+    def days(self, symbol):
+        directory = os.path.join(self.root, symbol.upper())
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len(".count")] for name in os.listdir(directory) if name.endswith(".count"))
+
+    def append(self, symbol, timestamps, prices, quantities):
+        """Append ticks in timestamp order; a batch spanning midnight is split across day partitions."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.float64)
+        days = timestamps // DAY_MS
+        for boundary in np.unique(days):
+            rows = days == boundary
+            self._partition(symbol, day_of(int(boundary) * DAY_MS)).append(timestamps[rows], prices[rows],
+                                                                            quantities[rows])
+
+    def append_records(self, records):
+        """Append data_feed trade records (symbol/price/quantity/timestamp dicts)."""
+        by_symbol = {}
+        for record in records:
+            by_symbol.setdefault(record["symbol"], []).append(record)
+        for symbol, rows in by_symbol.items():
+            self.append(symbol, [to_epoch_ms(r["timestamp"]) for r in rows], [r["price"] for r in rows],
+                        [r.get("quantity", 0.0) for r in rows])
+
+    def read(self, symbol, start_ms, end_ms):
+        """
+        Ticks with start_ms <= timestamp < end_ms as {"timestamp", "price", "quantity"} arrays.
+        Ranges inside one day are views on the mapped files (no copy); multi-day ranges are concatenated.
+        """
+        first_day, last_day = start_ms // DAY_MS, (end_ms - 1) // DAY_MS
+        if last_day - first_day <= 1:
+            days = [day_of(day * DAY_MS) for day in range(first_day, last_day + 1)]
+        else:
+            days = [day for day in self.days(symbol) if day_of(first_day * DAY_MS) <= day <= day_of(last_day * DAY_MS)]
+
+        parts = []
+        for day in days:
+            partition = self._partition(symbol, day)
+            if partition.count:
+                parts.append(partition.read(start_ms, end_ms))
+        return self._combine(parts)
+
+    def read_tail(self, symbol, rows):
+        """The most recent `rows` ticks."""
+        parts = []
+        for day in reversed(self.days(symbol)):
+            partition = self._partition(symbol, day)
+            take = min(rows, partition.count)
+            parts.insert(0, {name: partition.columns[name][partition.count - take:partition.count]
+                             for name, _ in COLUMNS})
+            rows -= take
+            if rows <= 0:
+                break
+        return self._combine(parts)
+
+    @staticmethod
+    def _combine(parts):
+        if not parts:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+        if len(parts) == 1:
+            return parts[0]
+        return {name: np.concatenate([part[name] for part in parts]) for name, _ in COLUMNS}
+
+    def read_last(self, symbol, seconds, now_ms=None):
+        if now_ms is None:
+            now_ms = self.latest_timestamp(symbol)
+            if now_ms is None:
+                return self.read(symbol, 0, 1)
+            now_ms += 1
+        return self.read(symbol, now_ms - int(seconds * 1000), now_ms)
+
+    def latest_timestamp(self, symbol):
+        days = self.days(symbol)
+        if not days:
+            return None
+        partition = self._partition(symbol, days[-1])
+        return int(partition.columns["timestamp"][partition.count - 1]) if partition.count else None
+
+    def flush(self):
+        for partition in self._partitions.values():
+            for column in partition.columns.values():
+                if isinstance(column, np.memmap):
+                    column.flush()
+
+    def close(self):
+        self.flush()
+        for partition in self._partitions.values():
+            partition.close()
+        self._partitions = {}
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from bson import ObjectId
+from configuration import MESSAGE_TRANSPORT, trade_channel
+from codec import encode
+from metrics import metrics
+from redis_streams import publish
+from storage import insert_new_trades
+
+logger = logging.getLogger(__name__)
+
+WRITE_BATCH_SIZE = 500  # Flush as soon as this many ticks are queued
+WRITE_FLUSH_INTERVAL = 0.25  # ...or after this many seconds, whichever comes first
+WRITE_QUEUE_SIZE = 20000  # Oldest ticks are dropped once the queue is full
+WRITE_DELAY_THRESHOLD = 1.0  # Ticks persisted later than this (seconds) are counted as delayed
+STATS_LOG_INTERVAL = 60
+
+
+class TickWriter:
+    """
+    Write-behind stage: queues ticks and persists/publishes them in batches. Without a collection or Redis
+    client that step is skipped (data_feed with the Kafka sink on leaves both to consume_trades).
+    """
+
+    def __init__(self, collection, redis_client, channel_for=trade_channel, batch_size=WRITE_BATCH_SIZE,
+                 flush_interval=WRITE_FLUSH_INTERVAL, max_queue=WRITE_QUEUE_SIZE,
+                 delay_threshold=WRITE_DELAY_THRESHOLD, tick_store=None, transport=MESSAGE_TRANSPORT, rollups=None):
+        self.collection = collection
+        self.redis_client = redis_client
+        self.transport = transport
+        self.tick_store = tick_store
+        self.rollups = rollups
+        self.channel_for = channel_for
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.delay_threshold = delay_threshold
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.stats = {"enqueued": 0, "written": 0, "published": 0, "dropped": 0, "delayed": 0, "failed": 0,
+                      "duplicates": 0}
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._task = None
+        self._last_stats_log = time.monotonic()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def submit(self, trade_record):
+        """Queue a tick without blocking the websocket loop. Returns False if an older tick was dropped."""
+        trade_record.setdefault("_id", ObjectId())
+        item = (time.monotonic(), trade_record)
+        dropped = False
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            _, oldest = self.queue.get_nowait()
+            self.queue.put_nowait(item)
+            self.stats["dropped"] += 1
+            metrics.inc("ticks_dropped_total", symbol=oldest["symbol"])
+            dropped = True
+
+        self.stats["enqueued"] += 1
+        metrics.inc("ticks_received_total", symbol=trade_record["symbol"])
+        if self.queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return not dropped
+
+    async def run(self):
+        while not (self._closing and self.queue.empty()):
+            if self.queue.qsize() < self.batch_size and not self._closing:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._drain()
+            if batch:
+                await self._flush(batch)
+
+    async def close(self):
+        """Flush everything still queued and stop the writer."""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        else:
+            while not self.queue.empty():
+                await self._flush(self._drain())
+        if self.tick_store is not None:
+            self.tick_store.close()
+        self._log_stats()
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _flush(self, batch):
+        try:
+            await asyncio.to_thread(self._write_batch, [record for _, record in batch])
+        except Exception as e:
+            logger.error(f"❌ Failed to flush {len(batch)} trades: {e}")
+
+        now = time.monotonic()
+        self.stats["delayed"] += sum(1 for queued_at, _ in batch if now - queued_at > self.delay_threshold)
+        metrics.set("write_queue_depth", self.queue.qsize())
+        if now - self._last_stats_log >= STATS_LOG_INTERVAL:
+            self._log_stats()
+
+    def _write_batch(self, records):
+        new = self._insert(records) if self.collection is not None else records
+
+        if self.redis_client is not None:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for record in records:
+                channel = self.channel_for(record["symbol"])
+                publish(pipe, channel, encode(channel, record), self.transport)
+            pipe.execute()
+            self.stats["published"] += len(records)
+
+        # Strategies already have the ticks; archiving and bar upserts no longer delay them.
+        if self.tick_store is not None:
+            try:
+                self.tick_store.append_records(records)
+            except Exception as e:
+                logger.error(f"❌ Tick store append failed: {e}")
+
+        if self.rollups is not None:
+            try:
+                self.rollups.add(new)
+            except Exception as e:
+                logger.error(f"❌ OHLCV rollup failed: {e}")
+
+    def _insert(self, records):
+        """Store the batch; returns the records that were new (all of them if the insert failed)."""
+        per_symbol = Counter(record["symbol"] for record in records)
+        new = records
+        try:
+            new = insert_new_trades(self.collection, records)
+            self.stats["written"] += len(new)
+            self.stats["duplicates"] += len(records) - len(new)
+            outcome = "ticks_written_total"
+        except Exception as e:
+            # Unordered inserts keep going past individual failures; still publish the live ticks.
+            self.stats["failed"] += len(records)
+            outcome = "ticks_failed_total"
+            logger.error(f"❌ MongoDB batch insert failed: {e}")
+        for symbol, count in per_symbol.items():
+            metrics.inc(outcome, count, symbol=symbol)
+        return new
+
+    def _log_stats(self):
+        self._last_stats_log = time.monotonic()
+        logger.info(f"💾 Tick writer stats: {self.stats} (queued: {self.queue.qsize()})")